@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -25,6 +27,7 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-+^l_4ii=7@p+6ld0wra_)
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=True, cast=bool)
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
 
 
@@ -43,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'repo_practice.monitoring.PrometheusMiddleware',
+    'repo_practice.query_budget.QueryBudgetMiddleware',  # outermost: counts the SQL of every other layer
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +96,86 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lab3-default',
+    },
+    # Read-through cache of repository reads (repo_practice/services/cache_layer.py).
+    # Must be shared by all worker processes (FileBasedCache, Redis, Memcached): version bumps of
+    # one worker never reach another worker's LocMemCache.
+    'repository': {
+        'BACKEND': config('REPOSITORY_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('REPOSITORY_CACHE_LOCATION', default='lab3-repository'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+REPOSITORY_CACHE = {
+    'ENABLED': config('REPOSITORY_CACHE_ENABLED', default=False, cast=bool),
+    # A per-process backend is refused unless this is set (single-process servers only, e.g. runserver)
+    'ALLOW_PROCESS_LOCAL': config('REPOSITORY_CACHE_ALLOW_PROCESS_LOCAL', default=False, cast=bool),
+    'ALIAS': 'repository',
+    'TIMEOUT': 300,
+    # repository name in RepositoryService -> methods served from the cache
+    'REPOSITORIES': {
+        'cars': ['get_by_id', 'get_available_cars', 'get_unowned_in_stock', 'get_most_expensive', 'get_cheapest',
+                 'get_premium_cars'],
+        'customers': ['get_by_id', 'get_by_email'],
+        'employees': ['get_by_id', 'get_by_position'],
+        'sales': [],
+        'dealer_profiles': [],
+        'transactions': [],
+        'dealer_stats': [],
+    },
+}
+
+# Daily / monthly sales rollups behind /api/sales/report/. Sales younger than LAG are read live
+# (a slow commit must not land below the high-water mark). Reports only read; new sales refresh
+# the rollups after commit when the mark is more than REFRESH_INTERVAL behind.
+SALES_ROLLUP = {
+    'LAG_SECONDS': config('SALES_ROLLUP_LAG_SECONDS', default=300, cast=int),
+    'REFRESH_INTERVAL_SECONDS': config('SALES_ROLLUP_REFRESH_INTERVAL_SECONDS', default=60, cast=int),
+}
+
+# Per-method call / row / latency histograms of the repositories, served at /api/metrics/
+REPOSITORY_METRICS_ENABLED = config('REPOSITORY_METRICS_ENABLED', default=True, cast=bool)
+
+# Prometheus multi-process mode: with several worker processes set this to a directory that the
+# start script empties before the server starts (nothing here does: every worker imports these
+# settings); each worker writes mmap files there and /metrics merges them.
+# It has to be in the environment before prometheus_client is imported, hence here.
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default='')
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', PROMETHEUS_MULTIPROC_DIR)
+
+
+# Per-request SQL budget (repo_practice/query_budget.py).
+# Checked in DEBUG (logged) and in tests (raises); X-DB-Queries / X-DB-Time headers are always set.
+QUERY_BUDGET = {
+    'RAISE': config('QUERY_BUDGET_RAISE', default=TESTING, cast=bool),
+    'DEFAULT': {
+        'queries': 30,
+        'time_ms': 500,
+        'repeated_shape': 10,  # same statement shape this many times = N+1
+    },
+    # (path regex, overrides); the first match wins
+    'ENDPOINTS': [
+        (r'^/admin/', {'queries': None, 'time_ms': None, 'repeated_shape': None}),
+        (r'/bulk/$', {'queries': None, 'time_ms': 5000, 'repeated_shape': None}),
+        (r'^/api/batch/$', {'queries': None, 'time_ms': 5000, 'repeated_shape': None}),  # up to 100 sub-requests
+    ],
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from repo_practice.views import CarViewSet, CustomerViewSet, EmployeeViewSet, SaleViewSet, DealerProfileViewSet, TransactionViewSet, DealerViewSet
+from repo_practice.monitoring import metrics_view
+from repo_practice.views import CarViewSet, CustomerViewSet, EmployeeViewSet, SaleViewSet, DealerProfileViewSet, TransactionViewSet, DealerViewSet, RepositoryCacheViewSet, RepositoryMetricsViewSet, BatchViewSet
 
 router = DefaultRouter()
 router.register(r'cars', CarViewSet, basename='car')
@@ -11,10 +12,14 @@ router.register(r'sales', SaleViewSet, basename='sale')
 router.register(r'dealer-profiles', DealerProfileViewSet, basename='dealer-profile')
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'dealer', DealerViewSet, basename='dealer')
+router.register(r'cache-stats', RepositoryCacheViewSet, basename='cache-stats')
+router.register(r'metrics', RepositoryMetricsViewSet, basename='metrics')
+router.register(r'batch', BatchViewSet, basename='batch')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
+    path('metrics', metrics_view, name='prometheus-metrics'),
     path('', include('car_templates.urls')),  # Include car_templates URLs
 ]
 
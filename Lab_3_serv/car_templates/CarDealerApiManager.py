@@ -1,30 +1,240 @@
 import requests
-from typing import List, Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, List, Dict, Optional
+from urllib.parse import urlparse, parse_qs
 import logging
 from decouple import config
+from repo_practice.monitoring import observe_api_request
+from .transports import get_transport
+
+# Page size used when a manager method returns a whole list (the API caps limit at 500)
+FULL_LIST_PAGE_SIZE = 500
 
 logger = logging.getLogger(__name__)
 
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide bounded pool for gather(); keep it within the session's connection pool"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config('API_GATHER_WORKERS', default=8, cast=int),
+                                               thread_name_prefix='api-gather')
+    return _executor
+
+
+@dataclass
+class BatchResult:
+    """One queued sub-request; status and body are filled in by ApiBatch.flush()"""
+    method: str
+    path: str
+    payload: Any = None
+    status: Optional[int] = None
+    body: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and self.status < 400
+
+
+class ApiBatch:
+    """
+    Sub-requests queued on the client and sent as POST /api/batch/:
+
+        with api.batch() as batch:
+            car = batch.get(f'cars/{car_id}/')
+            profile = batch.get(f'dealer-profiles/{profile_id}/')
+        car.body, profile.status
+
+    Paths are relative to API_BASE_URL. Leaving the with block flushes; flush()
+    can also be called directly. atomic=True sends one all-or-nothing batch.
+    """
+    MAX_REQUESTS = 100  # BatchViewSet.max_requests
+
+    def __init__(self, manager: 'CarDealerApiManager', atomic: bool = False):
+        self.manager = manager
+        self.atomic = atomic
+        self.queue: List[BatchResult] = []
+        self.committed: Optional[bool] = None
+
+    def add(self, method: str, path: str, payload: Any = None) -> BatchResult:
+        result = BatchResult(method.upper(), path, payload)
+        self.queue.append(result)
+        return result
+
+    def get(self, path: str) -> BatchResult:
+        return self.add('GET', path)
+
+    def post(self, path: str, payload: Any = None) -> BatchResult:
+        return self.add('POST', path, payload)
+
+    def put(self, path: str, payload: Any = None) -> BatchResult:
+        return self.add('PUT', path, payload)
+
+    def delete(self, path: str) -> BatchResult:
+        return self.add('DELETE', path)
+
+    def flush(self) -> List[BatchResult]:
+        """Send everything queued; results keep status None when the batch call itself failed"""
+        queued, self.queue = self.queue, []
+        if self.atomic and len(queued) > self.MAX_REQUESTS:
+            raise ValueError(f'An atomic batch holds at most {self.MAX_REQUESTS} requests')
+        for start in range(0, len(queued), self.MAX_REQUESTS):
+            self._send(queued[start:start + self.MAX_REQUESTS])
+        return queued
+
+    def _send(self, chunk: List[BatchResult]):
+        prefix = urlparse(self.manager.api_base).path.rstrip('/')
+        data = {
+            'atomic': self.atomic,
+            'requests': [{'method': item.method, 'path': f"{prefix}/{item.path.lstrip('/')}", 'body': item.payload}
+                         for item in chunk],
+        }
+        try:
+            response = self.manager._request('POST', f"{self.manager.api_base}/batch/", json=data)
+            payload = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Error sending batch of {len(chunk)} requests: {e}")
+            return
+        if 'responses' not in payload:
+            logger.error(f"Batch rejected: {payload}")
+            return
+        self.committed = payload.get('committed')
+        for item, answer in zip(chunk, payload['responses']):
+            item.status = answer['status']
+            item.body = answer['body']
+
+    def __enter__(self) -> 'ApiBatch':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
+
 
 class CarDealerApiManager:
     REQUEST_TIMEOUT_SEC = 10
 
-    def __init__(self, base_url: str = None, username: str = None, password: str = None):
+    def __init__(self, base_url: str = None, username: str = None, password: str = None, api_base: str = None):
         # Use environment variables with fallback to default values
-        api_base = config('API_BASE_URL', default='http://127.0.0.1:8000/api')
+        api_base = api_base or config('API_BASE_URL', default='http://127.0.0.1:8000/api')
         self.api_base = api_base.rstrip('/')
         self.base_url = (base_url or f"{self.api_base}/cars").rstrip('/')
 
         self.username = username or config('API_USERNAME')
         self.password = password or config('API_PASSWORD')
         self.auth = (self.username, self.password) if self.username and self.password else None
+        # API_BASE_URL=inprocess:///api calls the API views of this process directly instead of over HTTP
+        self.transport = get_transport(self.api_base, self.auth, self.REQUEST_TIMEOUT_SEC)
 
-    def get_list(self) -> List[Dict]:
+    def _request(self, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.transport.request(method, url, **kwargs)
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            status_code = response.status_code if response is not None else None
+            observe_api_request(method, url, status_code, elapsed)
+            logger.debug('%s %s -> %s in %.1f ms', method, url, status_code or 'error', elapsed * 1000)
+
+    def gather(self, *calls: Callable[[], Any], timeout: float = None) -> List[Any]:
+        """
+        Run independent manager calls in parallel and return their results in order:
+
+            car, dashboard = api.gather(lambda: api.get_by_id(car_id),
+                                        lambda: api.get_dealer_dashboard(user_id))
+
+        All calls share one deadline (default REQUEST_TIMEOUT_SEC), so the wait is
+        the slowest call, not the sum. A call that fails or misses the deadline
+        yields None, like the manager methods themselves do on errors.
+        With the in-process transport the calls run one after another: there they
+        are CPU-bound and must see the caller's database connection.
+        """
+        if not getattr(self.transport, 'concurrent', False) or len(calls) < 2:
+            return [self._call_safely(call) for call in calls]
+
+        timeout = self.REQUEST_TIMEOUT_SEC if timeout is None else timeout
+        futures = [get_executor().submit(self._call_safely, call) for call in calls]
+        done, not_done = wait(futures, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            logger.warning('%d of %d API calls missed the %gs deadline', len(not_done), len(calls), timeout)
+        return [future.result() if future in done else None for future in futures]
+
+    def batch(self, atomic: bool = False) -> ApiBatch:
+        """Queue calls and send them as one POST /api/batch/ (see ApiBatch)"""
+        return ApiBatch(self, atomic=atomic)
+
+    @staticmethod
+    def _call_safely(call: Callable[[], Any]) -> Any:
+        try:
+            return call()
+        except Exception:
+            logger.exception('API call failed')
+            return None
+
+    @staticmethod
+    def _unwrap_page(payload) -> Dict:
+        """Turn a cursor-paginated list response into results + bare cursors"""
+        if isinstance(payload, list):
+            return {'results': payload, 'next_cursor': None, 'prev_cursor': None}
+
+        def cursor_of(link):
+            if not link:
+                return None
+            return parse_qs(urlparse(link).query).get('cursor', [None])[0]
+
+        return {
+            'results': payload.get('results', []),
+            'next_cursor': cursor_of(payload.get('next')),
+            'prev_cursor': cursor_of(payload.get('previous')),
+        }
+
+    def _get_all(self, url: str, params: Dict = None) -> List[Dict]:
+        """
+        Every item of a cursor-paginated list: pages of FULL_LIST_PAGE_SIZE, following
+        the "next" links (they keep the filters) until the last page.
+        Raises requests exceptions like a single call would.
+        """
+        results = []
+        params = {**(params or {}), 'limit': FULL_LIST_PAGE_SIZE}
+        while url:
+            response = self._request('GET', url, params=params)
+            response.raise_for_status()
+            payload = response.json()
+            if isinstance(payload, list):
+                return results + payload
+            results.extend(payload.get('results', []))
+            url, params = payload.get('next'), None
+        return results
+
+    def get_page(self, cursor: str = None, limit: int = None) -> Dict:
+        """GET /api/cars/?cursor=...&limit=..."""
         try:
             url = f"{self.base_url}/"
-            response = requests.get(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            params = {k: v for k, v in (('cursor', cursor), ('limit', limit)) if v}
+            response = self._request('GET', url, params=params)
             response.raise_for_status()
-            return response.json()
+            return self._unwrap_page(response.json())
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching car list: {e}")
+            return self._unwrap_page([])
+
+    def get_list(self) -> List[Dict]:
+        """All cars; pages through the whole list (get_page() for one page)"""
+        try:
+            return self._get_all(f"{self.base_url}/")
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching car list: {e}")
             return []
@@ -32,7 +242,7 @@ class CarDealerApiManager:
     def get_by_id(self, car_id: int) -> Optional[Dict]:
         try:
             url = f"{self.base_url}/{car_id}/"
-            response = requests.get(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('GET', url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -42,7 +252,7 @@ class CarDealerApiManager:
     def create_item(self, data: Dict) -> Optional[Dict]:
         try:
             url = f"{self.base_url}/"
-            response = requests.post(url, json=data, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('POST', url, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -52,7 +262,7 @@ class CarDealerApiManager:
     def update_item(self, car_id: int, data: Dict) -> Optional[Dict]:
         try:
             url = f"{self.base_url}/{car_id}/"
-            response = requests.put(url, json=data, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('PUT', url, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -62,7 +272,7 @@ class CarDealerApiManager:
     def delete_item(self, car_id: int) -> bool:
         try:
             url = f"{self.base_url}/{car_id}/"
-            response = requests.delete(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('DELETE', url)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -72,7 +282,7 @@ class CarDealerApiManager:
     def create_transaction(self, data: Dict) -> Optional[Dict]:
         try:
             url = f"{self.api_base}/transactions/"
-            response = requests.post(url, json=data, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('POST', url, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -81,10 +291,7 @@ class CarDealerApiManager:
 
     def get_dealer_profiles(self) -> List[Dict]:
         try:
-            url = f"{self.api_base}/dealer-profiles/"
-            response = requests.get(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
-            response.raise_for_status()
-            return response.json()
+            return self._get_all(f"{self.api_base}/dealer-profiles/")
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching dealer profiles: {e}")
             return []
@@ -92,7 +299,7 @@ class CarDealerApiManager:
     def get_dealer_profile(self, profile_id: int) -> Optional[Dict]:
         try:
             url = f"{self.api_base}/dealer-profiles/{profile_id}/"
-            response = requests.get(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('GET', url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -102,19 +309,32 @@ class CarDealerApiManager:
     def update_dealer_profile(self, profile_id: int, data: Dict) -> Optional[Dict]:
         try:
             url = f"{self.api_base}/dealer-profiles/{profile_id}/"
-            response = requests.put(url, json=data, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('PUT', url, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Error updating dealer profile {profile_id}: {e}")
             return None
 
-    def get_transactions(self) -> List[Dict]:
+    def get_transactions(self, dealer: int = None, transaction_type: str = None, car: int = None,
+                         date_from=None, date_to=None, limit: int = None) -> List[Dict]:
+        """
+        GET /api/transactions/ filtered on the server; date_from / date_to: date, datetime or ISO string.
+        Newest first: the latest `limit` transactions, or all of them when limit is None.
+        """
+        params = {
+            'dealer': dealer, 'type': transaction_type, 'car': car, 'limit': limit,
+            'date_from': date_from.isoformat() if hasattr(date_from, 'isoformat') else date_from,
+            'date_to': date_to.isoformat() if hasattr(date_to, 'isoformat') else date_to,
+        }
+        params = {k: v for k, v in params.items() if v is not None}
         try:
             url = f"{self.api_base}/transactions/"
-            response = requests.get(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            if limit is None:
+                return self._get_all(url, params)
+            response = self._request('GET', url, params=params)
             response.raise_for_status()
-            return response.json()
+            return self._unwrap_page(response.json())['results']
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching transactions: {e}")
             return []
@@ -125,19 +345,40 @@ class DealerOperationsApiManager(CarDealerApiManager):
         """GET /api/dealer/dashboard/{user_id}/"""
         try:
             url = f"{self.api_base}/dealer/dashboard/{user_id}/"
-            response = requests.get(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT_SEC)
+            response = self._request('GET', url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching dealer dashboard for user {user_id}: {e}")
             return None
 
+    def trade(self, action: str, user_id: int, car_id: int, **params) -> Optional[Dict]:
+        """
+        POST /api/dealer/trade/ - buy / sell / modify in one round trip.
+        Returns the final state (message, transaction, car, balance) or the API error body.
+        """
+        try:
+            url = f"{self.api_base}/dealer/trade/"
+            data = {'action': action, 'user_id': user_id, 'car_id': car_id,
+                    **{key: str(value) for key, value in params.items()}}
+            response = self._request('POST', url, json=data)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error in {action} of car {car_id} for user {user_id}: {e}")
+            if hasattr(e.response, 'json'):
+                try:
+                    return e.response.json()
+                except ValueError:
+                    pass
+            return None
+
     def buy_car_api(self, user_id: int, car_id: int) -> Optional[Dict]:
         """POST /api/dealer/buy/"""
         try:
             url = f"{self.api_base}/dealer/buy/"
             data = {'user_id': user_id, 'car_id': car_id}
-            response = requests.post(url, json=data, auth=self.auth, timeout=self.REQUEST_TIMEOUT_SEC)
+            response = self._request('POST', url, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -154,7 +395,7 @@ class DealerOperationsApiManager(CarDealerApiManager):
         try:
             url = f"{self.api_base}/dealer/sell/"
             data = {'user_id': user_id, 'car_id': car_id}
-            response = requests.post(url, json=data, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('POST', url, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -177,7 +418,7 @@ class DealerOperationsApiManager(CarDealerApiManager):
                 'price_increase': str(price_increase),
                 'description': description
             }
-            response = requests.post(url, json=data, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('POST', url, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -193,7 +434,7 @@ class DealerOperationsApiManager(CarDealerApiManager):
         """GET /api/dealer/transactions/{user_id}/"""
         try:
             url = f"{self.api_base}/dealer/transactions/{user_id}/"
-            response = requests.get(url, auth=self.auth, timeout=self.REQUEST_TIMEOUT)
+            response = self._request('GET', url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -0,0 +1,82 @@
+import json
+import statistics
+import time
+
+from decouple import config
+from django.core.management.base import BaseCommand, CommandError
+
+from car_templates.CarDealerApiManager import DealerOperationsApiManager
+from repo_practice.models import Car, DealerProfile
+
+
+class Command(BaseCommand):
+    help = ('Compare the API manager over HTTP (a running server at --url) with the in-process transport: '
+            'latency per call and whether both return the same data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help='API base of the running server (default: API_BASE_URL when it is http)')
+        parser.add_argument('--username', default=None, help='default: API_USERNAME')
+        parser.add_argument('--password', default=None, help='default: API_PASSWORD')
+        parser.add_argument('--requests', type=int, default=50, help='measured calls per operation and transport')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--json', action='store_true', help='print the report as JSON')
+
+    def handle(self, *args, **options):
+        url = options['url'] or config('API_BASE_URL', default='http://127.0.0.1:8000/api')
+        if not url.startswith('http'):
+            raise CommandError('--url must point at a running server (http://host:port/api)')
+        username = options['username'] or config('API_USERNAME')
+        password = options['password'] or config('API_PASSWORD')
+
+        car_id = Car.objects.order_by('id').values_list('id', flat=True).first()
+        dealer_id = DealerProfile.objects.order_by('id').values_list('user_id', flat=True).first()
+        if car_id is None or dealer_id is None:
+            raise CommandError('Needs at least one car and one dealer profile (manage.py seed)')
+
+        managers = {
+            'http': DealerOperationsApiManager(username=username, password=password, api_base=url),
+            'inprocess': DealerOperationsApiManager(username=username, password=password, api_base='inprocess:///api'),
+        }
+
+        operations = {
+            'get_list': lambda manager: manager.get_list(),
+            'get_by_id': lambda manager: manager.get_by_id(car_id),
+            'get_dealer_profiles': lambda manager: manager.get_dealer_profiles(),
+            'get_transactions': lambda manager: manager.get_transactions(),
+            'get_dealer_dashboard': lambda manager: manager.get_dealer_dashboard(dealer_id),
+        }
+
+        report = {}
+        for name, operation in operations.items():
+            results = {transport: operation(manager) for transport, manager in managers.items()}
+            row = {'same_result': results['http'] == results['inprocess']}
+            for transport, manager in managers.items():
+                row[transport] = self.measure(operation, manager, options['requests'], options['warmup'])
+            http_ms, local_ms = row['http']['mean_ms'], row['inprocess']['mean_ms']
+            row['speedup'] = round(http_ms / local_ms, 1) if local_ms else None
+            report[name] = row
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        header = f"{'operation':<22} {'http mean':>10} {'http p50':>9} {'local mean':>11} {'local p50':>10} {'speedup':>8}  same"
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        for name, row in report.items():
+            line = (f"{name:<22} {row['http']['mean_ms']:>10.2f} {row['http']['p50_ms']:>9.2f} "
+                    f"{row['inprocess']['mean_ms']:>11.2f} {row['inprocess']['p50_ms']:>10.2f} "
+                    f"{row['speedup'] or 0:>7.1f}x  {'yes' if row['same_result'] else 'NO'}")
+            self.stdout.write(line if row['same_result'] else self.style.WARNING(line))
+
+    def measure(self, operation, manager, requests, warmup):
+        for _ in range(warmup):
+            operation(manager)
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            operation(manager)
+            samples.append((time.perf_counter() - started) * 1000)
+        return {
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'p50_ms': round(statistics.median(samples), 3),
+        }
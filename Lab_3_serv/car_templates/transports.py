@@ -0,0 +1,126 @@
+"""
+How CarDealerApiManager reaches the API.
+
+HttpTransport  - pooled keep-alive HTTP (split front-end / API deployments).
+InProcessTransport - dispatches straight to the DRF views of this process when
+API_BASE_URL is the local sentinel (inprocess:///api): no socket, no Basic-auth
+password hashing, no JSON round trip for responses. Both return objects with
+the requests.Response surface the manager uses (status_code, json(), raise_for_status()).
+"""
+import threading
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+import requests
+from decouple import config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+INPROCESS_SCHEME = 'inprocess'
+
+# Only verbs that are safe to repeat are retried; POST (buy / sell / modify) never is
+RETRY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide keep-alive session shared by every manager instance.
+    Connections to the API are pooled and reused instead of opening a new
+    TCP connection per call; idempotent calls are retried with backoff on
+    connection errors and 502/503/504.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=config('API_RETRIES', default=3, cast=int),
+                    backoff_factor=config('API_RETRY_BACKOFF', default=0.2, cast=float),
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=RETRY_METHODS,
+                    raise_on_status=False,
+                )
+                pool_size = config('API_POOL_MAXSIZE', default=20, cast=int)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['Connection'] = 'keep-alive'
+                _session = session
+    return _session
+
+
+def is_inprocess(base_url: str) -> bool:
+    return urlparse(base_url).scheme == INPROCESS_SCHEME
+
+
+def get_transport(base_url: str, auth, timeout):
+    if is_inprocess(base_url):
+        return InProcessTransport(username=auth[0] if auth else None)
+    return HttpTransport(auth, timeout)
+
+
+class HttpTransport:
+    # Calls only wait on the network: gather() may run them on other threads
+    concurrent = True
+
+    def __init__(self, auth, timeout):
+        self.session = get_session()
+        self.auth = auth
+        self.timeout = timeout
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(method, url, auth=self.auth, timeout=self.timeout, **kwargs)
+
+
+class InProcessResponse:
+    """The part of requests.Response the managers read"""
+
+    def __init__(self, status_code: int, data: Any, url: str):
+        self.status_code = status_code
+        self.data = data
+        self.url = url
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f'{self.status_code} Error for url: {self.url}', response=self)
+
+
+class InProcessTransport:
+    """
+    Calls the API views directly. The caller is force-authenticated as the
+    API_USERNAME user (the same account the HTTP transport logs in with), so
+    no password is hashed per call. Responses are not rendered to JSON:
+    serializer output is only converted to the same JSON types.
+    """
+    concurrent = False
+
+    def __init__(self, username: Optional[str] = None):
+        self.username = username
+        self._user = None
+
+    def request(self, method: str, url: str, params=None, json=None, **kwargs) -> InProcessResponse:
+        from repo_practice.dispatch import dispatch
+
+        # The path and query string of the URL (e.g. a "next" link) plus params, as requests would send them
+        parsed = urlparse(url)
+        path = f'{parsed.path}?{parsed.query}' if parsed.query else parsed.path
+        status_code, data = dispatch(method, path, self._get_user(), query=(params or {}).items(), body=json)
+        return InProcessResponse(status_code, data, url)
+
+    def _get_user(self):
+        from django.contrib.auth.models import AnonymousUser, User
+
+        if self._user is None:
+            self._user = User.objects.filter(username=self.username).first() if self.username else None
+        return self._user or AnonymousUser()
@@ -4,13 +4,19 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from .forms import CarForm, CustomLoginForm
-from .CarDealerApiManager import CarDealerApiManager
+from .CarDealerApiManager import DealerOperationsApiManager
 from decimal import Decimal
 
+_api_manager = None
+
 
 def get_api_manager():
     """Helper function to get API manager instance - follows DRY principle"""
-    return CarDealerApiManager()
+    # One stateless manager per process; its HTTP session (and connection pool) is shared
+    global _api_manager
+    if _api_manager is None:
+        _api_manager = DealerOperationsApiManager()
+    return _api_manager
 
 
 def home(request):
@@ -19,9 +25,11 @@ def home(request):
 
 def car_list(request):
     api = get_api_manager()
-    cars = api.get_list()
+    page = api.get_page(cursor=request.GET.get('cursor'))
     context = {
-        'cars': cars,
+        'cars': page['results'],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
         'page_title': 'Car Inventory'
     }
     return render(request, 'car_templates/car_list.html', context)
@@ -136,13 +144,16 @@ def car_delete(request, car_id):
 
 def car_api_list(request):
     api = get_api_manager()
-    cars = api.get_list()
+    page = api.get_page(cursor=request.GET.get('cursor'))
+    cars = page['results']
 
     if not cars:
         messages.warning(request, 'No cars returned from API or API unreachable.')
 
     context = {
         'cars': cars,
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
         'page_title': 'Car Inventory (via API)',
         'using_api': True
     }
@@ -229,6 +240,7 @@ def dealer_dashboard(request):
         'owned_cars': data.get('owned_cars', []),
         'transactions': data.get('transactions', []),
         'available_cars': data.get('available_cars', []),
+        'statistics': data.get('statistics'),
         'page_title': 'Dealer Dashboard'
     }
     return render(request, 'car_templates/dealer_dashboard.html', context)
@@ -282,8 +294,10 @@ def modify_car(request, car_id):
 
     # GET - показуємо форму
     api = get_api_manager()
-    car = api.get_by_id(car_id)
-    dashboard_data = api.get_dealer_dashboard(request.user.id)
+    car, dashboard_data = api.gather(
+        lambda: api.get_by_id(car_id),
+        lambda: api.get_dealer_dashboard(request.user.id),
+    )
 
     if not car or car.get('owner') != request.user.id:
         messages.error(request, 'Car not found or you do not own this car.')
@@ -322,8 +336,10 @@ def transaction_history(request):
     Transaction history через API
     """
     api = get_api_manager()
-    data = api.get_dealer_transactions(request.user.id)
-    dashboard_data = api.get_dealer_dashboard(request.user.id)
+    data, dashboard_data = api.gather(
+        lambda: api.get_dealer_transactions(request.user.id),
+        lambda: api.get_dealer_dashboard(request.user.id),
+    )
 
     context = {
         'transactions': data.get('transactions', []) if data else [],
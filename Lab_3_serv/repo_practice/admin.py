@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import Car, Customer, Employee, Sale, DealerProfile, Transaction
+from .models import Car, Customer, Employee, Sale, DealerProfile, Transaction, DealerStats
 
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
-    list_display = ('make', 'model', 'year', 'price', 'in_stock', 'owner', 'created_at')
+    list_display = ('make', 'model', 'year', 'price', 'in_stock', 'owner', 'vin', 'created_at')
     list_filter = ('in_stock', 'year')
-    search_fields = ('make', 'model')
+    search_fields = ('make', 'model', 'vin')
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
@@ -34,3 +34,9 @@ class TransactionAdmin(admin.ModelAdmin):
     list_filter = ('transaction_type', 'created_at')
     search_fields = ('dealer__username', 'description')
     readonly_fields = ('created_at',)
+
+@admin.register(DealerStats)
+class DealerStatsAdmin(admin.ModelAdmin):
+    list_display = ('dealer', 'net_profit', 'buy_count', 'sell_count', 'modify_count', 'last_trade_at')
+    search_fields = ('dealer__username',)
+    readonly_fields = ('total_spent', 'total_earned', 'net_profit', 'buy_count', 'sell_count', 'modify_count', 'last_trade_at')
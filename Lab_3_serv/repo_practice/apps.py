@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class RepoPracticeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'repo_practice'
+
+    def ready(self):
+        from django.conf import settings
+        from .repositories.instrumentation import metrics
+
+        metrics.enabled = getattr(settings, 'REPOSITORY_METRICS_ENABLED', False)
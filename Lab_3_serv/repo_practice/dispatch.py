@@ -0,0 +1,87 @@
+"""
+Run an API view in-process, without HTTP: used by /api/batch/ and by the
+in-process transport of the front-end API manager.
+"""
+import json
+import logging
+from typing import Any, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from django.conf import settings
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+from rest_framework.test import force_authenticate
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+_encoder = JSONEncoder()
+
+
+class NotJSON(Exception):
+    """The view answered with a body that has no JSON form (CSV or gzip export, HTML, ...)"""
+
+
+def dispatch(method: str, path: str, user, query: Iterable[Tuple[str, Any]] = (), body: Any = None,
+             ) -> Tuple[int, Any]:
+    """
+    Call the view behind path as user and return (status code, JSON-ready body).
+    path may carry a query string; query is appended to it. An unknown path is
+    a 404, an exception in the view a 500 (logged), as they would be over HTTP.
+    A response that is not JSON (e.g. /api/*/export/) is a 406 for this call only.
+    """
+    parsed = urlparse(path)
+    try:
+        match = resolve(parsed.path)
+    except Resolver404:
+        return 404, {'detail': 'Not found.'}
+
+    request = build_request(method, parsed.path, parse_qsl(parsed.query) + list(query), body, user)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        return response.status_code, response_payload(response)
+    except NotJSON as e:
+        return 406, {'detail': f'{parsed.path} answers with {e}, not JSON: request it over HTTP'}
+    except Exception:
+        logger.exception('In-process %s %s failed', method, parsed.path)
+        return 500, {'detail': 'Internal server error'}
+
+
+def build_request(method: str, path: str, query, body, user):
+    hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+    factory = RequestFactory(SERVER_NAME=hosts[0].lstrip('.') if hosts else 'localhost')
+    if query:
+        path = f'{path}?{urlencode(query, doseq=True)}'
+    if method.upper() == 'GET':
+        request = factory.get(path)
+    else:
+        request = factory.generic(method.upper(), path, data=json.dumps(body) if body is not None else '',
+                                  content_type='application/json')
+    force_authenticate(request, user=user)
+    return request
+
+
+def response_payload(response) -> Optional[Any]:
+    streaming = getattr(response, 'streaming', False)
+    if not streaming and hasattr(response, 'data'):
+        return to_json_types(response.data)
+    if not streaming and not response.content:
+        return None
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type != 'application/json' and not content_type.endswith('+json'):
+        # An export is never read: closing the response closes its generator and the query behind it
+        response.close()
+        raise NotJSON(content_type or 'no content type')
+    content = b''.join(response.streaming_content) if streaming else response.content
+    return json.loads(content) if content else None
+
+
+def to_json_types(value):
+    """What a JSON round trip would give back, without encoding: Decimal -> str, datetime -> ISO string, ..."""
+    if isinstance(value, dict):
+        return {str(key): to_json_types(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_types(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return to_json_types(_encoder.default(value))
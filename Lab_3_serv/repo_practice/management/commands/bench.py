@@ -0,0 +1,185 @@
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from repo_practice.models import Car, DealerProfile
+from repo_practice.synthetic import DatasetSize, SyntheticDataset
+
+READ_SCENARIOS = ('car_list', 'dealer_dashboard', 'statistics', 'sales_report')
+TRADE_SCENARIOS = ('buy', 'modify', 'sell')
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the main API endpoints in-process through the test client and report '
+            'throughput, p50/p99 latency and query counts as JSON, optionally against a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='insert a synthetic dataset first (writes to the DB)')
+        parser.add_argument('--cars', type=int, default=5000)
+        parser.add_argument('--customers', type=int, default=2000)
+        parser.add_argument('--employees', type=int, default=50)
+        parser.add_argument('--dealers', type=int, default=50)
+        parser.add_argument('--sales', type=int, default=5000)
+        parser.add_argument('--transactions', type=int, default=20000)
+        parser.add_argument('--rng-seed', type=int, default=42)
+        parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per read scenario')
+        parser.add_argument('--only', nargs='+', choices=READ_SCENARIOS + TRADE_SCENARIOS)
+        parser.add_argument('--output', help='write the JSON report here instead of stdout')
+        parser.add_argument('--baseline', help='compare against this earlier report')
+        parser.add_argument('--save-baseline', help='also write the report here as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before flagging (0.2 = 20%%)')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            size = DatasetSize(
+                cars=options['cars'], customers=options['customers'], employees=options['employees'],
+                dealers=options['dealers'], sales=options['sales'], transactions=options['transactions'],
+            )
+            started = time.perf_counter()
+            SyntheticDataset(size, seed=options['rng_seed']).generate()
+            self.stderr.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+        dealers = list(DealerProfile.objects.order_by('-balance').values_list('user_id', flat=True)[:10])
+        if not dealers:
+            raise CommandError('No dealers in the database: run with --seed')
+        user = User.objects.get(id=dealers[0])
+
+        client = APIClient(HTTP_HOST='localhost')
+        # Authentication is bypassed: BasicAuthentication hashes the password on every request
+        # and would dominate the numbers.
+        client.force_authenticate(user=user)
+
+        selected = options['only'] or READ_SCENARIOS + TRADE_SCENARIOS
+        report = {'meta': self.meta(options), 'scenarios': {}}
+        for name in READ_SCENARIOS:
+            if name in selected:
+                report['scenarios'][name] = self.run_read(client, name, dealers, options)
+        if any(name in selected for name in TRADE_SCENARIOS):
+            report['scenarios'].update(self.run_trades(client, dealers, options, selected))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output)
+        else:
+            self.stdout.write(output)
+        if options['save_baseline']:
+            Path(options['save_baseline']).write_text(output)
+
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+            regressions = self.compare(report, baseline, options['tolerance'])
+            for line in regressions:
+                self.stderr.write(self.style.ERROR(f'REGRESSION {line}'))
+            if not regressions:
+                self.stderr.write(self.style.SUCCESS('No regressions against the baseline'))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regressions')
+
+    # ---------- scenarios ----------
+
+    def read_request(self, name, dealers, index):
+        if name == 'car_list':
+            return 'get', '/api/cars/', None
+        if name == 'dealer_dashboard':
+            return 'get', f'/api/dealer/dashboard/{dealers[index % len(dealers)]}/', None
+        if name == 'statistics':
+            return 'get', '/api/transactions/statistics/', None
+        return 'get', '/api/sales/report/', None
+
+    def run_read(self, client, name, dealers, options):
+        for index in range(options['warmup']):
+            self.call(client, *self.read_request(name, dealers, index))
+        samples = [self.call(client, *self.read_request(name, dealers, index)) for index in range(options['requests'])]
+        return self.summarize(samples)
+
+    def run_trades(self, client, dealers, options, selected):
+        """
+        Buy N free cars, modify each once, sell each back. All of it runs in one DB
+        transaction that is rolled back at the end, so the database is left exactly as
+        it was (modify would otherwise raise car prices and dealer balances for good).
+        Each trade's own atomic() becomes a savepoint: commit time is not in the numbers.
+        """
+        cars = list(Car.objects.filter(owner__isnull=True).order_by('price').values_list('id', flat=True)[:options['requests']])
+        pairs = [(dealers[index % len(dealers)], car_id) for index, car_id in enumerate(cars)]
+        results = {}
+        with db_transaction.atomic():
+            for name in TRADE_SCENARIOS:
+                samples = []
+                for dealer_id, car_id in pairs:
+                    data = {'user_id': dealer_id, 'car_id': car_id}
+                    if name == 'modify':
+                        data.update(modification_cost='100.00', price_increase='150.00', description='bench')
+                    sample = self.call(client, 'post', f'/api/dealer/{name}/', data)
+                    samples.append(sample)
+                if name in selected:
+                    results[name] = self.summarize(samples)
+            db_transaction.set_rollback(True)
+        return results
+
+    def call(self, client, method, url, data):
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data, format='json') if data else getattr(client, method)(url)
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, int(response.get('X-DB-Queries', 0)), response.status_code < 400
+
+    def summarize(self, samples):
+        latencies = sorted(sample[0] for sample in samples)
+        queries = [sample[1] for sample in samples]
+        total_s = sum(latencies) / 1000
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if not sample[2]),
+            'throughput_rps': round(len(samples) / total_s, 1) if total_s else 0.0,
+            'mean_ms': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            'p50_ms': round(self.percentile(latencies, 0.50), 3),
+            'p99_ms': round(self.percentile(latencies, 0.99), 3),
+            'queries_mean': round(statistics.fmean(queries), 2) if queries else 0.0,
+            'queries_max': max(queries, default=0),
+        }
+
+    @staticmethod
+    def percentile(sorted_values, q):
+        if not sorted_values:
+            return 0.0
+        return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+    # ---------- report ----------
+
+    def meta(self, options):
+        return {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'rows': {
+                'cars': Car.objects.count(),
+                'dealers': DealerProfile.objects.count(),
+            },
+        }
+
+    def compare(self, report, baseline, tolerance):
+        regressions = []
+        for name, current in report['scenarios'].items():
+            before = baseline.get('scenarios', {}).get(name)
+            if not before:
+                continue
+            for key in ('p50_ms', 'p99_ms'):
+                if before[key] and current[key] > before[key] * (1 + tolerance):
+                    regressions.append(f'{name}.{key}: {before[key]} -> {current[key]}')
+            if before['throughput_rps'] and current['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+                regressions.append(f"{name}.throughput_rps: {before['throughput_rps']} -> {current['throughput_rps']}")
+            if current['queries_max'] > before['queries_max']:
+                regressions.append(f"{name}.queries_max: {before['queries_max']} -> {current['queries_max']}")
+        return regressions
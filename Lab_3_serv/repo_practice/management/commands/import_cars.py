@@ -0,0 +1,225 @@
+import csv
+import itertools
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from rest_framework.exceptions import ValidationError
+
+from repo_practice.serializers import CarImportSerializer
+from repo_practice.services.repo_service import RepositoryService
+
+FORMATS = ('csv', 'json')
+READ_SIZE = 1 << 16
+
+
+class Command(BaseCommand):
+    help = ('Import supplier inventory from a CSV or JSON file: rows are streamed, validated with the '
+            'car serializer rules and upserted by VIN in batches. An interrupted import resumes from its '
+            'checkpoint when run again with the same file.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, a JSON array of objects, or JSON Lines')
+        parser.add_argument('--format', choices=FORMATS, default=None, help='default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows per upsert (one transaction each)')
+        parser.add_argument('--checkpoint', default=None, help='default: <path>.checkpoint')
+        parser.add_argument('--rejects', default=None, help='CSV of rejected rows (default: <path>.rejects.csv)')
+        parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint and start over')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'No such file: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        file_format = options['format'] or self.detect_format(path)
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        rejects_path = options['rejects'] or f'{path}.rejects.csv'
+
+        state = self.load_checkpoint(checkpoint_path, path, options['restart'])
+        if state['rows']:
+            self.stdout.write(f"Resuming after row {state['rows']:,} "
+                              f"({state['inserted']:,} inserted, {state['updated']:,} updated, "
+                              f"{state['rejected']:,} rejected so far)")
+
+        repo = RepositoryService()
+        serializer = CarImportSerializer()
+        self.started = time.perf_counter()
+        self.last_report = 0.0
+        resumed_from = state['rows']
+
+        with open(rejects_path, 'a+', newline='', encoding='utf-8') as rejects_file:
+            # Rejects written after the last checkpoint belong to a batch that will be read again
+            rejects_file.truncate(state['rejects_offset'])
+            rejects = csv.writer(rejects_file)
+            if not state['rejects_offset']:
+                rejects.writerow(['row', 'errors', 'data'])
+
+            rows = itertools.islice(self.read_rows(path, file_format), state['rows'], None)
+            for batch in iter_batches(rows, options['batch_size']):
+                items, rejected = self.validate(serializer, batch)
+                if items:
+                    with db_transaction.atomic():
+                        inserted, updated = repo.cars.bulk_upsert(items, batch_size=options['batch_size'])
+                    state['inserted'] += inserted
+                    state['updated'] += updated
+                for row_number, errors, data in rejected:
+                    rejects.writerow([row_number, json.dumps(errors, ensure_ascii=False),
+                                      json.dumps(data, ensure_ascii=False, default=str)])
+                rejects_file.flush()
+                os.fsync(rejects_file.fileno())
+
+                state['rows'] = batch[-1][0]
+                state['rejected'] += len(rejected)
+                state['rejects_offset'] = rejects_file.tell()
+                save_checkpoint(checkpoint_path, state)
+                self.progress(state, state['rows'] - resumed_from)
+
+        os.remove(checkpoint_path)
+        elapsed = time.perf_counter() - self.started
+        done = state['rows'] - resumed_from
+        rate = done / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {state['rows']:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s): "
+            f"{state['inserted']:,} inserted, {state['updated']:,} updated, {state['rejected']:,} rejected"
+        ))
+        if state['rejected']:
+            self.stdout.write(self.style.WARNING(f'Rejected rows: {rejects_path}'))
+        else:
+            os.remove(rejects_path)
+
+    def validate(self, serializer, batch):
+        """One serializer instance checks the whole batch: the field set is built once, not per row"""
+        items, rejected = [], []
+        for row_number, data in batch:
+            if isinstance(data, json.JSONDecodeError):
+                rejected.append((row_number, {'non_field_errors': [f'Invalid JSON: {data}']}, data.doc.rstrip()))
+                continue
+            if not isinstance(data, dict):
+                rejected.append((row_number, {'non_field_errors': ['Expected an object']}, data))
+                continue
+            try:
+                items.append(serializer.run_validation(data))
+            except ValidationError as exc:
+                rejected.append((row_number, exc.detail, data))
+        return items, rejected
+
+    def progress(self, state, done):
+        now = time.perf_counter()
+        if now - self.last_report < 1.0:
+            return
+        self.last_report = now
+        rate = done / (now - self.started) if now > self.started else 0.0
+        self.stdout.write(f"{state['rows']:>12,} rows  {rate:>10,.0f} rows/s  "
+                          f"{state['inserted']:,} inserted, {state['updated']:,} updated, "
+                          f"{state['rejected']:,} rejected")
+
+    # ---------- input ----------
+
+    def detect_format(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return 'csv'
+        if extension in ('.json', '.jsonl', '.ndjson'):
+            return 'json'
+        raise CommandError(f'Cannot tell the format of {path}: pass --format')
+
+    def read_rows(self, path, file_format):
+        """(row number, raw row) pairs, numbered from 1, read incrementally"""
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            rows = read_csv(handle) if file_format == 'csv' else read_json(handle)
+            yield from enumerate(rows, start=1)
+
+    # ---------- checkpoint ----------
+
+    def load_checkpoint(self, checkpoint_path, path, restart):
+        source = fingerprint(path)
+        fresh = {'source': source, 'rows': 0, 'inserted': 0, 'updated': 0, 'rejected': 0, 'rejects_offset': 0}
+        if restart or not os.path.exists(checkpoint_path):
+            return fresh
+        with open(checkpoint_path, encoding='utf-8') as handle:
+            state = json.load(handle)
+        if state.get('source') != source:
+            raise CommandError(f'{checkpoint_path} was written for a different version of {path}: '
+                               'pass --restart to import it from the beginning')
+        return state
+
+
+def read_csv(handle):
+    # Empty cells fall back to the model defaults (in_stock) or fail as missing, like an empty form field
+    for row in csv.DictReader(handle):
+        yield {key: value for key, value in row.items() if key is not None and value not in (None, '')}
+
+
+def read_json(handle):
+    """A top-level JSON array, decoded one element at a time, or JSON Lines"""
+    head = handle.read(READ_SIZE).lstrip()
+    if head.startswith('['):
+        yield from iter_json_array(handle, head[1:])
+        return
+    handle.seek(0)
+    for line in handle:
+        if line.strip():
+            yield parse_json_line(line)
+
+
+def parse_json_line(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as exc:
+        # Rejected by validate() like any other bad row instead of stopping the import
+        return exc
+
+
+def iter_json_array(handle, buffer):
+    decoder = json.JSONDecoder()
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+            # A number at the end of the buffer may continue in the next read
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError as exc:
+            if eof:
+                raise CommandError(f'Invalid JSON array: {exc}')
+            complete = False
+        if complete:
+            yield item
+            buffer = buffer[end:]
+            continue
+        chunk = handle.read(READ_SIZE)
+        eof = not chunk
+        if eof and not buffer.strip():
+            raise CommandError('Invalid JSON array: missing closing bracket')
+        buffer += chunk
+
+
+def iter_batches(rows, size):
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def fingerprint(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def save_checkpoint(checkpoint_path, state):
+    """Write-then-rename, so a crash leaves the previous checkpoint or the new one, never half of one"""
+    temporary = f'{checkpoint_path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(state, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, checkpoint_path)
@@ -0,0 +1,201 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from repo_practice.models import Car, Customer, Employee, Sale, DealerProfile, Transaction
+from repo_practice.services.repo_service import RepositoryService
+
+INDEXED_MODELS = [Car, Customer, Employee, Sale, DealerProfile, Transaction]
+BENCH_PREFIX = 'bench_dealer_'
+MAKES = ['BMW', 'Porsche', 'Mercedes-Benz', 'Audi', 'Toyota', 'Honda', 'Ford', 'Volvo']
+POSITIONS = ['Менеджер з продажу', 'Старший консультант', 'Механік', 'Директор']
+
+
+class Command(BaseCommand):
+    help = ('Time every repository query with and without the 0004 indexes and print the EXPLAIN plans. '
+            'Drops and re-creates indexes: run it against a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='insert synthetic rows first')
+        parser.add_argument('--cars', type=int, default=50000)
+        parser.add_argument('--customers', type=int, default=20000)
+        parser.add_argument('--dealers', type=int, default=200)
+        parser.add_argument('--transactions', type=int, default=200000)
+        parser.add_argument('--sales', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5, help='timing = best of N runs')
+        parser.add_argument('--only-after', action='store_true', help='skip the run without indexes')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options)
+
+        cases = self.build_cases()
+        before = {}
+        if not options['only_after']:
+            self.set_indexes(enabled=False)
+            try:
+                before = self.run_cases(cases, options['repeat'])
+            finally:
+                self.set_indexes(enabled=True)
+        after = self.run_cases(cases, options['repeat'])
+
+        for label, _ in cases:
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            if label in before:
+                ms, plans = before[label]
+                self.stdout.write(f'  before: {ms:9.2f} ms')
+                for plan in plans:
+                    self.stdout.write(f'    {plan}')
+            ms, plans = after[label]
+            self.stdout.write(f'  after:  {ms:9.2f} ms')
+            for plan in plans:
+                self.stdout.write(f'    {plan}')
+
+    # ---------- cases ----------
+
+    def build_cases(self):
+        repo = RepositoryService()
+        dealer = User.objects.filter(transactions__isnull=False).order_by('id').first() or User.objects.first()
+        customer = Customer.objects.order_by('id').first()
+        car = Car.objects.filter(transaction__isnull=False).order_by('id').first()
+        now = timezone.now()
+
+        cases = [
+            ('cars.get_available_cars', repo.cars.get_available_cars),
+            ('cars.get_cars_by_make', lambda: repo.cars.get_cars_by_make('Porsche')),
+            ('cars.get_premium_cars', lambda: repo.cars.get_premium_cars(180000)),
+            ('cars.get_cars_by_year_range', lambda: repo.cars.get_cars_by_year_range(2019, 2020)),
+            ('cars.get_most_expensive', repo.cars.get_most_expensive),
+            ('cars.get_cheapest', repo.cars.get_cheapest),
+            ('cars.get_page', lambda: repo.cars.get_page(limit=50)),
+            ('employees.get_by_position', lambda: repo.employees.get_by_position('Директор')),
+            ('sales.get_sales_report', repo.sales.get_sales_report),
+            ('dealer_profiles.get_high_balance_dealers', lambda: repo.dealer_profiles.get_high_balance_dealers(95000)),
+            ('dealer_profiles.get_low_balance_dealers', lambda: repo.dealer_profiles.get_low_balance_dealers(1000)),
+            ('transactions.get_recent_transactions', lambda: repo.transactions.get_recent_transactions(20)),
+            ('transactions.get_page', lambda: repo.transactions.get_page(limit=50)),
+            ('transactions.get_page(type=)', lambda: repo.transactions.get_page(limit=50, transaction_type='SELL')),
+        ]
+        if car:
+            cases.append(('transactions.get_page(car=)', lambda: repo.transactions.get_page(limit=50, car=car)))
+        if customer:
+            cases += [
+                ('customers.get_by_email', lambda: repo.customers.get_by_email(customer.email)),
+                ('sales.get_sales_by_customer', lambda: repo.sales.get_sales_by_customer(customer.id)),
+            ]
+        if dealer:
+            cases += [
+                ('cars.get(owner=...)', lambda: repo.cars.get(owner=dealer)),
+                ('transactions.get_dealer_recent_transactions',
+                 lambda: repo.transactions.get_dealer_recent_transactions(dealer, 20)),
+                ('transactions.get_by_dealer_and_type', lambda: repo.transactions.get_by_dealer_and_type(dealer, 'SELL')),
+                ('transactions.get_dealer_summary', lambda: repo.transactions.get_dealer_summary(dealer)),
+                ('transactions.get_transactions_by_date_range',
+                 lambda: repo.transactions.get_transactions_by_date_range(dealer, now - timedelta(days=7), now)),
+            ]
+        return cases
+
+    def run_cases(self, cases, repeat):
+        results = {}
+        for label, call in cases:
+            best = None
+            with CaptureQueriesContext(connection) as captured:
+                call()
+            for _ in range(repeat):
+                started = time.perf_counter()
+                call()
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            plans = []
+            for query in captured.captured_queries:
+                plans.extend(self.explain(query['sql']))
+            results[label] = (best, plans)
+        return results
+
+    def explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            columns = [col[0] for col in cursor.description]
+            return [
+                ', '.join(f'{name}={value}' for name, value in zip(columns, row) if value is not None)
+                for row in cursor.fetchall()
+            ]
+
+    # ---------- indexes ----------
+
+    def set_indexes(self, enabled: bool):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    if enabled:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+
+    # ---------- data ----------
+
+    def seed(self, options):
+        rng = random.Random(42)
+        now = timezone.now()
+        self.stdout.write('Seeding...')
+
+        users = [User(username=f'{BENCH_PREFIX}{i}') for i in range(options['dealers'])]
+        for user in users:
+            user.set_unusable_password()
+        User.objects.bulk_create(users, batch_size=1000, ignore_conflicts=True)
+        dealer_ids = list(User.objects.filter(username__startswith=BENCH_PREFIX).values_list('id', flat=True))
+        DealerProfile.objects.bulk_create(
+            [DealerProfile(user_id=uid, balance=Decimal(rng.randrange(0, 100000))) for uid in dealer_ids],
+            batch_size=1000, ignore_conflicts=True,
+        )
+
+        Car.objects.bulk_create([
+            Car(make=rng.choice(MAKES), model=f'Model {rng.randrange(50)}', year=rng.randrange(2000, 2026),
+                price=Decimal(rng.randrange(5000, 250000)), in_stock=rng.random() < 0.7,
+                owner_id=rng.choice(dealer_ids) if rng.random() < 0.2 else None)
+            for _ in range(options['cars'])
+        ], batch_size=2000)
+        Customer.objects.bulk_create([
+            Customer(first_name='Bench', last_name=str(i), email=f'bench{i}@example.com', phone='+380000000000')
+            for i in range(options['customers'])
+        ], batch_size=2000)
+        Employee.objects.bulk_create([
+            Employee(first_name='Bench', last_name=str(i), position=rng.choice(POSITIONS), hire_date=now.date())
+            for i in range(50)
+        ])
+
+        car_ids = list(Car.objects.values_list('id', flat=True))
+        customer_ids = list(Customer.objects.values_list('id', flat=True))
+        employee_ids = list(Employee.objects.values_list('id', flat=True))
+        Sale.objects.bulk_create([
+            Sale(car_id=rng.choice(car_ids), customer_id=rng.choice(customer_ids),
+                 employee_id=rng.choice(employee_ids), sale_price=Decimal(rng.randrange(5000, 250000)))
+            for _ in range(options['sales'])
+        ], batch_size=2000)
+
+        types = ['BUY', 'SELL', 'MODIFY']
+        batch = []
+        for i in range(options['transactions']):
+            amount = Decimal(rng.randrange(100, 100000))
+            tx_type = rng.choice(types)
+            batch.append(Transaction(
+                dealer_id=rng.choice(dealer_ids), car_id=rng.choice(car_ids), transaction_type=tx_type,
+                amount=amount if tx_type == 'SELL' else -amount, balance_before=0, balance_after=0,
+            ))
+            if len(batch) == 5000:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        # created_at is auto_now_add: spread the ledger over a year so date filters are selective
+        tx_ids = list(Transaction.objects.filter(dealer_id__in=dealer_ids).order_by('id').values_list('id', flat=True))
+        for days in range(365):
+            Transaction.objects.filter(id__in=tx_ids[days::365]).update(created_at=now - timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS('Seeded'))
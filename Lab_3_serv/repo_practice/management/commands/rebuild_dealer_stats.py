@@ -0,0 +1,37 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from repo_practice.services.repo_service import RepositoryService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DealerStats rollup from the transaction ledger, one chunk of dealers at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='dealers per chunk')
+
+    def handle(self, *args, **options):
+        repo = RepositoryService()
+        chunk_size = options['chunk_size']
+        started = time.perf_counter()
+        last_id = 0
+        dealers = 0
+        written = 0
+
+        while True:
+            dealer_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not dealer_ids:
+                break
+            written += repo.dealer_stats.rebuild_for(dealer_ids)
+            dealers += len(dealer_ids)
+            last_id = dealer_ids[-1]
+            self.stdout.write(f'  {dealers} users scanned, {written} stats rows written')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {written} dealers ({dealers} users scanned) in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from repo_practice.repositories import SalesRollupRepository
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily and monthly sales rollups from the sales table, one month at a time. '
+            'With --incremental only fold in the sales past the high-water mark (e.g. from cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true')
+
+    def handle(self, *args, **options):
+        rollups = SalesRollupRepository()
+        started = time.perf_counter()
+        if options['incremental']:
+            folded = rollups.refresh()
+        else:
+            folded = rollups.rebuild(progress=self.progress)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Folded {folded:,} sales in {elapsed:.2f}s, high-water mark {rollups.get_high_water()}'
+        ))
+
+    def progress(self, month, sales):
+        self.stdout.write(f'  {month:%Y-%m}  {sales:>10,} sales')
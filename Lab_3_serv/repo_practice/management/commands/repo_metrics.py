@@ -0,0 +1,61 @@
+import json
+
+import requests
+from decouple import config
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = ('total_ms', 'calls', 'rows', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+
+
+class Command(BaseCommand):
+    help = ('Dump the repository metrics of a running server (/api/metrics/), hottest methods first. '
+            'The histograms live in the server process, so they are fetched over HTTP.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None, help='default: API_BASE_URL + /metrics/')
+        parser.add_argument('--username', default=None, help='default: API_USERNAME')
+        parser.add_argument('--password', default=None, help='default: API_PASSWORD')
+        parser.add_argument('--sort', choices=SORT_KEYS, default='total_ms')
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument('--json', action='store_true', help='print the raw JSON')
+        parser.add_argument('--reset', action='store_true', help='reset the counters after dumping')
+
+    def handle(self, *args, **options):
+        url = options['url'] or config('API_BASE_URL', default='http://127.0.0.1:8000/api').rstrip('/') + '/metrics/'
+        auth = (options['username'] or config('API_USERNAME'), options['password'] or config('API_PASSWORD'))
+
+        try:
+            response = requests.get(url, auth=auth, timeout=10)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise CommandError(f'Could not fetch {url}: {e}')
+        data = response.json()
+
+        if options['json']:
+            self.stdout.write(json.dumps(data, indent=2))
+        else:
+            self.print_table(data, options['sort'], options['limit'])
+
+        if options['reset']:
+            requests.post(url + 'reset/', auth=auth, timeout=10).raise_for_status()
+            self.stdout.write('Counters reset')
+
+    def print_table(self, data, sort_key, limit):
+        if not data.get('enabled'):
+            self.stdout.write(self.style.WARNING('Repository metrics are disabled on the server'))
+
+        rows = sorted(data.get('repositories', {}).items(), key=lambda item: item[1][sort_key], reverse=True)
+        header = f"{'method':<55} {'calls':>8} {'rows':>10} {'total ms':>11} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>9}"
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        for name, stats in rows[:limit]:
+            self.stdout.write(
+                f"{name:<55} {stats['calls']:>8} {stats['rows']:>10} {stats['total_ms']:>11.1f} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>9.2f}"
+            )
+
+        cache = data.get('cache', {})
+        if cache:
+            self.stdout.write(self.style.MIGRATE_HEADING('repository cache'))
+            for name, stats in cache.items():
+                self.stdout.write(f"{name:<55} hits {stats['hits']:>8}  misses {stats['misses']:>8}  "
+                                  f"ratio {stats['hit_ratio']:.2%}")
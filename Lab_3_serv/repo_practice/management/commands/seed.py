@@ -0,0 +1,102 @@
+import multiprocessing
+import time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+
+from repo_practice.models import (
+    Car, Customer, Employee, Sale, DealerProfile, Transaction, DealerStats, DailySalesRollup, MonthlySalesRollup,
+    RollupWatermark,
+)
+from repo_practice.synthetic import DEALER_PREFIX, DatasetSize, SyntheticDataset, run_chunk
+
+
+class Command(BaseCommand):
+    help = ('Generate a large, deterministic synthetic dataset: cars, customers, employees, dealers, sales '
+            'and a transaction ledger that reconciles with every dealer balance.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, default=100000)
+        parser.add_argument('--customers', type=int, default=50000)
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--dealers', type=int, default=1000)
+        parser.add_argument('--sales', type=int, default=200000)
+        parser.add_argument('--transactions', type=int, default=1000000)
+        parser.add_argument('--trading-cars', type=int, default=50000, help='how many of the cars dealers trade')
+        parser.add_argument('--days', type=int, default=365, help='timestamps are spread over this many past days')
+        parser.add_argument('--rng-seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help='rows per bulk_create')
+        parser.add_argument('--workers', type=int, default=1, help='processes generating rows (1 = in-process)')
+        parser.add_argument('--flush', action='store_true',
+                            help='delete ALL cars, customers, employees, sales (and their rollups), transactions and '
+                                 'dealer profiles first')
+        parser.add_argument('--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be positive')
+        if options['flush']:
+            self.flush(options['interactive'])
+
+        size = DatasetSize(
+            cars=options['cars'], customers=options['customers'], employees=options['employees'],
+            dealers=options['dealers'], sales=options['sales'], transactions=options['transactions'],
+            trading_cars=options['trading_cars'],
+        )
+        self.started = time.perf_counter()
+        self.table_started = {}
+        self.previous_call = self.started
+        self.last_report = 0.0
+
+        pool = None
+        map_chunks = None
+        if options['workers'] > 1:
+            pool = multiprocessing.Pool(options['workers'], initializer=django.setup)
+            map_chunks = lambda generator, jobs: pool.imap(run_chunk, ((generator, job) for job in jobs))
+        try:
+            dataset = SyntheticDataset(size, seed=options['rng_seed'], batch_size=options['batch_size'],
+                                       days=options['days'], progress=self.progress, map_chunks=map_chunks)
+            counts = dataset.generate()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - self.started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)'
+        ))
+        for table, count in counts.items():
+            self.stdout.write(f'  {table:<13} {count:>12,}')
+
+    def progress(self, table, done, total):
+        now = time.perf_counter()
+        # A table's clock starts when the previous step reported, i.e. before its first chunk
+        started = self.table_started.setdefault(table, self.previous_call)
+        self.previous_call = now
+        if done < total and now - self.last_report < 1.0:
+            return
+        self.last_report = now
+        rate = done / (now - started) if now > started else 0.0
+        percent = done / total * 100 if total else 100.0
+        self.stdout.write(f'{table:<13} {done:>12,} / {total:<12,} {percent:5.1f}%  {rate:>10,.0f} rows/s')
+
+    def flush(self, interactive):
+        if interactive:
+            answer = input('This deletes every car, customer, employee, sale, transaction and dealer profile. '
+                           "Type 'yes' to continue: ")
+            if answer != 'yes':
+                raise CommandError('Flush cancelled')
+        # TRUNCATE on MySQL, a plain DELETE per table elsewhere: no per-row cascade collection or signals.
+        # TRUNCATE commits on its own, so an interrupted flush can leave some tables full; run it again.
+        models = (Sale, Transaction, DealerStats, DealerProfile, Car, Customer, Employee,
+                  DailySalesRollup, MonthlySalesRollup, RollupWatermark)
+        tables = [model._meta.db_table for model in models]
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables, reset_sequences=True))
+        # Their rows in the tables above are gone, so the cascade finds nothing left to collect
+        User.objects.filter(username__startswith=DEALER_PREFIX).delete()
+        self.stdout.write('Flushed')
@@ -0,0 +1,145 @@
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, DatabaseError
+from django.db.models import Sum
+
+from repo_practice.models import Car, DealerProfile, Transaction
+from repo_practice.services.trade_engine import TradeEngine, TradeError
+
+STRESS_PREFIX = 'stress_dealer_'
+STRESS_MAKE = 'STRESS'
+
+
+class Command(BaseCommand):
+    help = 'Hammer TradeEngine from many threads and verify the ledger has no double-spends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--dealers', type=int, default=8)
+        parser.add_argument('--cars', type=int, default=20, help='few cars = high contention')
+        parser.add_argument('--trades', type=int, default=250, help='trades per thread')
+        parser.add_argument('--balance', type=Decimal, default=Decimal('1000000.00'))
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='do not delete the stress data afterwards')
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        dealers, car_ids = self.setup(options)
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def worker(index):
+            rng = random.Random(options['seed'] + index)
+            engine = TradeEngine()
+            local = Counter()
+            try:
+                for _ in range(options['trades']):
+                    user = rng.choice(dealers)
+                    car_id = rng.choice(car_ids)
+                    op = rng.choice(('buy', 'buy', 'sell', 'modify'))
+                    try:
+                        if op == 'buy':
+                            engine.buy(user, car_id)
+                        elif op == 'sell':
+                            engine.sell(user, car_id)
+                        else:
+                            engine.modify(user, car_id, Decimal('10.00'), Decimal('15.00'))
+                        local['ok'] += 1
+                    except TradeError as e:
+                        local[type(e).__name__] += 1
+                    except DatabaseError:
+                        local['db_error'] += 1
+            finally:
+                connection.close()
+                with lock:
+                    outcomes.update(local)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        attempted = options['threads'] * options['trades']
+        self.stdout.write(f"Threads: {options['threads']}  dealers: {len(dealers)}  cars: {len(car_ids)}")
+        self.stdout.write(f'Attempted: {attempted}  in {elapsed:.2f}s  ({attempted / elapsed:.1f} attempts/sec)')
+        self.stdout.write(f"Committed trades: {outcomes['ok']}  ({outcomes['ok'] / elapsed:.1f} trades/sec)")
+        for name, count in sorted(outcomes.items()):
+            if name != 'ok':
+                self.stdout.write(f'  rejected {name}: {count}')
+
+        problems = self.verify(dealers, car_ids, options['balance'])
+        if problems:
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(problem))
+            self.stdout.write(self.style.ERROR(f'{len(problems)} consistency violations'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Ledger consistent: 0 double-spends, 0 negative balances'))
+
+        if not options['keep']:
+            self.cleanup()
+
+    def setup(self, options):
+        users = [User(username=f'{STRESS_PREFIX}{i}') for i in range(options['dealers'])]
+        for user in users:
+            user.set_unusable_password()
+        User.objects.bulk_create(users)
+        dealers = list(User.objects.filter(username__startswith=STRESS_PREFIX).order_by('id'))
+        DealerProfile.objects.bulk_create(
+            [DealerProfile(user=user, balance=options['balance']) for user in dealers]
+        )
+
+        rng = random.Random(options['seed'])
+        Car.objects.bulk_create([
+            Car(make=STRESS_MAKE, model=f'Unit {i}', year=2020,
+                price=Decimal(rng.randrange(5000, 40000)), in_stock=True)
+            for i in range(options['cars'])
+        ])
+        car_ids = list(Car.objects.filter(make=STRESS_MAKE).values_list('id', flat=True))
+        return dealers, car_ids
+
+    def verify(self, dealers, car_ids, initial_balance):
+        problems = []
+
+        for user in dealers:
+            balance = DealerProfile.objects.get(user=user).balance
+            ledger = Transaction.objects.filter(dealer=user).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+            if balance < 0:
+                problems.append(f'{user.username}: negative balance {balance}')
+            if balance != initial_balance + ledger:
+                problems.append(f'{user.username}: balance {balance} != {initial_balance} + ledger {ledger}')
+
+        # Replay each car's ledger in commit order: ownership must follow BUY/SELL exactly
+        owners = {car_id: None for car_id in car_ids}
+        ledger = Transaction.objects.filter(car_id__in=car_ids).order_by('id').values_list(
+            'id', 'car_id', 'dealer_id', 'transaction_type'
+        )
+        for tx_id, car_id, dealer_id, tx_type in ledger:
+            owner = owners[car_id]
+            if tx_type == 'BUY' and owner == dealer_id:
+                problems.append(f'transaction {tx_id}: dealer {dealer_id} bought car {car_id} twice')
+            elif tx_type == 'BUY' and owner is not None:
+                problems.append(f'transaction {tx_id}: dealer {dealer_id} bought car {car_id} owned by {owner}')
+            elif tx_type in ('SELL', 'MODIFY') and owner != dealer_id:
+                problems.append(f'transaction {tx_id}: {tx_type} of car {car_id} by non-owner {dealer_id}')
+            if tx_type == 'BUY':
+                owners[car_id] = dealer_id
+            elif tx_type == 'SELL':
+                owners[car_id] = None
+
+        for car_id, owner_id in Car.objects.filter(id__in=car_ids).values_list('id', 'owner_id'):
+            if owners[car_id] != owner_id:
+                problems.append(f'car {car_id}: owner {owner_id} but ledger says {owners[car_id]}')
+        return problems
+
+    def cleanup(self):
+        Car.objects.filter(make=STRESS_MAKE).delete()
+        User.objects.filter(username__startswith=STRESS_PREFIX).delete()
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0002_car_owner_dealerprofile_transaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealerStats',
+            fields=[
+                ('dealer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dealer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('buy_count', models.PositiveIntegerField(default=0)),
+                ('sell_count', models.PositiveIntegerField(default=0)),
+                ('modify_count', models.PositiveIntegerField(default=0)),
+                ('last_trade_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'dealer_stats',
+                'managed': True,
+            },
+        ),
+    ]
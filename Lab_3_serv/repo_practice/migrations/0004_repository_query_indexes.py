@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0003_dealerstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['in_stock'], name='car_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['make', 'model'], name='car_make_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['price'], name='car_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['year'], name='car_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['email'], name='customer_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dealerprofile',
+            index=models.Index(fields=['balance'], name='dealer_profile_balance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['position'], name='employee_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sale_date'], name='sale_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['dealer', 'created_at'], name='tx_dealer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['dealer', 'transaction_type', 'amount'], name='tx_dealer_type_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_type', 'created_at'], name='tx_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created_at'], name='tx_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0004_repository_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['dealer', 'transaction_type', 'created_at'], name='tx_dealer_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['car', 'created_at'], name='tx_car_created_idx'),
+        ),
+    ]
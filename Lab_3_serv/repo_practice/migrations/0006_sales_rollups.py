@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0005_transaction_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('high_water', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_watermarks',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateField()),
+                ('make', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=50)),
+                ('sale_count', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='repo_practice.employee')),
+            ],
+            options={
+                'db_table': 'sales_rollup_daily',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'make', 'model', 'employee'), name='sales_daily_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateField()),
+                ('make', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=50)),
+                ('sale_count', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='repo_practice.employee')),
+            ],
+            options={
+                'db_table': 'sales_rollup_monthly',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'make', 'model', 'employee'), name='sales_monthly_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0006_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='vin',
+            field=models.CharField(blank=True, max_length=17, null=True, unique=True),
+        ),
+    ]
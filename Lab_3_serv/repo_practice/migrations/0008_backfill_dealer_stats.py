@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Max, Q, Sum
+
+CHUNK_SIZE = 1000
+
+
+def backfill_dealer_stats(apps, schema_editor):
+    """
+    0003 created dealer_stats empty: fill it from the ledger, so dealers who
+    traded before the rollup existed do not read zeros. Rows written since are
+    recomputed too, the ledger is the source of truth.
+    """
+    Transaction = apps.get_model('repo_practice', 'Transaction')
+    DealerStats = apps.get_model('repo_practice', 'DealerStats')
+
+    last_id = 0
+    while True:
+        dealer_ids = list(
+            Transaction.objects.filter(dealer_id__gt=last_id).order_by('dealer_id')
+            .values_list('dealer_id', flat=True).distinct()[:CHUNK_SIZE]
+        )
+        if not dealer_ids:
+            return
+        aggregates = (
+            Transaction.objects.filter(dealer_id__in=dealer_ids).order_by().values('dealer_id').annotate(
+                total_spent=Sum('amount', filter=Q(amount__lt=0), default=Decimal('0.00')),
+                total_earned=Sum('amount', filter=Q(amount__gt=0), default=Decimal('0.00')),
+                buy_count=Count('id', filter=Q(transaction_type='BUY')),
+                sell_count=Count('id', filter=Q(transaction_type='SELL')),
+                modify_count=Count('id', filter=Q(transaction_type='MODIFY')),
+                last_trade_at=Max('created_at'),
+            )
+        )
+        DealerStats.objects.filter(pk__in=dealer_ids).delete()
+        DealerStats.objects.bulk_create([
+            DealerStats(net_profit=row['total_spent'] + row['total_earned'], **row) for row in aggregates
+        ])
+        last_id = dealer_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0007_car_vin'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_dealer_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+WATERMARK = 'sales'
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    """
+    0006 created the rollups empty: build them here, a month at a time, so the
+    report never has to build them on a GET. Same result as
+    SalesRollupRepository.rebuild(), skipped if the rollups were built already.
+    """
+    Sale = apps.get_model('repo_practice', 'Sale')
+    DailySalesRollup = apps.get_model('repo_practice', 'DailySalesRollup')
+    MonthlySalesRollup = apps.get_model('repo_practice', 'MonthlySalesRollup')
+    RollupWatermark = apps.get_model('repo_practice', 'RollupWatermark')
+
+    if RollupWatermark.objects.filter(name=WATERMARK, high_water__isnull=False).exists():
+        return
+    lag = timedelta(seconds=getattr(settings, 'SALES_ROLLUP', {}).get('LAG_SECONDS', 300))
+    upto = timezone.now() - lag
+
+    DailySalesRollup.objects.all().delete()
+    MonthlySalesRollup.objects.all().delete()
+    first = Sale.objects.filter(sale_date__lte=upto).aggregate(first=Min('sale_date'))['first']
+    if first is not None:
+        month = timezone.localtime(first).date().replace(day=1)
+        while day_start(month) <= upto:
+            days = (
+                Sale.objects
+                .filter(sale_date__lte=upto, sale_date__gte=day_start(month), sale_date__lt=day_start(next_month(month)))
+                .values('employee_id', bucket=TruncDate('sale_date'), make=F('car__make'), model=F('car__model'))
+                .annotate(sale_count=Count('id'), total_revenue=Sum('sale_price'),
+                          min_price=Min('sale_price'), max_price=Max('sale_price'))
+                .order_by()
+            )
+            DailySalesRollup.objects.bulk_create((DailySalesRollup(**row) for row in days), batch_size=1000)
+            totals = (
+                DailySalesRollup.objects
+                .filter(bucket__gte=month, bucket__lt=next_month(month))
+                .values('make', 'model', 'employee_id')
+                .annotate(sale_count=Sum('sale_count'), total_revenue=Sum('total_revenue'),
+                          min_price=Min('min_price'), max_price=Max('max_price'))
+                .order_by()
+            )
+            MonthlySalesRollup.objects.bulk_create(
+                (MonthlySalesRollup(bucket=month, **row) for row in totals), batch_size=1000)
+            month = next_month(month)
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'high_water': upto})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0008_backfill_dealer_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repo_practice', '0009_backfill_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='tx_dealer_type_amount_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='tx_type_created_idx',
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='car',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='repo_practice.car'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='dealer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
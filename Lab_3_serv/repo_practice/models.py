@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 
 class Car(models.Model):
+    # Natural key of supplier inventory (import_cars upserts on it); NULL for cars entered by hand
+    vin = models.CharField(max_length=17, unique=True, null=True, blank=True)
     make = models.CharField(max_length=50)
     model = models.CharField(max_length=50)
     year = models.IntegerField()
@@ -13,6 +15,12 @@ class Car(models.Model):
     class Meta:
         db_table = 'cars'
         managed = True
+        indexes = [
+            models.Index(fields=['in_stock'], name='car_in_stock_idx'),            # get_available_cars, dashboard
+            models.Index(fields=['make', 'model'], name='car_make_model_idx'),     # get_cars_by_make, (make, model) lookups
+            models.Index(fields=['price'], name='car_price_idx'),                  # premium cars, most expensive / cheapest
+            models.Index(fields=['year'], name='car_year_idx'),                    # get_cars_by_year_range
+        ]
 
     def __str__(self):
         return f"{self.make} {self.model}"
@@ -27,6 +35,9 @@ class Customer(models.Model):
     class Meta:
         db_table = 'customers'
         managed = True
+        indexes = [
+            models.Index(fields=['email'], name='customer_email_idx'),             # get_by_email
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -40,6 +51,9 @@ class Employee(models.Model):
     class Meta:
         db_table = 'employees'
         managed = True
+        indexes = [
+            models.Index(fields=['position'], name='employee_position_idx'),       # get_by_position
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -54,6 +68,9 @@ class Sale(models.Model):
     class Meta:
         db_table = 'sales'
         managed = True
+        indexes = [
+            models.Index(fields=['sale_date'], name='sale_date_idx'),              # date-range reports
+        ]
 
     def __str__(self):
         return f"Sale #{self.id}"
@@ -67,6 +84,9 @@ class DealerProfile(models.Model):
     class Meta:
         db_table = 'dealer_profiles'
         managed = True
+        indexes = [
+            models.Index(fields=['balance'], name='dealer_profile_balance_idx'),   # high / low balance dealers
+        ]
 
     def __str__(self):
         return f"{self.user.username} - Balance: ${self.balance}"
@@ -78,8 +98,9 @@ class Transaction(models.Model):
         ('MODIFY', 'Modify Car'),
     ]
 
-    dealer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions')
-    car = models.ForeignKey(Car, on_delete=models.SET_NULL, null=True, blank=True)
+    # No single-column FK indexes: tx_dealer_created_idx and tx_car_created_idx lead with these columns
+    dealer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions', db_index=False)
+    car = models.ForeignKey(Car, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     description = models.TextField(blank=True)
@@ -91,6 +112,86 @@ class Transaction(models.Model):
         db_table = 'transactions'
         managed = True
         ordering = ['-created_at']
+        indexes = [
+            # get_by_dealer / recent / date range, newest first (InnoDB appends id, so keyset pages are covered too)
+            models.Index(fields=['dealer', 'created_at'], name='tx_dealer_created_idx'),
+            # get_by_dealer_and_type and ?dealer=&type= pages, newest first
+            models.Index(fields=['dealer', 'transaction_type', 'created_at'], name='tx_dealer_type_created_idx'),
+            models.Index(fields=['car', 'created_at'], name='tx_car_created_idx'),  # ?car= and get_by_car
+            # recent transactions and list pages; ?type= alone matches a third of the ledger, so
+            # walking this index and skipping the other types beats a (type, created_at) index
+            models.Index(fields=['created_at'], name='tx_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.dealer.username} - {self.transaction_type} - ${self.amount}"
+
+
+class DealerStats(models.Model):
+    """Per-dealer rollup of the transaction ledger, maintained on every Transaction insert"""
+    dealer = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='dealer_stats')
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    buy_count = models.PositiveIntegerField(default=0)
+    sell_count = models.PositiveIntegerField(default=0)
+    modify_count = models.PositiveIntegerField(default=0)
+    last_trade_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'dealer_stats'
+        managed = True
+
+    def __str__(self):
+        return f"{self.dealer.username} - Net: ${self.net_profit}"
+
+
+class SalesRollup(models.Model):
+    """Sales of one (bucket, make, model, employee); maintained by SalesRollupRepository"""
+    bucket = models.DateField()  # the day, or the first day of the month
+    make = models.CharField(max_length=50)
+    model = models.CharField(max_length=50)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='+')
+    sale_count = models.PositiveIntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.bucket} {self.make} {self.model} - {self.sale_count} sales"
+
+
+class DailySalesRollup(SalesRollup):
+    class Meta:
+        db_table = 'sales_rollup_daily'
+        managed = True
+        constraints = [
+            # Also the index of the report's bucket range scans
+            models.UniqueConstraint(fields=['bucket', 'make', 'model', 'employee'], name='sales_daily_key'),
+        ]
+
+
+class MonthlySalesRollup(SalesRollup):
+    class Meta:
+        db_table = 'sales_rollup_monthly'
+        managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'make', 'model', 'employee'], name='sales_monthly_key'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """How far a rollup has folded its source table in: everything up to high_water is in"""
+    name = models.CharField(max_length=50, primary_key=True)
+    high_water = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_watermarks'
+        managed = True
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water}"
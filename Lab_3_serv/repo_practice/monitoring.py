@@ -0,0 +1,122 @@
+import functools
+import os
+import re
+import time
+from urllib.parse import urlparse
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated
+
+from .models import Transaction
+
+# Metrics are thread-safe. With PROMETHEUS_MULTIPROC_DIR set (see settings) every worker process
+# writes its values to mmap files in that directory and /metrics merges all of them.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_LATENCY = Histogram(
+    'lab3_http_request_duration_seconds', 'API request latency per DRF route',
+    ['route', 'method', 'status'], buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'lab3_db_queries_per_request', 'SQL statements run by one request, per DRF route',
+    ['route'], buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250, 1000),
+)
+TRADES = Counter(
+    'lab3_trades_total', 'Trades by transaction type and outcome (ok or the error class)',
+    ['type', 'outcome'],
+)
+CACHE_REQUESTS = Counter(
+    'lab3_repository_cache_requests_total', 'Repository cache lookups by method and result',
+    ['method', 'result'],
+)
+API_CLIENT_LATENCY = Histogram(
+    'lab3_api_client_request_duration_seconds', 'Outbound API manager request latency per endpoint',
+    ['method', 'endpoint', 'outcome'], buckets=LATENCY_BUCKETS,
+)
+
+for _type, _ in Transaction.TRANSACTION_TYPES:
+    TRADES.labels(_type, 'ok')
+
+
+def route_of(request) -> str:
+    """'CarViewSet.list', 'DealerViewSet.buy_car', ... or the URL name of a plain Django view"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is not None:
+        actions = getattr(match.func, 'actions', None) or {}
+        handler = actions.get(request.method.lower(), request.method.lower())
+        return f'{view_class.__name__}.{handler}'
+    return match.view_name or match.route
+
+
+class PrometheusMiddleware:
+    """Request latency and DB query count per route; sits outside QueryBudgetMiddleware to read its report"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        route = route_of(request)
+        HTTP_LATENCY.labels(route, request.method, str(response.status_code)).observe(time.perf_counter() - started)
+        report = getattr(request, 'query_report', None)
+        if report is not None:
+            DB_QUERIES.labels(route).observe(report.count)
+        return response
+
+
+@api_view(['GET'])
+@authentication_classes([BasicAuthentication])
+@permission_classes([IsAuthenticated])
+def metrics_view(request):
+    """GET /metrics in the Prometheus text exposition format (basic_auth in the scrape config)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def counted_trade(transaction_type: str):
+    """Count every call of a trade method under lab3_trades_total"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                TRADES.labels(transaction_type, type(e).__name__).inc()
+                raise
+            TRADES.labels(transaction_type, 'ok').inc()
+            return result
+        return wrapper
+    return decorator
+
+
+_ID_SEGMENT_RE = re.compile(r'/\d+(?=/|$)')
+
+
+def observe_api_request(method: str, url: str, status_code, seconds: float):
+    """
+    One round trip of the API managers' transport (gather, batch and full-list reads are
+    the sum of theirs). outcome: ok, the HTTP status of an error answer, or failed (no answer).
+    """
+    endpoint = _ID_SEGMENT_RE.sub('/:id', urlparse(url).path)
+    if status_code is None:
+        outcome = 'failed'
+    elif status_code < 400:
+        outcome = 'ok'
+    else:
+        outcome = str(status_code)
+    API_CLIENT_LATENCY.labels(method.upper(), endpoint, outcome).observe(seconds)
@@ -0,0 +1,163 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL shape: literals and IN lists replaced with ?, so the same query with other ids compares equal"""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = _IN_LIST_RE.sub('IN (...)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+@dataclass
+class QueryRecord:
+    sql: str
+    duration_ms: float
+
+
+@dataclass
+class QueryReport:
+    """Every statement run while a QueryRecorder was active"""
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def time_ms(self) -> float:
+        return sum(query.duration_ms for query in self.queries)
+
+    def shapes(self) -> Counter:
+        return Counter(normalize_sql(query.sql) for query in self.queries)
+
+    def repeated_shapes(self, threshold: int) -> List[tuple]:
+        """(shape, count) of every shape run at least threshold times: the N+1 suspects"""
+        return [(shape, count) for shape, count in self.shapes().most_common() if count >= threshold]
+
+
+@dataclass
+class Budget:
+    queries: Optional[int] = None
+    time_ms: Optional[float] = None
+    repeated_shape: Optional[int] = None
+
+    def violations(self, report: QueryReport) -> List[str]:
+        problems = []
+        if self.queries is not None and report.count > self.queries:
+            problems.append(f'{report.count} queries > budget {self.queries}')
+        if self.time_ms is not None and report.time_ms > self.time_ms:
+            problems.append(f'{report.time_ms:.1f} ms in the database > budget {self.time_ms} ms')
+        if self.repeated_shape is not None:
+            for shape, count in report.repeated_shapes(self.repeated_shape):
+                problems.append(f'N+1: {count}x {shape[:200]}')
+        return problems
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """connection.execute_wrapper() hook that times every statement"""
+
+    def __init__(self):
+        self.report = QueryReport()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.report.queries.append(QueryRecord(sql, (time.perf_counter() - started) * 1000))
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self.report
+
+
+def get_config() -> dict:
+    return getattr(settings, 'QUERY_BUDGET', None) or {}
+
+
+def budget_for(path: str) -> Budget:
+    """First ENDPOINTS entry whose regex matches the path, on top of DEFAULT"""
+    config = get_config()
+    values = dict(config.get('DEFAULT', {}))
+    for pattern, overrides in config.get('ENDPOINTS', []):
+        if re.search(pattern, path):
+            values.update(overrides)
+            break
+    return Budget(**values)
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts and times the SQL of every request, adds X-DB-Queries / X-DB-Time (ms)
+    and checks the per-URL budget from settings.QUERY_BUDGET.
+    Over budget: logged in DEBUG, QueryBudgetExceeded when QUERY_BUDGET['RAISE'] is set (tests).
+    Queries run while a streamed response is being consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder.record() as report:
+            response = self.get_response(request)
+        request.query_report = report
+
+        response['X-DB-Queries'] = str(report.count)
+        response['X-DB-Time'] = f'{report.time_ms:.2f}'
+
+        config = get_config()
+        if not (settings.DEBUG or config.get('RAISE')):
+            return response
+
+        problems = budget_for(request.path).violations(report)
+        if problems:
+            message = f'{request.method} {request.path} over query budget: ' + '; '.join(problems)
+            if config.get('RAISE'):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+@contextmanager
+def assert_query_budget(queries: Optional[int] = None, time_ms: Optional[float] = None,
+                        repeated_shape: Optional[int] = None):
+    """
+    Test helper:
+
+        with assert_query_budget(queries=5, repeated_shape=3):
+            client.get('/api/transactions/')
+
+    Raises QueryBudgetExceeded on exit when the block went over budget.
+    """
+    recorder = QueryRecorder()
+    with recorder.record() as report:
+        yield report
+    problems = Budget(queries, time_ms, repeated_shape).violations(report)
+    if problems:
+        raise QueryBudgetExceeded('; '.join(problems))
@@ -1,18 +1,24 @@
-from .base_repo import BaseRepository
+from .base_repo import BaseRepository, FetchPlan, Page
 from .car_repo import CarRepository
 from .customer_repo import CustomerRepository
 from .employee_repo import EmployeeRepository
 from .sale_repo import SaleRepository
 from .dealer_profile_repo import DealerProfileRepository
 from .transaction_repo import TransactionRepository
+from .dealer_stats_repo import DealerStatsRepository
+from .sales_rollup_repo import SalesRollupRepository
 
 __all__ = [
     'BaseRepository',
+    'FetchPlan',
+    'Page',
     'CarRepository',
     'CustomerRepository',
     'EmployeeRepository',
     'SaleRepository',
     'DealerProfileRepository',
     'TransactionRepository',
+    'DealerStatsRepository',
+    'SalesRollupRepository',
 ]
 
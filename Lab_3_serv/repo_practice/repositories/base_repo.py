@@ -1,11 +1,65 @@
+import base64
+import binascii
+import copy
+import inspect
+import json
 from abc import ABC, abstractmethod
-from typing import List, Optional, TypeVar, Generic
-from django.db import models
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type, TypeVar, Generic, Tuple, Union
+from django.core.exceptions import ValidationError
+from django.db import connection, models
+from django.db.models import Q
+from django.utils import timezone
+from .instrumentation import instrument
 
 T = TypeVar('T', bound=models.Model)
 
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class Page(Generic[T]):
+    """One keyset page of rows plus opaque cursors to its neighbours"""
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class FetchPlan:
+    """Relations and columns one kind of read needs, applied to every read queryset of a repository"""
+    select_related: Tuple[str, ...] = ()
+    prefetch_related: Tuple[str, ...] = ()
+    only: Tuple[str, ...] = ()
+
+    def apply(self, queryset: models.QuerySet) -> models.QuerySet:
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
 
 class BaseRepository(Generic[T], ABC):
+    # Stable, unique ordering used for keyset pagination. The last field must be unique.
+    page_ordering: Tuple[str, ...] = ('id',)
+    # Named fetch plans. 'default' (if declared) applies until with_plan() picks another one.
+    fetch_plans: Dict[str, FetchPlan] = {}
+    fetch_plan: str = 'default'
+
+    def __init_subclass__(cls, **kwargs):
+        # Instrumentation hook: every public method of a concrete repository reports to
+        # instrumentation.metrics (calls, rows, latency) while metrics are enabled.
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(vars(cls).items()):
+            if name.startswith('_') or not inspect.isfunction(attr) or getattr(attr, '__instrumented__', False):
+                continue
+            setattr(cls, name, instrument(f'{cls.__name__}.{name}', attr))
+
     @abstractmethod
     def get_all(self) -> List[T]:
         pass
@@ -14,6 +68,14 @@ class BaseRepository(Generic[T], ABC):
     def get_by_id(self, id: int) -> Optional[T]:
         pass
 
+    @abstractmethod
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[T]:
+        pass
+
+    @abstractmethod
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[T]:
+        pass
+
     @abstractmethod
     def create(self, **kwargs) -> T:
         pass
@@ -22,6 +84,265 @@ class BaseRepository(Generic[T], ABC):
     def update(self, id: int, **kwargs) -> Optional[T]:
         pass
 
+    @abstractmethod
+    def patch(self, target: Union[int, T], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[T], bool]:
+        pass
+
     @abstractmethod
     def delete(self, id: int) -> bool:
         pass
+
+    @abstractmethod
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[T]:
+        pass
+
+    @abstractmethod
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        pass
+
+    @abstractmethod
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        pass
+
+    # ---------- fetch plans ----------
+
+    def with_plan(self, name: str) -> 'BaseRepository[T]':
+        """Copy of this repository whose reads follow the named fetch plan"""
+        if name != 'default' and name not in self.fetch_plans:
+            raise ValueError(f'Unknown fetch plan {name!r} for {type(self).__name__}')
+        planned = copy.copy(self)
+        planned.fetch_plan = name
+        return planned
+
+    def _planned(self, queryset: models.QuerySet) -> models.QuerySet:
+        plan = self.fetch_plans.get(self.fetch_plan)
+        return plan.apply(queryset) if plan else queryset
+
+    # ---------- single-statement updates ----------
+
+    def _patch(self, model: Type[T], target: Union[int, T], expected: Optional[Dict[str, Any]],
+               refresh: bool, changes: Dict[str, Any]) -> Union[Optional[T], bool]:
+        """
+        UPDATE <table> SET <only the given columns> WHERE pk = ... [AND <expected>]
+
+        target is an id or an instance already in hand. expected is a
+        precondition (e.g. {'balance': old_balance} or {'owner': None}); when
+        it does not hold no row is written.
+
+        Returns:
+            instance target -> the same instance with the changes applied, or None
+            id + refresh    -> the re-read row, or None
+            id              -> True if a row was written
+        """
+        instance = target if isinstance(target, model) else None
+        pk = instance.pk if instance is not None else target
+
+        values = dict(changes)
+        now = timezone.now()
+        for model_field in model._meta.concrete_fields:
+            if getattr(model_field, 'auto_now', False):
+                values.setdefault(model_field.name, now)
+
+        queryset = model.objects.filter(pk=pk)
+        if expected:
+            queryset = queryset.filter(**expected)
+        written = queryset.update(**values) if values else int(queryset.exists())
+
+        if not written:
+            return None if instance is not None or refresh else False
+        if instance is not None:
+            for name, value in values.items():
+                setattr(instance, name, value)
+            return instance
+        if refresh:
+            return self.get_by_id(pk)
+        return True
+
+    # ---------- bulk helpers ----------
+
+    def _bulk_create(self, model: Type[T], items: List[dict], batch_size: int) -> List[T]:
+        """One multi-row INSERT per batch. On MySQL the returned objects have no pk set."""
+        return model.objects.bulk_create([model(**item) for item in items], batch_size=batch_size)
+
+    def _bulk_update(self, model: Type[T], items: List[dict], batch_size: int) -> int:
+        """
+        Update rows by id without fetching them first.
+        Items are grouped by the set of fields they change, so a row is never
+        overwritten with defaults for columns the caller did not send.
+        """
+        auto_now_fields = [f.name for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        now = timezone.now()
+
+        groups: Dict[Tuple[str, ...], List[T]] = {}
+        for item in items:
+            values = dict(item)
+            pk = values.pop('id')
+            for name in auto_now_fields:
+                values.setdefault(name, now)
+            fields = tuple(sorted(values))
+            if not fields:
+                continue
+            groups.setdefault(fields, []).append(model(pk=pk, **values))
+
+        updated = 0
+        for fields, objs in groups.items():
+            updated += model.objects.bulk_update(objs, fields, batch_size=batch_size)
+        return updated
+
+    def _bulk_upsert(self, model: Type[T], items: List[dict], key: str, batch_size: int) -> Tuple[int, int]:
+        """
+        Multi-row INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE on a unique
+        natural key: rows whose key exists get the sent fields overwritten,
+        the rest are inserted. A key repeated in items keeps its last row.
+        Returns (inserted, updated), counted with one indexed key lookup per batch.
+        """
+        latest = {item[key]: item for item in items}
+        groups: Dict[Tuple[str, ...], List[T]] = {}
+        for item in latest.values():
+            groups.setdefault(tuple(sorted(item)), []).append(model(**item))
+
+        keys = list(latest)
+        existing = 0
+        for start in range(0, len(keys), batch_size):
+            existing += model.objects.filter(**{f'{key}__in': keys[start:start + batch_size]}).count()
+
+        # MySQL cannot name the conflict target: ON DUPLICATE KEY UPDATE fires on any unique key
+        target = [key] if connection.features.supports_update_conflicts_with_target else None
+        for fields, objs in groups.items():
+            update_fields = [name for name in fields if name != key]
+            if not update_fields:
+                model.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+                continue
+            model.objects.bulk_create(objs, batch_size=batch_size, update_conflicts=True,
+                                      unique_fields=target, update_fields=update_fields)
+        return len(latest) - existing, existing
+
+    def _bulk_delete(self, model: Type[T], ids: Iterable[int], batch_size: int) -> int:
+        """DELETE ... WHERE pk IN (...) per batch, without loading rows first"""
+        ids = list(ids)
+        deleted = 0
+        for start in range(0, len(ids), batch_size):
+            _, per_model = model.objects.filter(pk__in=ids[start:start + batch_size]).delete()
+            deleted += per_model.get(model._meta.label, 0)
+        return deleted
+
+    # ---------- keyset pagination helpers ----------
+
+    def _paginate(self, queryset: models.QuerySet, cursor: Optional[str], limit: int) -> Page[T]:
+        """
+        Keyset (seek) pagination over page_ordering.
+        Each page is one indexed range scan of limit + 1 rows, so the cost
+        does not grow with the page number the way OFFSET does.
+        """
+        if limit < 1:
+            raise ValueError('limit must be a positive integer')
+
+        ordering = self.page_ordering
+        backwards = False
+        if cursor:
+            direction, values = self._decode_cursor(queryset.model, cursor)
+            backwards = direction == 'p'
+            queryset = queryset.filter(self._seek_filter(ordering, values, backwards))
+
+        order_by = [self._flip(f) for f in ordering] if backwards else list(ordering)
+        rows = list(queryset.order_by(*order_by)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        page = Page(items=rows)
+        if rows:
+            if (not backwards and has_more) or (backwards and cursor):
+                page.next_cursor = self._encode_cursor('n', rows[-1])
+            if (backwards and has_more) or (not backwards and cursor):
+                page.prev_cursor = self._encode_cursor('p', rows[0])
+        return page
+
+    def _iterate(self, queryset: models.QuerySet, chunk_size: int) -> Iterator[T]:
+        """
+        Yield rows one keyset chunk at a time.
+        Only chunk_size model instances are alive at once. QuerySet.iterator()
+        is not enough on its own here: the MySQL driver buffers the whole
+        result set client-side, so we seek in bounded slices instead.
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+
+        queryset = queryset.order_by(*self.page_ordering)
+        last_key = None
+        while True:
+            chunk = queryset
+            if last_key is not None:
+                chunk = chunk.filter(self._seek_filter(self.page_ordering, last_key, False))
+            rows = list(chunk[:chunk_size])
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last_key = self._key_of(rows[-1])
+
+    def _iterate_values(self, queryset: models.QuerySet, fields: Tuple[str, ...], chunk_size: int) -> Iterator[tuple]:
+        """
+        _iterate() over plain value tuples (fields in order, joins allowed):
+        no model instances are built, for exports of millions of rows.
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+
+        key_fields = [f.lstrip('-') for f in self.page_ordering]
+        selected = list(fields) + [f for f in key_fields if f not in fields]
+        key_positions = [selected.index(f) for f in key_fields]
+        width = len(fields)
+        queryset = queryset.order_by(*self.page_ordering).values_list(*selected)
+        last_key = None
+        while True:
+            chunk = queryset
+            if last_key is not None:
+                chunk = chunk.filter(self._seek_filter(self.page_ordering, last_key, False))
+            rows = list(chunk[:chunk_size])
+            for row in rows:
+                yield row[:width]
+            if len(rows) < chunk_size:
+                return
+            last_key = [rows[-1][i] for i in key_positions]
+
+    def _key_of(self, obj: T) -> list:
+        return [getattr(obj, f.lstrip('-')) for f in self.page_ordering]
+
+    def _encode_cursor(self, direction: str, obj: T) -> str:
+        values = self._key_of(obj)
+        payload = json.dumps({'d': direction, 'v': values}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode_cursor(self, model, cursor: str) -> Tuple[str, list]:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, raw_values = payload['d'], payload['v']
+            if direction not in ('n', 'p') or len(raw_values) != len(self.page_ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(f.lstrip('-')).to_python(v)
+                for f, v in zip(self.page_ordering, raw_values)
+            ]
+        except (ValueError, TypeError, KeyError, binascii.Error, ValidationError) as e:
+            raise ValueError('Invalid cursor') from e
+        return direction, values
+
+    @staticmethod
+    def _flip(field_name: str) -> str:
+        return field_name[1:] if field_name.startswith('-') else f'-{field_name}'
+
+    @staticmethod
+    def _seek_filter(ordering: Tuple[str, ...], values: list, backwards: bool) -> Q:
+        """(a, b) > (x, y)  ->  a > x OR (a = x AND b > y), honouring per-field direction"""
+        condition = Q()
+        for i in reversed(range(len(ordering))):
+            name = ordering[i].lstrip('-')
+            descending = ordering[i].startswith('-') != backwards
+            step = Q(**{f'{name}__lt' if descending else f'{name}__gt': values[i]})
+            if i < len(ordering) - 1:
+                step |= Q(**{name: values[i]}) & condition
+            condition = step
+        return condition
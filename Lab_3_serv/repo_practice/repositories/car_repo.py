@@ -1,9 +1,17 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from django.db import transaction as db_transaction
 from ..models import Car
-from .base_repo import BaseRepository
+from .base_repo import BaseRepository, Page, DEFAULT_PAGE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_BATCH_SIZE
+from .sales_rollup_repo import SalesRollupRepository
+
+# Car columns copied into the sales rollups: changing them recomputes the days the car was sold on
+ROLLUP_FIELDS = frozenset({'make', 'model'})
 
 
 class CarRepository(BaseRepository[Car]):
+    def __init__(self):
+        self.rollups = SalesRollupRepository()
+
     def get(self, id: Optional[int] = None, **filters) -> Optional[Car] | List[Car]:
         if id is not None:
             try:
@@ -23,6 +31,19 @@ class CarRepository(BaseRepository[Car]):
         except Car.DoesNotExist:
             return None
 
+    def get_uncached(self, id: int) -> Optional[Car]:
+        """
+        get_by_id that always reads the database, even when get_by_id is served from the
+        repository cache. TradeEngine reads its preconditions (owner, price) here.
+        """
+        return Car.objects.filter(id=id).first()
+
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[Car]:
+        return self._paginate(Car.objects.all(), cursor, limit)
+
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[Car]:
+        return self._iterate(Car.objects.filter(**filters), chunk_size)
+
     def create(self, **kwargs) -> Car:
         return Car.objects.create(**kwargs)
 
@@ -30,26 +51,79 @@ class CarRepository(BaseRepository[Car]):
         return self.create(**kwargs)
 
     def update(self, id: int, **kwargs) -> Optional[Car]:
-        try:
-            car = Car.objects.get(id=id)
-            for key, value in kwargs.items():
-                setattr(car, key, value)
-            car.save()
-            return car
-        except Car.DoesNotExist:
-            return None
+        return self.patch(id, refresh=True, **kwargs)
+
+    def patch(self, target: Union[int, Car], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[Car], bool]:
+        if ROLLUP_FIELDS.isdisjoint(changes):
+            return self._patch(Car, target, expected, refresh, changes)
+        with db_transaction.atomic():
+            days = self.rollups.sale_days(car_id=target.pk if isinstance(target, Car) else target)
+            result = self._patch(Car, target, expected, refresh, changes)
+            if result:
+                self.rollups.recompute_days(days)
+        return result
 
     def delete(self, id: int) -> bool:
-        try:
-            car = Car.objects.get(id=id)
-            car.delete()
-            return True
-        except Car.DoesNotExist:
-            return False
+        with db_transaction.atomic():
+            # Deleting the car deletes its sales (CASCADE)
+            days = self.rollups.sale_days(car_id=id)
+            if not Car.objects.filter(id=id).delete()[0]:
+                return False
+            self.rollups.recompute_days(days)
+        return True
+
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Car]:
+        return self._bulk_create(Car, items, batch_size)
+
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        renamed = [item['id'] for item in items if not ROLLUP_FIELDS.isdisjoint(item)]
+        if not renamed:
+            return self._bulk_update(Car, items, batch_size)
+        with db_transaction.atomic():
+            days = self.rollups.sale_days(batch_size, car_id__in=renamed)
+            updated = self._bulk_update(Car, items, batch_size)
+            self.rollups.recompute_days(days)
+        return updated
+
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        ids = list(ids)
+        with db_transaction.atomic():
+            days = self.rollups.sale_days(batch_size, car_id__in=ids)
+            deleted = self._bulk_delete(Car, ids, batch_size)
+            self.rollups.recompute_days(days)
+        return deleted
+
+    def bulk_upsert(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[int, int]:
+        """Insert cars by VIN, overwriting the sent fields of VINs already in stock. Returns (inserted, updated)"""
+        with db_transaction.atomic():
+            renamed = self._renamed_by_vin(items, batch_size)
+            days = self.rollups.sale_days(batch_size, car_id__in=renamed) if renamed else set()
+            counts = self._bulk_upsert(Car, items, 'vin', batch_size)
+            self.rollups.recompute_days(days)
+        return counts
+
+    @staticmethod
+    def _renamed_by_vin(items: List[dict], batch_size: int) -> List[int]:
+        """Ids of existing cars whose make or model an upsert changes"""
+        sent = {item['vin']: item for item in items if not ROLLUP_FIELDS.isdisjoint(item)}
+        vins = list(sent)
+        renamed = []
+        for start in range(0, len(vins), batch_size):
+            for car_id, vin, make, model in Car.objects.filter(vin__in=vins[start:start + batch_size]).values_list(
+                    'id', 'vin', 'make', 'model'):
+                item = sent[vin]
+                if item.get('make', make) != make or item.get('model', model) != model:
+                    renamed.append(car_id)
+        return renamed
 
     def get_available_cars(self) -> List[Car]:
         return list(Car.objects.filter(in_stock=True))
 
+    def get_unowned_in_stock(self, limit: int = 10) -> List[Car]:
+        """In-stock cars nobody owns, i.e. the ones any dealer can buy, first N by id"""
+        return list(Car.objects.filter(in_stock=True, owner__isnull=True).order_by('id')[:limit])
+
     def get_cars_by_make(self, make: str) -> List[Car]:
         return list(Car.objects.filter(make__iexact=make))
 
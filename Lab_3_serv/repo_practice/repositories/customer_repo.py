@@ -1,9 +1,14 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from django.db import transaction as db_transaction
 from ..models import Customer
-from .base_repo import BaseRepository
+from .base_repo import BaseRepository, Page, DEFAULT_PAGE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_BATCH_SIZE
+from .sales_rollup_repo import SalesRollupRepository
 
 
 class CustomerRepository(BaseRepository[Customer]):
+    def __init__(self):
+        self.rollups = SalesRollupRepository()
+
     def get(self, id: Optional[int] = None, **filters) -> Optional[Customer] | List[Customer]:
         if id is not None:
             try:
@@ -23,6 +28,12 @@ class CustomerRepository(BaseRepository[Customer]):
         except Customer.DoesNotExist:
             return None
 
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[Customer]:
+        return self._paginate(Customer.objects.all(), cursor, limit)
+
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[Customer]:
+        return self._iterate(Customer.objects.filter(**filters), chunk_size)
+
     def create(self, **kwargs) -> Customer:
         return Customer.objects.create(**kwargs)
 
@@ -30,22 +41,34 @@ class CustomerRepository(BaseRepository[Customer]):
         return self.create(**kwargs)
 
     def update(self, id: int, **kwargs) -> Optional[Customer]:
-        try:
-            customer = Customer.objects.get(id=id)
-            for key, value in kwargs.items():
-                setattr(customer, key, value)
-            customer.save()
-            return customer
-        except Customer.DoesNotExist:
-            return None
+        return self.patch(id, refresh=True, **kwargs)
+
+    def patch(self, target: Union[int, Customer], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[Customer], bool]:
+        return self._patch(Customer, target, expected, refresh, changes)
 
     def delete(self, id: int) -> bool:
-        try:
-            customer = Customer.objects.get(id=id)
-            customer.delete()
-            return True
-        except Customer.DoesNotExist:
-            return False
+        with db_transaction.atomic():
+            # Deleting the customer deletes their sales (CASCADE)
+            days = self.rollups.sale_days(customer_id=id)
+            if not Customer.objects.filter(id=id).delete()[0]:
+                return False
+            self.rollups.recompute_days(days)
+        return True
+
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Customer]:
+        return self._bulk_create(Customer, items, batch_size)
+
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return self._bulk_update(Customer, items, batch_size)
+
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        ids = list(ids)
+        with db_transaction.atomic():
+            days = self.rollups.sale_days(batch_size, customer_id__in=ids)
+            deleted = self._bulk_delete(Customer, ids, batch_size)
+            self.rollups.recompute_days(days)
+        return deleted
 
     def get_by_email(self, email: str) -> Optional[Customer]:
         try:
@@ -1,31 +1,45 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from decimal import Decimal
 from django.contrib.auth.models import User
+from django.db.models import F
+from django.utils import timezone
 from ..models import DealerProfile
-from .base_repo import BaseRepository
+from .base_repo import BaseRepository, FetchPlan, Page, DEFAULT_PAGE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_BATCH_SIZE
 
 
 class DealerProfileRepository(BaseRepository[DealerProfile]):
+    fetch_plans = {
+        # DealerProfileSerializer: user.username
+        'api': FetchPlan(
+            select_related=('user',),
+            only=('id', 'user', 'balance', 'created_at', 'updated_at', 'user__username'),
+        ),
+    }
+
     def get_all(self) -> List[DealerProfile]:
-        return list(DealerProfile.objects.all())
+        return list(self._planned(DealerProfile.objects.all()))
 
     def get_by_id(self, id: int) -> Optional[DealerProfile]:
         try:
-            return DealerProfile.objects.get(id=id)
+            return self._planned(DealerProfile.objects.all()).get(id=id)
         except DealerProfile.DoesNotExist:
             return None
 
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[DealerProfile]:
+        return self._paginate(self._planned(DealerProfile.objects.all()), cursor, limit)
+
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[DealerProfile]:
+        return self._iterate(self._planned(DealerProfile.objects.filter(**filters)), chunk_size)
+
     def create(self, **kwargs) -> DealerProfile:
         return DealerProfile.objects.create(**kwargs)
 
     def update(self, id: int, **kwargs) -> Optional[DealerProfile]:
-        try:
-            profile = DealerProfile.objects.get(id=id)
-            for key, value in kwargs.items():
-                setattr(profile, key, value)
-            profile.save()
-            return profile
-        except DealerProfile.DoesNotExist:
-            return None
+        return self.patch(id, refresh=True, **kwargs)
+
+    def patch(self, target: Union[int, DealerProfile], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[DealerProfile], bool]:
+        return self._patch(DealerProfile, target, expected, refresh, changes)
 
     def delete(self, id: int) -> bool:
         try:
@@ -35,6 +49,15 @@ class DealerProfileRepository(BaseRepository[DealerProfile]):
         except DealerProfile.DoesNotExist:
             return False
 
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[DealerProfile]:
+        return self._bulk_create(DealerProfile, items, batch_size)
+
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return self._bulk_update(DealerProfile, items, batch_size)
+
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return self._bulk_delete(DealerProfile, ids, batch_size)
+
     def get_by_user(self, user: User) -> Optional[DealerProfile]:
         """Get dealer profile by user"""
         try:
@@ -58,31 +81,49 @@ class DealerProfileRepository(BaseRepository[DealerProfile]):
         except DealerProfile.DoesNotExist:
             return None
 
+    def get_balance(self, user: User) -> Optional[Decimal]:
+        """Read only the balance column"""
+        return DealerProfile.objects.filter(user=user).values_list('balance', flat=True).first()
+
+    def credit(self, user: User, amount: Decimal) -> Optional[Decimal]:
+        """
+        UPDATE ... SET balance = balance + amount, in the database.
+        Returns the new balance, or None if the dealer has no profile.
+        Call inside a transaction: the row stays locked until commit, so the re-read is exact.
+        """
+        updated = DealerProfile.objects.filter(user=user).update(
+            balance=F('balance') + amount, updated_at=timezone.now()
+        )
+        return self.get_balance(user) if updated else None
+
+    def debit(self, user: User, amount: Decimal) -> Optional[Decimal]:
+        """
+        UPDATE ... SET balance = balance - amount WHERE balance >= amount.
+        Returns the new balance, or None when the balance does not cover amount.
+        Concurrent debits can never take the balance below zero.
+        """
+        updated = DealerProfile.objects.filter(user=user, balance__gte=amount).update(
+            balance=F('balance') - amount, updated_at=timezone.now()
+        )
+        return self.get_balance(user) if updated else None
+
     def add_to_balance(self, user: User, amount: float) -> Optional[DealerProfile]:
         """Add amount to dealer's balance"""
-        try:
-            profile = DealerProfile.objects.get(user=user)
-            profile.balance += amount
-            profile.save()
-            return profile
-        except DealerProfile.DoesNotExist:
+        if self.credit(user, amount) is None:
             return None
+        return self.get_by_user(user)
 
     def deduct_from_balance(self, user: User, amount: float) -> Optional[DealerProfile]:
-        """Deduct amount from dealer's balance"""
-        try:
-            profile = DealerProfile.objects.get(user=user)
-            profile.balance -= amount
-            profile.save()
-            return profile
-        except DealerProfile.DoesNotExist:
+        """Deduct amount from dealer's balance; None if the balance is insufficient"""
+        if self.debit(user, amount) is None:
             return None
+        return self.get_by_user(user)
 
     def get_high_balance_dealers(self, min_balance: float = 50000.00) -> List[DealerProfile]:
         """Get dealers with balance above threshold"""
-        return list(DealerProfile.objects.filter(balance__gte=min_balance))
+        return list(self._planned(DealerProfile.objects.filter(balance__gte=min_balance)))
 
     def get_low_balance_dealers(self, max_balance: float = 1000.00) -> List[DealerProfile]:
         """Get dealers with balance below threshold"""
-        return list(DealerProfile.objects.filter(balance__lte=max_balance))
+        return list(self._planned(DealerProfile.objects.filter(balance__lte=max_balance)))
 
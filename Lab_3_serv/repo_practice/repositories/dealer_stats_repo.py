@@ -0,0 +1,169 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, DateTimeField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from ..models import DealerStats, Transaction
+from .base_repo import BaseRepository, Page, DEFAULT_PAGE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_BATCH_SIZE
+
+COUNTER_BY_TYPE = {'BUY': 'buy_count', 'SELL': 'sell_count', 'MODIFY': 'modify_count'}
+
+
+def ledger_totals() -> dict:
+    """Aggregates over ledger rows that give the DealerStats columns (net_profit aside)"""
+    return {
+        'total_spent': Sum('amount', filter=Q(amount__lt=0), default=Decimal('0.00')),
+        'total_earned': Sum('amount', filter=Q(amount__gt=0), default=Decimal('0.00')),
+        'buy_count': Count('id', filter=Q(transaction_type='BUY')),
+        'sell_count': Count('id', filter=Q(transaction_type='SELL')),
+        'modify_count': Count('id', filter=Q(transaction_type='MODIFY')),
+        'last_trade_at': Max('created_at'),
+    }
+
+
+class DealerStatsRepository(BaseRepository[DealerStats]):
+    page_ordering = ('dealer_id',)
+
+    def get_all(self) -> List[DealerStats]:
+        return list(DealerStats.objects.all())
+
+    def get_by_id(self, id: int) -> Optional[DealerStats]:
+        try:
+            return DealerStats.objects.get(pk=id)
+        except DealerStats.DoesNotExist:
+            return None
+
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[DealerStats]:
+        return self._paginate(DealerStats.objects.all(), cursor, limit)
+
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[DealerStats]:
+        return self._iterate(DealerStats.objects.filter(**filters), chunk_size)
+
+    def create(self, **kwargs) -> DealerStats:
+        return DealerStats.objects.create(**kwargs)
+
+    def update(self, id: int, **kwargs) -> Optional[DealerStats]:
+        return self.patch(id, refresh=True, **kwargs)
+
+    def patch(self, target: Union[int, DealerStats], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[DealerStats], bool]:
+        return self._patch(DealerStats, target, expected, refresh, changes)
+
+    def delete(self, id: int) -> bool:
+        return DealerStats.objects.filter(pk=id).delete()[0] > 0
+
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[DealerStats]:
+        return self._bulk_create(DealerStats, items, batch_size)
+
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return self._bulk_update(DealerStats, items, batch_size)
+
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return self._bulk_delete(DealerStats, ids, batch_size)
+
+    def get_summary(self, dealer: User) -> dict:
+        """
+        Same shape as TransactionRepository.get_dealer_summary(), read by primary key.
+        A dealer without a row yet is aggregated from the ledger (an index range scan
+        that is empty for a dealer who never traded).
+        """
+        stats = self.get_by_id(dealer.pk)
+        if stats is None:
+            summary = Transaction.objects.filter(dealer=dealer).aggregate(**ledger_totals())
+            summary['net_profit'] = summary['total_spent'] + summary['total_earned']
+            return summary
+        return {
+            'total_spent': stats.total_spent,
+            'total_earned': stats.total_earned,
+            'net_profit': stats.net_profit,
+            'buy_count': stats.buy_count,
+            'sell_count': stats.sell_count,
+            'modify_count': stats.modify_count,
+            'last_trade_at': stats.last_trade_at,
+        }
+
+    def record(self, transactions: Iterable[Transaction]) -> None:
+        """
+        Fold freshly inserted ledger rows into the rollup.
+        Must run in the same DB transaction as the inserts.
+        """
+        deltas = defaultdict(lambda: {'total_spent': Decimal('0'), 'total_earned': Decimal('0'),
+                                      'buy_count': 0, 'sell_count': 0, 'modify_count': 0,
+                                      'last_trade_at': None})
+        for tx in transactions:
+            delta = deltas[tx.dealer_id]
+            if tx.amount < 0:
+                delta['total_spent'] += tx.amount
+            elif tx.amount > 0:
+                delta['total_earned'] += tx.amount
+            counter = COUNTER_BY_TYPE.get(tx.transaction_type)
+            if counter:
+                delta[counter] += 1
+            if delta['last_trade_at'] is None or tx.created_at > delta['last_trade_at']:
+                delta['last_trade_at'] = tx.created_at
+
+        for dealer_id, delta in deltas.items():
+            self._apply(dealer_id, delta)
+
+    def _apply(self, dealer_id: int, delta: dict) -> None:
+        """UPDATE the counters in place; INSERT the row the first time a dealer trades"""
+        last_trade_at: Optional[datetime] = delta['last_trade_at']
+        changes = {
+            'total_spent': F('total_spent') + delta['total_spent'],
+            'total_earned': F('total_earned') + delta['total_earned'],
+            'net_profit': F('net_profit') + delta['total_spent'] + delta['total_earned'],
+            'buy_count': F('buy_count') + delta['buy_count'],
+            'sell_count': F('sell_count') + delta['sell_count'],
+            'modify_count': F('modify_count') + delta['modify_count'],
+        }
+        if last_trade_at is not None:
+            latest = Value(last_trade_at, output_field=DateTimeField())
+            changes['last_trade_at'] = Greatest(Coalesce('last_trade_at', latest), latest)
+
+        if DealerStats.objects.filter(pk=dealer_id).update(**changes):
+            return
+        try:
+            with db_transaction.atomic():
+                DealerStats.objects.create(
+                    dealer_id=dealer_id,
+                    total_spent=delta['total_spent'],
+                    total_earned=delta['total_earned'],
+                    net_profit=delta['total_spent'] + delta['total_earned'],
+                    buy_count=delta['buy_count'],
+                    sell_count=delta['sell_count'],
+                    modify_count=delta['modify_count'],
+                    last_trade_at=last_trade_at,
+                )
+        except IntegrityError:
+            # Another trade of the same dealer inserted the row first
+            DealerStats.objects.filter(pk=dealer_id).update(**changes)
+
+    def rebuild_for(self, dealer_ids: List[int]) -> int:
+        """
+        Recompute the rollup of the given dealers from the ledger; returns rows written.
+
+        The dealers' user rows are locked first and the aggregate is read and written
+        in the same DB transaction. Every ledger INSERT takes a shared lock on its
+        dealer row (foreign key check), so no trade can commit between the read and
+        the write and be lost from the rollup.
+        """
+        dealer_ids = list(dealer_ids)
+        with db_transaction.atomic():
+            list(User.objects.select_for_update().filter(pk__in=dealer_ids).order_by('pk').values_list('pk'))
+            aggregates = (
+                Transaction.objects
+                .filter(dealer_id__in=dealer_ids)
+                .order_by()
+                .values('dealer_id')
+                .annotate(**ledger_totals())
+            )
+            rows = [
+                DealerStats(net_profit=row['total_spent'] + row['total_earned'], **row)
+                for row in aggregates
+            ]
+            DealerStats.objects.filter(pk__in=dealer_ids).delete()
+            DealerStats.objects.bulk_create(rows)
+        return len(rows)
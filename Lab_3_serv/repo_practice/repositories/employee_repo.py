@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 from ..models import Employee
-from .base_repo import BaseRepository
+from .base_repo import BaseRepository, Page, DEFAULT_PAGE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_BATCH_SIZE
 
 
 class EmployeeRepository(BaseRepository[Employee]):
@@ -23,6 +23,12 @@ class EmployeeRepository(BaseRepository[Employee]):
         except Employee.DoesNotExist:
             return None
 
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page[Employee]:
+        return self._paginate(Employee.objects.all(), cursor, limit)
+
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[Employee]:
+        return self._iterate(Employee.objects.filter(**filters), chunk_size)
+
     def create(self, **kwargs) -> Employee:
         return Employee.objects.create(**kwargs)
 
@@ -30,14 +36,11 @@ class EmployeeRepository(BaseRepository[Employee]):
         return self.create(**kwargs)
 
     def update(self, id: int, **kwargs) -> Optional[Employee]:
-        try:
-            employee = Employee.objects.get(id=id)
-            for key, value in kwargs.items():
-                setattr(employee, key, value)
-            employee.save()
-            return employee
-        except Employee.DoesNotExist:
-            return None
+        return self.patch(id, refresh=True, **kwargs)
+
+    def patch(self, target: Union[int, Employee], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[Employee], bool]:
+        return self._patch(Employee, target, expected, refresh, changes)
 
     def delete(self, id: int) -> bool:
         try:
@@ -47,5 +50,14 @@ class EmployeeRepository(BaseRepository[Employee]):
         except Employee.DoesNotExist:
             return False
 
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Employee]:
+        return self._bulk_create(Employee, items, batch_size)
+
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return self._bulk_update(Employee, items, batch_size)
+
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        return self._bulk_delete(Employee, ids, batch_size)
+
     def get_by_position(self, position: str) -> List[Employee]:
         return list(Employee.objects.filter(position__iexact=position))
\ No newline at end of file
@@ -0,0 +1,151 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List
+
+# Latency bucket upper bounds in ms: 0.05 ms .. ~80 s, each 25% wider than the previous one.
+# Percentiles are read off the buckets, so they are accurate to within one bucket (25%).
+BUCKET_BOUNDS: List[float] = []
+_bound = 0.05
+while _bound < 80000:
+    BUCKET_BOUNDS.append(round(_bound, 4))
+    _bound *= 1.25
+
+
+class Histogram:
+    """Fixed log-spaced latency buckets; constant memory per method"""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                # Bucket upper bound, never above the largest value actually seen
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+
+class MethodStats:
+    __slots__ = ('calls', 'errors', 'rows', 'latency')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.latency = Histogram()
+
+    def as_dict(self) -> dict:
+        latency = self.latency
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(latency.total, 3),
+            'mean_ms': round(latency.total / latency.count, 3) if latency.count else 0.0,
+            'p50_ms': latency.percentile(0.50),
+            'p95_ms': latency.percentile(0.95),
+            'p99_ms': latency.percentile(0.99),
+            'max_ms': round(latency.max, 3),
+        }
+
+
+class RepositoryMetrics:
+    """Process-wide call / row / latency stats per repository method"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stats: Dict[str, MethodStats] = {}
+
+    def record(self, key: str, elapsed_ms: float, rows: int, failed: bool):
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = MethodStats()
+            stats.calls += 1
+            stats.rows += rows
+            stats.errors += failed
+            stats.latency.add(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Method -> stats, hottest (most total time) first"""
+        with self._lock:
+            result = {key: stats.as_dict() for key, stats in self._stats.items()}
+        return dict(sorted(result.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+metrics = RepositoryMetrics()
+
+
+def count_rows(result) -> int:
+    from .base_repo import Page
+
+    if result is None or isinstance(result, bool):
+        return 0
+    if isinstance(result, int):
+        return result  # bulk_update / bulk_delete: rows affected
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, Page):
+        return len(result.items)
+    return 1  # one instance, (instance, created) or one dict
+
+
+def instrument(key: str, method):
+    """Wrap a repository method; costs one attribute check while metrics are disabled"""
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return method(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            metrics.record(key, (time.perf_counter() - started) * 1000, 0, True)
+            raise
+        if isinstance(result, Iterator):
+            return _timed_iterator(key, result, started)
+        metrics.record(key, (time.perf_counter() - started) * 1000, count_rows(result), False)
+        return result
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def _timed_iterator(key: str, iterator: Iterator, started: float) -> Iterator:
+    """Streams are timed until the consumer is done with them"""
+    rows = 0
+    failed = False
+    try:
+        for row in iterator:
+            rows += 1
+            yield row
+    except Exception:
+        failed = True
+        raise
+    finally:
+        metrics.record(key, (time.perf_counter() - started) * 1000, rows, failed)
@@ -1,66 +1,126 @@
-from typing import List, Optional
-from django.db.models import Count, Sum, Avg, Max, Min
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union
+from django.db import transaction as db_transaction
+from django.utils import timezone
 from ..models import Sale
-from .base_repo import BaseRepository
+from .base_repo import BaseRepository, FetchPlan, Page, DEFAULT_PAGE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_BATCH_SIZE
+from .sales_rollup_repo import SalesRollupRepository
 
 class SaleRepository(BaseRepository[Sale]):
+    fetch_plans = {
+        'default': FetchPlan(select_related=('car', 'customer', 'employee')),
+        # SaleSerializer only emits the foreign key ids
+        'api': FetchPlan(),
+    }
+
+    # (column, ORM path) of the CSV / JSONL export
+    export_columns = (
+        ('id', 'id'), ('car', 'car_id'), ('car_make', 'car__make'), ('car_model', 'car__model'),
+        ('car_year', 'car__year'), ('customer', 'customer_id'), ('employee', 'employee_id'),
+        ('sale_price', 'sale_price'), ('sale_date', 'sale_date'),
+    )
+
+    def __init__(self):
+        self.rollups = SalesRollupRepository()
+
     def get(self, id: Optional[int] = None, **filters) -> Optional[Sale] | List[Sale]:
         if id is not None:
             try:
-                return Sale.objects.select_related('car', 'customer', 'employee').get(id=id)
+                return self._planned(Sale.objects.all()).get(id=id)
             except Sale.DoesNotExist:
                 return None
         if filters:
-            return list(Sale.objects.select_related('car', 'customer', 'employee').filter(**filters))
-        return list(Sale.objects.select_related('car', 'customer', 'employee').all())
+            return list(self._planned(Sale.objects.filter(**filters)))
+        return list(self._planned(Sale.objects.all()))
 
     def get_all(self) -> List[Sale]:
-        return list(Sale.objects.select_related('car', 'customer', 'employee').all())
+        return list(self._planned(Sale.objects.all()))
 
     def get_by_id(self, id: int) -> Optional[Sale]:
         try:
-            return Sale.objects.select_related('car', 'customer', 'employee').get(id=id)
+            return self._planned(Sale.objects.all()).get(id=id)
         except Sale.DoesNotExist:
             return None
 
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, **filters) -> Page[Sale]:
+        return self._paginate(self._planned(Sale.objects.filter(**filters)), cursor, limit)
+
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[Sale]:
+        return self._iterate(self._planned(Sale.objects.filter(**filters)), chunk_size)
+
+    def stream_export(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[tuple]:
+        """Value tuples in export_columns order, by id"""
+        fields = tuple(path for _, path in self.export_columns)
+        return self._iterate_values(Sale.objects.filter(**filters), fields, chunk_size)
+
     def create(self, **kwargs) -> Sale:
-        return Sale.objects.create(**kwargs)
+        sale = Sale.objects.create(**kwargs)
+        db_transaction.on_commit(self.rollups.refresh_if_stale, robust=True)
+        return sale
 
     def add(self, **kwargs) -> Sale:
         return self.create(**kwargs)
 
     def update(self, id: int, **kwargs) -> Optional[Sale]:
-        try:
-            sale = Sale.objects.get(id=id)
-            for key, value in kwargs.items():
-                setattr(sale, key, value)
-            sale.save()
-            return sale
-        except Sale.DoesNotExist:
-            return None
+        return self.patch(id, refresh=True, **kwargs)
+
+    def patch(self, target: Union[int, Sale], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[Sale], bool]:
+        with db_transaction.atomic():
+            days = self._sale_days([target.pk if isinstance(target, Sale) else target])
+            result = self._patch(Sale, target, expected, refresh, changes)
+            if result:
+                self.rollups.recompute_days(days | self._changed_days([changes]))
+        return result
 
     def delete(self, id: int) -> bool:
-        try:
-            sale = Sale.objects.get(id=id)
-            sale.delete()
-            return True
-        except Sale.DoesNotExist:
-            return False
+        with db_transaction.atomic():
+            days = self._sale_days([id])
+            if not Sale.objects.filter(id=id).delete()[0]:
+                return False
+            self.rollups.recompute_days(days)
+        return True
+
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Sale]:
+        sales = self._bulk_create(Sale, items, batch_size)
+        db_transaction.on_commit(self.rollups.refresh_if_stale, robust=True)
+        return sales
+
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        with db_transaction.atomic():
+            days = self._sale_days((item['id'] for item in items if 'id' in item), batch_size)
+            updated = self._bulk_update(Sale, items, batch_size)
+            self.rollups.recompute_days(days | self._changed_days(items))
+        return updated
+
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        ids = list(ids)
+        with db_transaction.atomic():
+            days = self._sale_days(ids, batch_size)
+            deleted = self._bulk_delete(Sale, ids, batch_size)
+            self.rollups.recompute_days(days)
+        return deleted
+
+    def _sale_days(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> Set[date]:
+        """Rollup days of existing sales, read before they are changed"""
+        ids = list(ids)
+        return self.rollups.sale_days(batch_size, id__in=ids) if ids else set()
+
+    @staticmethod
+    def _changed_days(changes: Iterable[dict]) -> Set[date]:
+        """Days sales are moved to by a sale_date change"""
+        return {
+            (timezone.localtime(value) if timezone.is_aware(value) else value).date()
+            for value in (item.get('sale_date') for item in changes) if value
+        }
 
     def get_sales_by_customer(self, customer_id: int) -> List[Sale]:
         return list(Sale.objects.filter(customer_id=customer_id).select_related('car', 'employee'))
 
-    def get_sales_report(self) -> List[dict]:
-        """Звіт: статистика продажів за марками та моделями машин"""
-        return list(
-            Sale.objects
-            .values('car__make', 'car__model')
-            .annotate(
-                total_sales=Count('id'),
-                total_revenue=Sum('sale_price'),
-                average_price=Avg('sale_price'),
-                max_price=Max('sale_price'),
-                min_price=Min('sale_price')
-            )
-            .order_by('-total_sales')
-        )
\ No newline at end of file
+    def get_sales_report(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                         granularity: str = 'total', employee_id: Optional[int] = None) -> List[dict]:
+        """
+        Звіт: статистика продажів за марками та моделями машин, з daily / monthly rollups.
+        granularity: 'total', 'day' або 'month' (рядки з полем bucket). Лише читає.
+        """
+        return self.rollups.get_report(date_from, date_to, granularity, employee_id)
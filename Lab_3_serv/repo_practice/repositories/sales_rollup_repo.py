@@ -0,0 +1,325 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Greatest, Least, TruncDate
+from django.utils import timezone
+
+from ..models import DailySalesRollup, MonthlySalesRollup, RollupWatermark, Sale
+
+GRANULARITIES = ('total', 'day', 'month')
+WATERMARK = 'sales'
+MEASURES = ('sale_count', 'total_revenue', 'min_price', 'max_price')
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def day_start(day: date) -> datetime:
+    """Midnight of day in the current time zone, the same boundary TruncDate uses"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class SalesRollupRepository:
+    """
+    Daily and monthly sales rollups keyed by (bucket, make, model, employee).
+
+    refresh() folds in the sales with sale_date in (high water, now - LAG]; LAG leaves
+    room for sales whose transaction commits a little after their sale_date was set.
+    get_report() reads the rollups plus the few sales past the high-water mark, so it
+    is always exact and its cost depends on the range asked for, not on the history.
+    Reads never write: migration 0009 builds the rollups, and sales created through
+    SaleRepository refresh them after commit when the mark is REFRESH_INTERVAL behind.
+    Sales changed or deleted through SaleRepository have their days recomputed, and so
+    do the sales of cars renamed or deleted and customers deleted through their
+    repositories (rows are keyed by the car's make and model, deletes cascade to sales);
+    other writes (admin, raw SQL, seeding) need manage.py rebuild_sales_rollups.
+    """
+
+    def __init__(self):
+        config = getattr(settings, 'SALES_ROLLUP', {})
+        self.lag = timedelta(seconds=config.get('LAG_SECONDS', 300))
+        self.refresh_interval = timedelta(seconds=config.get('REFRESH_INTERVAL_SECONDS', 60))
+
+    # ---------- maintenance ----------
+
+    def get_high_water(self) -> Optional[datetime]:
+        return RollupWatermark.objects.filter(name=WATERMARK).values_list('high_water', flat=True).first()
+
+    def refresh_if_stale(self) -> int:
+        """refresh() unless it ran less than REFRESH_INTERVAL ago; sale inserts call this after commit"""
+        high_water = self.get_high_water()
+        if high_water is not None and timezone.now() - self.lag - high_water < self.refresh_interval:
+            return 0
+        return self.refresh()
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """Fold the sales past the high-water mark into both rollups; returns the sales folded in"""
+        upto = (now or timezone.now()) - self.lag
+        with db_transaction.atomic():
+            watermark = self._lock_watermark()
+            since = watermark.high_water
+            if since is None:
+                return self._rebuild_locked(watermark, upto)
+            if since >= upto:
+                return 0
+
+            groups = self._aggregate_sales(since, upto)
+            for group in groups:
+                self._upsert(DailySalesRollup, group)
+            for group in self._by_month(groups):
+                self._upsert(MonthlySalesRollup, group)
+            watermark.high_water = upto
+            watermark.save()
+        return sum(group['sale_count'] for group in groups)
+
+    def rebuild(self, now: Optional[datetime] = None,
+                progress: Optional[Callable[[date, int], None]] = None) -> int:
+        """Recompute both rollups from the sales table, a month at a time; returns the sales folded in"""
+        upto = (now or timezone.now()) - self.lag
+        with db_transaction.atomic():
+            return self._rebuild_locked(self._lock_watermark(), upto, progress)
+
+    def sale_days(self, batch_size: int = 1000, **filters) -> Set[date]:
+        """
+        Rollup days of the sales matching filters, read before a write changes them.
+        A list passed as <field>__in is looked up batch_size values at a time.
+        """
+        in_lookups = [name for name, value in filters.items() if name.endswith('__in')]
+        if not in_lookups:
+            return self._days(Sale.objects.filter(**filters))
+        name = in_lookups[0]
+        values = list(filters.pop(name))
+        days = set()
+        for start in range(0, len(values), batch_size):
+            days |= self._days(Sale.objects.filter(**filters, **{name: values[start:start + batch_size]}))
+        return days
+
+    @staticmethod
+    def _days(queryset) -> Set[date]:
+        return set(queryset.order_by().values_list(TruncDate('sale_date'), flat=True).distinct())
+
+    def recompute_days(self, days: Iterable[date]) -> None:
+        """Rebuild the given days (and their months) after sales in them were changed or deleted"""
+        days = sorted(set(days))
+        if not days:
+            return
+        with db_transaction.atomic():
+            watermark = self._lock_watermark()
+            if watermark.high_water is None:
+                return  # nothing built yet: the first refresh() reads everything anyway
+            for day in days:
+                DailySalesRollup.objects.filter(bucket=day).delete()
+                groups = self._aggregate_sales(None, watermark.high_water, day_start(day),
+                                               day_start(day + timedelta(days=1)))
+                DailySalesRollup.objects.bulk_create(DailySalesRollup(**group) for group in groups)
+            for month in sorted({month_start(day) for day in days}):
+                self._rebuild_month_from_days(month)
+
+    def _rebuild_locked(self, watermark: RollupWatermark, upto: datetime,
+                        progress: Optional[Callable[[date, int], None]] = None) -> int:
+        DailySalesRollup.objects.all().delete()
+        MonthlySalesRollup.objects.all().delete()
+        folded = 0
+        first = Sale.objects.filter(sale_date__lte=upto).aggregate(first=Min('sale_date'))['first']
+        if first is not None:
+            month = month_start(timezone.localtime(first).date())
+            while day_start(month) <= upto:
+                groups = self._aggregate_sales(None, upto, day_start(month), day_start(next_month(month)))
+                DailySalesRollup.objects.bulk_create((DailySalesRollup(**group) for group in groups), batch_size=1000)
+                MonthlySalesRollup.objects.bulk_create(
+                    (MonthlySalesRollup(**group) for group in self._by_month(groups)), batch_size=1000)
+                month_sales = sum(group['sale_count'] for group in groups)
+                folded += month_sales
+                if progress:
+                    progress(month, month_sales)
+                month = next_month(month)
+        watermark.high_water = upto
+        watermark.save()
+        return folded
+
+    def _lock_watermark(self) -> RollupWatermark:
+        RollupWatermark.objects.get_or_create(name=WATERMARK)
+        return RollupWatermark.objects.select_for_update().get(name=WATERMARK)
+
+    def _aggregate_sales(self, since: Optional[datetime], upto: datetime,
+                         start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+        """Sales with sale_date in (since, upto] and [start, end), grouped by day, make, model, employee"""
+        queryset = Sale.objects.filter(sale_date__lte=upto)
+        if since is not None:
+            queryset = queryset.filter(sale_date__gt=since)
+        if start is not None:
+            queryset = queryset.filter(sale_date__gte=start)
+        if end is not None:
+            queryset = queryset.filter(sale_date__lt=end)
+        return list(
+            queryset
+            .values('employee_id', bucket=TruncDate('sale_date'), make=F('car__make'), model=F('car__model'))
+            .annotate(sale_count=Count('id'), total_revenue=Sum('sale_price'),
+                      min_price=Min('sale_price'), max_price=Max('sale_price'))
+            .order_by()
+        )
+
+    @staticmethod
+    def _by_month(groups: List[dict]) -> List[dict]:
+        months: Dict[Tuple, dict] = {}
+        for group in groups:
+            key = (month_start(group['bucket']), group['make'], group['model'], group['employee_id'])
+            month = months.get(key)
+            if month is None:
+                months[key] = {**group, 'bucket': key[0]}
+                continue
+            month['sale_count'] += group['sale_count']
+            month['total_revenue'] += group['total_revenue']
+            month['min_price'] = min(month['min_price'], group['min_price'])
+            month['max_price'] = max(month['max_price'], group['max_price'])
+        return list(months.values())
+
+    def _rebuild_month_from_days(self, month: date) -> None:
+        MonthlySalesRollup.objects.filter(bucket=month).delete()
+        rows = (
+            DailySalesRollup.objects
+            .filter(bucket__gte=month, bucket__lt=next_month(month))
+            .values('make', 'model', 'employee_id')
+            .annotate(sale_count=Sum('sale_count'), total_revenue=Sum('total_revenue'),
+                      min_price=Min('min_price'), max_price=Max('max_price'))
+            .order_by()
+        )
+        MonthlySalesRollup.objects.bulk_create(MonthlySalesRollup(bucket=month, **row) for row in rows)
+
+    @staticmethod
+    def _upsert(model, group: dict) -> None:
+        """Add a group to its rollup row in place; INSERT the row the first time the key is seen"""
+        key = {name: group[name] for name in ('bucket', 'make', 'model', 'employee_id')}
+        changes = {
+            'sale_count': F('sale_count') + group['sale_count'],
+            'total_revenue': F('total_revenue') + group['total_revenue'],
+            'min_price': Least('min_price', group['min_price']),
+            'max_price': Greatest('max_price', group['max_price']),
+        }
+        if model.objects.filter(**key).update(**changes):
+            return
+        try:
+            with db_transaction.atomic():
+                model.objects.create(**group)
+        except IntegrityError:
+            model.objects.filter(**key).update(**changes)
+
+    # ---------- reports ----------
+
+    def get_report(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                   granularity: str = 'total', employee_id: Optional[int] = None) -> List[dict]:
+        """
+        Sales per make and model between date_from and date_to (inclusive days), in total
+        or per day / month bucket. Month buckets widen the range to whole months.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        if granularity == 'month':
+            date_from = month_start(date_from) if date_from else None
+            date_to = next_month(date_to) - timedelta(days=1) if date_to else None
+
+        high_water = self.get_high_water()
+        merged: Dict[Tuple, dict] = {}
+        if high_water is not None:
+            for row in self._rollup_rows(date_from, date_to, granularity, employee_id):
+                self._merge(merged, row, granularity)
+        for row in self._live_rows(high_water, date_from, date_to, granularity, employee_id):
+            self._merge(merged, row, granularity)
+
+        report = []
+        for row in merged.values():
+            entry = {} if granularity == 'total' else {'bucket': row['bucket']}
+            entry.update({
+                'car__make': row['make'],
+                'car__model': row['model'],
+                'total_sales': row['sale_count'],
+                'total_revenue': row['total_revenue'],
+                'average_price': (row['total_revenue'] / row['sale_count']).quantize(Decimal('0.01')),
+                'max_price': row['max_price'],
+                'min_price': row['min_price'],
+            })
+            report.append(entry)
+        report.sort(key=lambda entry: -entry['total_sales'])
+        if granularity != 'total':
+            report.sort(key=lambda entry: entry['bucket'])
+        return report
+
+    def _rollup_rows(self, date_from, date_to, granularity, employee_id) -> Iterable[dict]:
+        if granularity == 'total' and (date_from or date_to):
+            # Whole months from the monthly rollup, the partial months at the edges from the daily one
+            full_from = date_from if date_from is None or date_from.day == 1 else next_month(date_from)
+            full_to = None if date_to is None else month_start(date_to + timedelta(days=1))
+            if full_to is not None and full_from is not None and full_from >= full_to:
+                yield from self._rollup_query(DailySalesRollup, date_from, date_to, False, employee_id)
+                return
+            yield from self._rollup_query(MonthlySalesRollup, full_from,
+                                          full_to - timedelta(days=1) if full_to else None, False, employee_id)
+            if full_from is not None and date_from is not None and date_from < full_from:
+                yield from self._rollup_query(DailySalesRollup, date_from, full_from - timedelta(days=1),
+                                              False, employee_id)
+            if full_to is not None and full_to <= date_to:
+                yield from self._rollup_query(DailySalesRollup, full_to, date_to, False, employee_id)
+            return
+        model = DailySalesRollup if granularity == 'day' else MonthlySalesRollup
+        yield from self._rollup_query(model, date_from, date_to, granularity != 'total', employee_id)
+
+    @staticmethod
+    def _rollup_query(model, date_from, date_to, per_bucket: bool, employee_id) -> Iterable[dict]:
+        queryset = model.objects.all()
+        if date_from is not None:
+            queryset = queryset.filter(bucket__gte=date_from)
+        if date_to is not None:
+            queryset = queryset.filter(bucket__lte=date_to)
+        if employee_id is not None:
+            queryset = queryset.filter(employee_id=employee_id)
+        fields = ('bucket', 'make', 'model') if per_bucket else ('make', 'model')
+        return (
+            queryset.values(*fields)
+            .annotate(sale_count=Sum('sale_count'), total_revenue=Sum('total_revenue'),
+                      min_price=Min('min_price'), max_price=Max('max_price'))
+            .order_by()
+        )
+
+    @staticmethod
+    def _live_rows(high_water, date_from, date_to, granularity, employee_id) -> Iterable[dict]:
+        """Sales not in the rollups yet, aggregated the same way"""
+        queryset = Sale.objects.all()
+        if high_water is not None:
+            queryset = queryset.filter(sale_date__gt=high_water)
+        if date_from is not None:
+            queryset = queryset.filter(sale_date__gte=day_start(date_from))
+        if date_to is not None:
+            queryset = queryset.filter(sale_date__lt=day_start(date_to + timedelta(days=1)))
+        if employee_id is not None:
+            queryset = queryset.filter(employee_id=employee_id)
+        fields = {'make': F('car__make'), 'model': F('car__model')}
+        if granularity != 'total':
+            fields['bucket'] = TruncDate('sale_date')
+        for row in (queryset.values(**fields)
+                    .annotate(sale_count=Count('id'), total_revenue=Sum('sale_price'),
+                              min_price=Min('sale_price'), max_price=Max('sale_price'))
+                    .order_by()):
+            if granularity == 'month':
+                row['bucket'] = month_start(row['bucket'])
+            yield row
+
+    @staticmethod
+    def _merge(merged: Dict[Tuple, dict], row: dict, granularity: str) -> None:
+        key = (row.get('bucket') if granularity != 'total' else None, row['make'], row['model'])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dict(row)
+            return
+        current['sale_count'] += row['sale_count']
+        current['total_revenue'] += row['total_revenue']
+        current['min_price'] = min(current['min_price'], row['min_price'])
+        current['max_price'] = max(current['max_price'], row['max_price'])
@@ -1,98 +1,203 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union
 from decimal import Decimal
 from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
+from django.db.models import Count, Q, Sum
 from ..models import Transaction, Car
-from .base_repo import BaseRepository
+from .base_repo import BaseRepository, FetchPlan, Page, DEFAULT_PAGE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_BATCH_SIZE
+from .dealer_stats_repo import DealerStatsRepository
+
+# Columns DealerStats is computed from: edits that touch one of them rebuild the dealer's rollup
+STATS_FIELDS = frozenset({'dealer', 'dealer_id', 'transaction_type', 'amount', 'created_at'})
 
 
 class TransactionRepository(BaseRepository[Transaction]):
+    # Newest first, same as Transaction.Meta.ordering; id breaks created_at ties
+    page_ordering = ('-created_at', '-id')
+    fetch_plans = {
+        # TransactionSerializer: dealer.username and car make / model / year
+        'api': FetchPlan(
+            select_related=('dealer', 'car'),
+            only=('id', 'dealer', 'car', 'transaction_type', 'amount', 'description',
+                  'balance_before', 'balance_after', 'created_at',
+                  'dealer__username', 'car__make', 'car__model', 'car__year'),
+        ),
+    }
+
+    # (column, ORM path) of the CSV / JSONL export; TransactionSerializer fields, flattened
+    export_columns = (
+        ('id', 'id'), ('dealer', 'dealer_id'), ('dealer_username', 'dealer__username'),
+        ('car', 'car_id'), ('car_make', 'car__make'), ('car_model', 'car__model'), ('car_year', 'car__year'),
+        ('transaction_type', 'transaction_type'), ('amount', 'amount'), ('description', 'description'),
+        ('balance_before', 'balance_before'), ('balance_after', 'balance_after'), ('created_at', 'created_at'),
+    )
+
+    def __init__(self):
+        self.dealer_stats = DealerStatsRepository()
+
     def get_all(self) -> List[Transaction]:
-        return list(Transaction.objects.all())
+        return list(self._planned(Transaction.objects.all()))
 
     def get_by_id(self, id: int) -> Optional[Transaction]:
         try:
-            return Transaction.objects.get(id=id)
+            return self._planned(Transaction.objects.all()).get(id=id)
         except Transaction.DoesNotExist:
             return None
 
+    def get_page(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, **filters) -> Page[Transaction]:
+        """
+        Filters are ORM lookups on the indexed columns: dealer, transaction_type, car,
+        created_at__gte / created_at__lt / created_at__lte. Dealer, dealer + type and car
+        each have an index ending in created_at, so pages stay index range scans; type
+        alone walks the created_at index.
+        """
+        return self._paginate(self._planned(Transaction.objects.filter(**filters)), cursor, limit)
+
+    def stream(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[Transaction]:
+        return self._iterate(self._planned(Transaction.objects.filter(**filters)), chunk_size)
+
+    def stream_export(self, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[tuple]:
+        """Value tuples in export_columns order, newest first; same filters as get_page()"""
+        fields = tuple(path for _, path in self.export_columns)
+        return self._iterate_values(Transaction.objects.filter(**filters), fields, chunk_size)
+
     def create(self, **kwargs) -> Transaction:
-        return Transaction.objects.create(**kwargs)
+        with db_transaction.atomic():
+            transaction = Transaction.objects.create(**kwargs)
+            self.dealer_stats.record([transaction])
+        return transaction
 
     def update(self, id: int, **kwargs) -> Optional[Transaction]:
-        try:
-            transaction = Transaction.objects.get(id=id)
-            for key, value in kwargs.items():
-                setattr(transaction, key, value)
-            transaction.save()
-            return transaction
-        except Transaction.DoesNotExist:
-            return None
+        return self.patch(id, refresh=True, **kwargs)
+
+    def patch(self, target: Union[int, Transaction], expected: Optional[Dict[str, Any]] = None,
+              refresh: bool = False, **changes) -> Union[Optional[Transaction], bool]:
+        if STATS_FIELDS.isdisjoint(changes):
+            return self._patch(Transaction, target, expected, refresh, changes)
+        pk = target.pk if isinstance(target, Transaction) else target
+        with db_transaction.atomic():
+            dealer_ids = self._dealers_of([pk]) | self._new_dealers([changes])
+            result = self._patch(Transaction, target, expected, refresh, changes)
+            if result:
+                self.dealer_stats.rebuild_for(dealer_ids)
+        return result
 
     def delete(self, id: int) -> bool:
-        try:
-            transaction = Transaction.objects.get(id=id)
-            transaction.delete()
-            return True
-        except Transaction.DoesNotExist:
-            return False
+        with db_transaction.atomic():
+            dealer_ids = self._dealers_of([id])
+            if not dealer_ids:
+                return False
+            Transaction.objects.filter(id=id).delete()
+            self.dealer_stats.rebuild_for(dealer_ids)
+        return True
+
+    def bulk_create(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Transaction]:
+        with db_transaction.atomic():
+            transactions = self._bulk_create(Transaction, items, batch_size)
+            self.dealer_stats.record(transactions)
+        return transactions
+
+    def bulk_update(self, items: List[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        changed = [item for item in items if not STATS_FIELDS.isdisjoint(item)]
+        if not changed:
+            return self._bulk_update(Transaction, items, batch_size)
+        with db_transaction.atomic():
+            dealer_ids = self._dealers_of([item['id'] for item in changed], batch_size) | self._new_dealers(changed)
+            updated = self._bulk_update(Transaction, items, batch_size)
+            self.dealer_stats.rebuild_for(dealer_ids)
+        return updated
+
+    def bulk_delete(self, ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        ids = list(ids)
+        with db_transaction.atomic():
+            dealer_ids = self._dealers_of(ids, batch_size)
+            deleted = self._bulk_delete(Transaction, ids, batch_size)
+            self.dealer_stats.rebuild_for(dealer_ids)
+        return deleted
+
+    def _dealers_of(self, ids: List[int], batch_size: int = DEFAULT_BATCH_SIZE) -> Set[int]:
+        """Dealers of the given ledger rows; the rows stay locked until the caller commits"""
+        dealer_ids = set()
+        for start in range(0, len(ids), batch_size):
+            dealer_ids.update(
+                Transaction.objects.select_for_update().filter(pk__in=ids[start:start + batch_size])
+                .values_list('dealer_id', flat=True)
+            )
+        return dealer_ids
+
+    @staticmethod
+    def _new_dealers(changes: Iterable[dict]) -> Set[int]:
+        """Dealers that ledger rows are moved to by an edit"""
+        dealer_ids = set()
+        for item in changes:
+            for name in ('dealer', 'dealer_id'):
+                if item.get(name) is not None:
+                    dealer_ids.add(getattr(item[name], 'pk', item[name]))
+        return dealer_ids
 
     def get_by_dealer(self, dealer: User, limit: int = None) -> List[Transaction]:
         """Get all transactions for a specific dealer"""
-        queryset = Transaction.objects.filter(dealer=dealer)
+        queryset = self._planned(Transaction.objects.filter(dealer=dealer))
         if limit:
             queryset = queryset[:limit]
         return list(queryset)
 
+    def stream_by_dealer(self, dealer: User, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Transaction]:
+        """Iterate over all transactions of a dealer without loading them all at once"""
+        return self.stream(chunk_size=chunk_size, dealer=dealer)
+
     def get_by_type(self, transaction_type: str) -> List[Transaction]:
         """Get transactions by type (BUY, SELL, MODIFY)"""
-        return list(Transaction.objects.filter(transaction_type=transaction_type))
+        return list(self._planned(Transaction.objects.filter(transaction_type=transaction_type)))
 
     def get_by_dealer_and_type(self, dealer: User, transaction_type: str) -> List[Transaction]:
         """Get transactions for a dealer filtered by type"""
-        return list(Transaction.objects.filter(dealer=dealer, transaction_type=transaction_type))
+        return list(self._planned(Transaction.objects.filter(dealer=dealer, transaction_type=transaction_type)))
 
     def get_by_car(self, car: Car) -> List[Transaction]:
         """Get all transactions related to a specific car"""
-        return list(Transaction.objects.filter(car=car))
+        return list(self._planned(Transaction.objects.filter(car=car)))
 
     def get_recent_transactions(self, limit: int = 20) -> List[Transaction]:
         """Get most recent transactions"""
-        return list(Transaction.objects.all()[:limit])
+        return list(self._planned(Transaction.objects.all())[:limit])
 
     def get_dealer_recent_transactions(self, dealer: User, limit: int = 20) -> List[Transaction]:
         """Get most recent transactions for a specific dealer"""
-        return list(Transaction.objects.filter(dealer=dealer)[:limit])
+        return list(self._planned(Transaction.objects.filter(dealer=dealer))[:limit])
 
     def get_buy_transactions(self, dealer: User = None) -> List[Transaction]:
         """Get all BUY transactions, optionally filtered by dealer"""
-        queryset = Transaction.objects.filter(transaction_type='BUY')
+        queryset = self._planned(Transaction.objects.filter(transaction_type='BUY'))
         if dealer:
             queryset = queryset.filter(dealer=dealer)
         return list(queryset)
 
     def get_sell_transactions(self, dealer: User = None) -> List[Transaction]:
         """Get all SELL transactions, optionally filtered by dealer"""
-        queryset = Transaction.objects.filter(transaction_type='SELL')
+        queryset = self._planned(Transaction.objects.filter(transaction_type='SELL'))
         if dealer:
             queryset = queryset.filter(dealer=dealer)
         return list(queryset)
 
     def get_modify_transactions(self, dealer: User = None) -> List[Transaction]:
         """Get all MODIFY transactions, optionally filtered by dealer"""
-        queryset = Transaction.objects.filter(transaction_type='MODIFY')
+        queryset = self._planned(Transaction.objects.filter(transaction_type='MODIFY'))
         if dealer:
             queryset = queryset.filter(dealer=dealer)
         return list(queryset)
 
     def calculate_total_spent(self, dealer: User) -> Decimal:
         """Calculate total money spent by dealer (negative amounts)"""
-        transactions = Transaction.objects.filter(dealer=dealer, amount__lt=0)
-        return sum(t.amount for t in transactions) if transactions else Decimal('0.00')
+        return Transaction.objects.filter(dealer=dealer, amount__lt=0).aggregate(
+            total=Sum('amount', default=Decimal('0.00'))
+        )['total']
 
     def calculate_total_earned(self, dealer: User) -> Decimal:
         """Calculate total money earned by dealer (positive amounts)"""
-        transactions = Transaction.objects.filter(dealer=dealer, amount__gt=0)
-        return sum(t.amount for t in transactions) if transactions else Decimal('0.00')
+        return Transaction.objects.filter(dealer=dealer, amount__gt=0).aggregate(
+            total=Sum('amount', default=Decimal('0.00'))
+        )['total']
 
     def calculate_net_profit(self, dealer: User) -> Decimal:
         """Calculate net profit/loss for dealer"""
@@ -100,11 +205,26 @@ class TransactionRepository(BaseRepository[Transaction]):
         earned = self.calculate_total_earned(dealer)
         return earned + spent  # spent is negative, so we add
 
+    def get_dealer_summary(self, dealer: User) -> dict:
+        """
+        Spent / earned / net profit and BUY / SELL / MODIFY counts
+        in one conditional-aggregation query over the dealer's transactions
+        """
+        summary = Transaction.objects.filter(dealer=dealer).aggregate(
+            total_spent=Sum('amount', filter=Q(amount__lt=0), default=Decimal('0.00')),
+            total_earned=Sum('amount', filter=Q(amount__gt=0), default=Decimal('0.00')),
+            buy_count=Count('id', filter=Q(transaction_type='BUY')),
+            sell_count=Count('id', filter=Q(transaction_type='SELL')),
+            modify_count=Count('id', filter=Q(transaction_type='MODIFY')),
+        )
+        summary['net_profit'] = summary['total_earned'] + summary['total_spent']  # spent is negative
+        return summary
+
     def get_transactions_by_date_range(self, dealer: User, start_date, end_date) -> List[Transaction]:
         """Get transactions within a date range"""
-        return list(Transaction.objects.filter(
+        return list(self._planned(Transaction.objects.filter(
             dealer=dealer,
             created_at__gte=start_date,
             created_at__lte=end_date
-        ))
+        )))
 
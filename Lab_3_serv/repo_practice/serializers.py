@@ -6,6 +6,18 @@ class CarSerializer(serializers.ModelSerializer):
         model = Car
         fields = '__all__'
 
+class CarImportSerializer(CarSerializer):
+    """
+    One row of a supplier inventory file: the CarSerializer (and CarForm) field
+    rules, with the VIN required. The VIN is not checked for uniqueness here:
+    a VIN that already exists is an update, not an error.
+    """
+    class Meta(CarSerializer.Meta):
+        fields = ['vin', 'make', 'model', 'year', 'price', 'in_stock']
+        extra_kwargs = {
+            'vin': {'required': True, 'allow_null': False, 'allow_blank': False, 'validators': []},
+        }
+
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
@@ -45,3 +57,12 @@ class TransactionSerializer(serializers.ModelSerializer):
             return f"{obj.car.make} {obj.car.model} ({obj.car.year})"
         return None
 
+class DealerStatsSerializer(serializers.Serializer):
+    """Read-only view of a dealer summary dict (DealerStatsRepository.get_summary)"""
+    total_spent = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_earned = serializers.DecimalField(max_digits=14, decimal_places=2)
+    net_profit = serializers.DecimalField(max_digits=14, decimal_places=2)
+    buy_count = serializers.IntegerField()
+    sell_count = serializers.IntegerField()
+    modify_count = serializers.IntegerField()
+    last_trade_at = serializers.DateTimeField(allow_null=True)
@@ -0,0 +1,214 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction as db_transaction
+
+from ..models import Car, Customer, Employee, Sale, DealerProfile, Transaction, DealerStats
+from ..monitoring import CACHE_REQUESTS
+
+# Models whose rows a repository's reads depend on, and the models its writes change.
+# A cached read is keyed by the versions of every model it reads.
+READS = {
+    'cars': (Car,),
+    'customers': (Customer,),
+    'employees': (Employee,),
+    'sales': (Sale, Car, Customer, Employee),
+    'dealer_profiles': (DealerProfile,),
+    'transactions': (Transaction, Car),
+    'dealer_stats': (DealerStats,),
+}
+WRITES = {
+    'cars': (Car,),
+    'customers': (Customer,),
+    'employees': (Employee,),
+    'sales': (Sale,),
+    'dealer_profiles': (DealerProfile,),
+    'transactions': (Transaction, DealerStats),
+    'dealer_stats': (DealerStats,),
+}
+
+# Methods with these prefixes never write, everything else that is not cached bumps versions
+READ_PREFIXES = ('get', 'stream', 'calculate')
+WRITE_PREFIXES = ('get_or_create',)
+
+
+class CacheStats:
+    """Process-wide hit/miss counters per repository method"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record(self, key: str, hit: bool):
+        with self._lock:
+            self._counts[key]['hits' if hit else 'misses'] += 1
+        CACHE_REQUESTS.labels(key, 'hit' if hit else 'miss').inc()
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            result = {}
+            for key, counts in sorted(self._counts.items()):
+                total = counts['hits'] + counts['misses']
+                result[key] = {**counts, 'hit_ratio': round(counts['hits'] / total, 4) if total else 0.0}
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+cache_stats = CacheStats()
+
+_MISSING = object()
+
+
+class CachedRepository:
+    """
+    Read-through cache in front of a repository.
+
+    Cached reads are stored under <repo>:<method>:<args>:<model versions>.
+    Every write through the repository bumps the version of the models it
+    touches (immediately and again on commit), so old entries are never read
+    again and simply age out via TTL / MAX_ENTRIES of the cache backend.
+    Writes that bypass the repositories (admin, raw ORM) are only bounded by the TTL.
+    """
+
+    def __init__(self, repository, name: str, cached_methods: Iterable[str], cache_alias: str, timeout: int):
+        self._repository = repository
+        self._name = name
+        self._cached_methods = frozenset(cached_methods)
+        self._cache_alias = cache_alias
+        self._cache = caches[cache_alias]
+        self._timeout = timeout
+        self._reads = READS.get(name, ())
+        self._writes = WRITES.get(name, ())
+
+    def __getattr__(self, attr_name):
+        attr = getattr(self._repository, attr_name)
+        if attr_name.startswith('_') or not callable(attr):
+            return attr
+        if attr_name in self._cached_methods:
+            return self._read_through(attr_name, attr)
+        if attr_name.startswith(READ_PREFIXES) and not attr_name.startswith(WRITE_PREFIXES):
+            return attr
+        return self._write_through(attr)
+
+    @property
+    def wrapped(self):
+        return self._repository
+
+    def with_plan(self, name: str) -> 'CachedRepository':
+        planned = self._repository.with_plan(name)
+        return CachedRepository(planned, self._name, self._cached_methods, self._cache_alias, self._timeout)
+
+    # ---------- reads ----------
+
+    def _read_through(self, method_name, method):
+        def cached_call(*args, **kwargs):
+            key = self._entry_key(method_name, args, kwargs)
+            if key is None:
+                return method(*args, **kwargs)
+
+            value = self._cache.get(key, _MISSING)
+            stats_key = f'{self._name}.{method_name}'
+            if value is not _MISSING:
+                cache_stats.record(stats_key, hit=True)
+                return value
+
+            cache_stats.record(stats_key, hit=False)
+            value = method(*args, **kwargs)
+            if not db_transaction.get_connection().in_atomic_block:
+                # Never cache what may be an uncommitted read
+                self._cache.set(key, value, self._timeout)
+            return value
+        return cached_call
+
+    def _entry_key(self, method_name, args, kwargs):
+        parts = []
+        for value in list(args) + [kwargs[k] for k in sorted(kwargs)]:
+            part = _key_part(value)
+            if part is None:
+                return None
+            parts.append(part)
+        parts.extend(sorted(kwargs))
+        versions = ':'.join(str(v) for v in self._versions(self._reads))
+        digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+        plan = getattr(self._repository, 'fetch_plan', 'default')
+        return f'repo:{self._name}.{plan}:{method_name}:{digest}:{versions}'
+
+    def _versions(self, model_classes: Tuple[type, ...]):
+        keys = [_version_key(model) for model in model_classes]
+        found = self._cache.get_many(keys)
+        versions = []
+        for key in keys:
+            version = found.get(key)
+            if version is None:
+                # Start unseen / evicted versions at a fresh value so no stale entry can match
+                version = _fresh_version()
+                if not self._cache.add(key, version, None):
+                    version = self._cache.get(key, version)
+            versions.append(version)
+        return versions
+
+    # ---------- writes ----------
+
+    def _write_through(self, method):
+        def write_call(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._bump()
+                db_transaction.on_commit(self._bump)
+        return write_call
+
+    def _bump(self):
+        for model in self._writes:
+            key = _version_key(model)
+            try:
+                self._cache.incr(key)
+            except ValueError:
+                self._cache.set(key, _fresh_version(), None)
+
+
+def _version_key(model) -> str:
+    return f'repo:version:{model._meta.label_lower}'
+
+
+def _fresh_version() -> int:
+    return time.time_ns() // 1000
+
+
+def _key_part(value):
+    if isinstance(value, models.Model):
+        return f'{value._meta.label_lower}#{value.pk}'
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return repr(value)
+
+
+def wrap_repositories(service) -> None:
+    """Replace the repositories of a RepositoryService with cached ones, as configured in settings"""
+    config = getattr(settings, 'REPOSITORY_CACHE', None) or {}
+    if not config.get('ENABLED', False):
+        return
+    alias = config.get('ALIAS', 'default')
+    timeout = config.get('TIMEOUT', 300)
+    if isinstance(caches[alias], LocMemCache) and not config.get('ALLOW_PROCESS_LOCAL', False):
+        raise ImproperlyConfigured(
+            f'REPOSITORY_CACHE uses the per-process LocMemCache {alias!r}: writes in one worker would not '
+            'invalidate the others. Configure a shared backend or set ALLOW_PROCESS_LOCAL for a single process.'
+        )
+    # Repositories without cached methods are wrapped too: their writes must still bump versions
+    for name, methods in config.get('REPOSITORIES', {}).items():
+        repository = getattr(service, name, None)
+        if repository is not None:
+            setattr(service, name, CachedRepository(repository, name, methods, alias, timeout))
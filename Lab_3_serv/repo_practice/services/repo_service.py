@@ -4,6 +4,8 @@ from ..repositories.employee_repo import EmployeeRepository
 from ..repositories.sale_repo import SaleRepository
 from ..repositories.dealer_profile_repo import DealerProfileRepository
 from ..repositories.transaction_repo import TransactionRepository
+from ..repositories.dealer_stats_repo import DealerStatsRepository
+from .cache_layer import wrap_repositories
 
 
 class RepositoryService:
@@ -14,6 +16,8 @@ class RepositoryService:
         self.sales = SaleRepository()
         self.dealer_profiles = DealerProfileRepository()
         self.transactions = TransactionRepository()
+        self.dealer_stats = DealerStatsRepository()
+        wrap_repositories(self)
 
 # Глобальний екземпляр для використання
 repository_service = RepositoryService()
\ No newline at end of file
@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
+
+from ..models import Car, Transaction
+from ..monitoring import counted_trade
+from .repo_service import RepositoryService
+
+
+class TradeError(Exception):
+    """Trade rejected; status_code and details go straight into the API response"""
+    status_code = 400
+
+    def __init__(self, message: str, **details):
+        super().__init__(message)
+        self.details = details
+
+
+class CarNotFound(TradeError):
+    status_code = 404
+
+
+class InsufficientBalance(TradeError):
+    status_code = 400
+
+
+class TradeConflict(TradeError):
+    """Car or balance changed between the check and the write; the trade was rolled back"""
+    status_code = 409
+
+
+@dataclass
+class TradeResult:
+    transaction: Transaction
+    car: Car
+
+
+class TradeEngine:
+    """
+    Buy / sell / modify without read-modify-write of balances.
+
+    Every trade is one short DB transaction:
+      1. conditional UPDATE of the car (owner / price must still be what we read),
+      2. conditional UPDATE of the balance (balance = balance - x WHERE balance >= x),
+      3. INSERT of the ledger row.
+    The car row is always locked before the profile row, so trades cannot deadlock each other.
+    The car is read past the repository cache: a stale owner or price would only turn
+    a valid trade into a conflict.
+    """
+
+    def __init__(self, repo: RepositoryService = None):
+        self.repo = repo or RepositoryService()
+
+    @counted_trade('BUY')
+    def buy(self, user: User, car_id) -> TradeResult:
+        car = self.repo.cars.get_uncached(car_id)
+        if not car:
+            raise CarNotFound('Car not found')
+        if car.owner_id == user.id:
+            raise TradeError('You already own this car!')
+        if car.owner_id is not None:
+            # Cars are bought from stock only; the owner would lose the car without being paid
+            raise TradeError('Car is owned by another dealer')
+
+        self.repo.dealer_profiles.get_or_create_by_user(user)
+        price = car.price
+
+        with db_transaction.atomic():
+            if not self.repo.cars.patch(car, expected={'owner': None, 'price': price}, owner=user):
+                raise TradeConflict('Car was just sold or repriced, please retry')
+
+            balance_after = self.repo.dealer_profiles.debit(user, price)
+            if balance_after is None:
+                raise InsufficientBalance(
+                    'Insufficient balance',
+                    required=str(price),
+                    balance=str(self.repo.dealer_profiles.get_balance(user)),
+                )
+
+            transaction_obj = self.repo.transactions.create(
+                dealer=user,
+                car=car,
+                transaction_type='BUY',
+                amount=-price,
+                description=f'Purchased {car.make} {car.model} ({car.year})',
+                balance_before=balance_after + price,
+                balance_after=balance_after,
+            )
+        return TradeResult(transaction=transaction_obj, car=car)
+
+    @counted_trade('SELL')
+    def sell(self, user: User, car_id) -> TradeResult:
+        car = self.repo.cars.get_uncached(car_id)
+        if not car or car.owner_id != user.id:
+            raise CarNotFound('Car not found or not owned by you')
+
+        self.repo.dealer_profiles.get_or_create_by_user(user)
+        price = car.price
+
+        with db_transaction.atomic():
+            if not self.repo.cars.patch(car, expected={'owner': user, 'price': price}, owner=None):
+                raise TradeConflict('Car is no longer owned by you or was repriced, please retry')
+
+            balance_after = self.repo.dealer_profiles.credit(user, price)
+
+            transaction_obj = self.repo.transactions.create(
+                dealer=user,
+                car=car,
+                transaction_type='SELL',
+                amount=price,
+                description=f'Sold {car.make} {car.model} ({car.year})',
+                balance_before=balance_after - price,
+                balance_after=balance_after,
+            )
+        return TradeResult(transaction=transaction_obj, car=car)
+
+    @counted_trade('MODIFY')
+    def modify(self, user: User, car_id, modification_cost: Decimal, price_increase: Decimal,
+               description: str = 'Car modification') -> TradeResult:
+        car = self.repo.cars.get_uncached(car_id)
+        if not car or car.owner_id != user.id:
+            raise CarNotFound('Car not found or not owned by you')
+
+        self.repo.dealer_profiles.get_or_create_by_user(user)
+        old_price = car.price
+        new_price = old_price + price_increase
+
+        with db_transaction.atomic():
+            if not self.repo.cars.patch(car, expected={'owner': user, 'price': old_price}, price=new_price):
+                raise TradeConflict('Car changed, please retry')
+
+            balance_after = self.repo.dealer_profiles.debit(user, modification_cost)
+            if balance_after is None:
+                raise InsufficientBalance(
+                    'Insufficient balance',
+                    required=str(modification_cost),
+                    balance=str(self.repo.dealer_profiles.get_balance(user)),
+                )
+
+            transaction_obj = self.repo.transactions.create(
+                dealer=user,
+                car=car,
+                transaction_type='MODIFY',
+                amount=-modification_cost,
+                description=f'{description} - Price increased from ${old_price} to ${new_price}',
+                balance_before=balance_after + modification_cost,
+                balance_after=balance_after,
+            )
+        return TradeResult(transaction=transaction_obj, car=car)
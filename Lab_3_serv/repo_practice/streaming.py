@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional, Sequence
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def iter_json_array(rows: Iterable, serializer_class, key: Optional[str] = None) -> Iterator[str]:
+    """
+    Serialize rows one by one into a JSON array.
+    With key set the array is wrapped as {"<key>": [...]} to keep existing response shapes.
+    """
+    encoder = JSONEncoder(ensure_ascii=False)
+    yield '{%s:[' % json.dumps(key) if key else '['
+    separator = ''
+    for row in rows:
+        yield separator + encoder.encode(serializer_class(row).data)
+        separator = ','
+    yield ']}' if key else ']'
+
+
+def stream_json_array(rows: Iterable, serializer_class, key: Optional[str] = None) -> StreamingHttpResponse:
+    """
+    StreamingHttpResponse over a repository stream().
+    The first byte is sent after the first chunk is read, and memory stays bounded by the chunk size.
+    """
+    return StreamingHttpResponse(
+        iter_json_array(rows, serializer_class, key),
+        content_type='application/json',
+    )
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+EXPORT_BATCH_ROWS = 500  # rows encoded per yielded piece
+
+
+def export_value(value):
+    """Decimals as exact strings, datetimes as ISO 8601 with Z, like the serializers"""
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def iter_csv(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([export_value(value) for value in row])
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_jsonl(columns: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    lines = []
+    for row in rows:
+        lines.append(encode(dict(zip(columns, [export_value(value) for value in row]))))
+        if len(lines) == EXPORT_BATCH_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def iter_gzip(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Compress on the fly: one gzip member, flushed only at the end"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for piece in pieces:
+        data = compressor.compress(piece.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(columns: Sequence[str], rows: Iterable[tuple], output: str = 'csv',
+                  compress: bool = False, filename: str = 'export') -> StreamingHttpResponse:
+    """
+    CSV or newline-delimited JSON download over a repository stream_export(),
+    optionally gzipped; memory is bounded by the repository chunk size.
+    """
+    if output not in EXPORT_FORMATS:
+        raise ValueError(f"output must be one of {', '.join(EXPORT_FORMATS)}")
+    content_type, extension = EXPORT_FORMATS[output]
+    pieces = iter_csv(columns, rows) if output == 'csv' else iter_jsonl(columns, rows)
+    filename = f'{filename}.{extension}'
+    if compress:
+        pieces = iter_gzip(pieces)
+        content_type = 'application/gzip'
+        filename += '.gz'
+    response = StreamingHttpResponse(pieces, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
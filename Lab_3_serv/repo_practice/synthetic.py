@@ -0,0 +1,357 @@
+"""
+Synthetic data for benchmarks and profiling.
+
+Rows are generated in chunks from their own RNG (seed + table + chunk number),
+so the same seed always yields the same data. Dealer trades are simulated the
+way TradeEngine applies them, so the ledger reconciles with every
+DealerProfile.balance: balance == initial balance + sum(transaction amounts).
+"""
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+from django.contrib.auth.models import User
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Car, Customer, Employee, Sale, DealerProfile, Transaction
+from .repositories import DealerStatsRepository, SalesRollupRepository
+
+DEALER_PREFIX = 'seed_dealer_'
+CUSTOMER_EMAIL_DOMAIN = 'seed.example.com'
+
+CATALOG = {
+    'BMW': ['M5 Competition', 'X7 M60i', '3 Series 330i', 'iX xDrive50', 'X5 xDrive40i', 'M3 Touring'],
+    'Porsche': ['911 Turbo S', 'Cayenne Turbo', 'Taycan 4S', 'Macan GTS', 'Panamera 4'],
+    'Mercedes-Benz': ['AMG GT', 'S-Class', 'E-Class', 'G 63 AMG', 'EQS 580'],
+    'Audi': ['RS6 Avant', 'Q8 e-tron', 'A4 Allroad', 'R8 V10'],
+    'Toyota': ['Camry', 'RAV4 Hybrid', 'Land Cruiser 300', 'Corolla'],
+    'Volkswagen': ['Golf GTI', 'Passat', 'Touareg', 'ID.4'],
+    'Skoda': ['Octavia', 'Superb', 'Kodiaq'],
+    'Volvo': ['XC90', 'XC60', 'S90'],
+}
+BASE_PRICE = {
+    'BMW': 60000, 'Porsche': 110000, 'Mercedes-Benz': 80000, 'Audi': 65000,
+    'Toyota': 35000, 'Volkswagen': 30000, 'Skoda': 27000, 'Volvo': 55000,
+}
+FIRST_NAMES = ['Олександр', 'Марія', 'Іван', 'Анна', 'Дмитро', 'Олена', 'Андрій', 'Софія', 'Максим', 'Юлія']
+LAST_NAMES = ['Петренко', 'Коваленко', 'Шевченко', 'Бондаренко', 'Ткаченко', 'Кравченко', 'Мельник', 'Бойко']
+POSITIONS = ['Менеджер з продажу', 'Старший консультант', 'Консультант', 'Механік', 'Директор']
+
+
+@dataclass
+class DatasetSize:
+    cars: int = 10000
+    customers: int = 5000
+    employees: int = 100
+    dealers: int = 100
+    sales: int = 10000
+    transactions: int = 50000
+    trading_cars: int = 50000  # the cars the simulated dealers trade, taken from the seeded ones
+
+
+@dataclass
+class IdPool:
+    """Ids of one seeded table: a contiguous range when the database allowed it, else the full list"""
+    first: int
+    count: int
+    ids: Optional[List[int]] = None
+
+    def pick(self, rng: random.Random) -> int:
+        if self.ids is not None:
+            return self.ids[rng.randrange(self.count)]
+        return self.first + rng.randrange(self.count)
+
+
+def next_dealer_number() -> int:
+    """One past the highest seed_dealer_<n>: counting them would reuse names once any was deleted"""
+    names = User.objects.filter(username__startswith=DEALER_PREFIX).values_list('username', flat=True)
+    numbers = (name[len(DEALER_PREFIX):] for name in names.iterator())
+    return max((int(number) for number in numbers if number.isdecimal()), default=-1) + 1
+
+
+def chunk_rng(seed: int, table: str, chunk: int) -> random.Random:
+    return random.Random(f'{seed}:{table}:{chunk}')
+
+
+def spread(start: datetime, span: timedelta, index: int, total: int) -> datetime:
+    return start + span * ((index + 0.5) / max(total, 1))
+
+
+def cents(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+# ---------- per-chunk row generators (module level, so they can run in worker processes) ----------
+
+def make_cars(seed: int, chunk: int, start: int, count: int, since: datetime, span: timedelta) -> List[Car]:
+    rng = chunk_rng(seed, 'cars', chunk)
+    makes = list(CATALOG)
+    rows = []
+    for _ in range(count):
+        make = rng.choice(makes)
+        year = rng.randint(2012, 2025)
+        age_discount = 1 - (2025 - year) * 0.045
+        price = int(BASE_PRICE[make] * age_discount * rng.uniform(0.8, 1.5) * 100)
+        rows.append(Car(
+            make=make, model=rng.choice(CATALOG[make]), year=year, price=cents(price),
+            in_stock=rng.random() < 0.85, created_at=since + span * rng.random(),
+        ))
+    return rows
+
+
+def make_customers(seed: int, chunk: int, start: int, count: int, since: datetime, span: timedelta) -> List[Customer]:
+    rng = chunk_rng(seed, 'customers', chunk)
+    return [
+        Customer(
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            email=f'customer{start + i}@{CUSTOMER_EMAIL_DOMAIN}',
+            phone=f'+38067{rng.randrange(10 ** 7):07d}', created_at=since + span * rng.random(),
+        )
+        for i in range(count)
+    ]
+
+
+def make_employees(seed: int, chunk: int, start: int, count: int, since: datetime, span: timedelta) -> List[Employee]:
+    rng = chunk_rng(seed, 'employees', chunk)
+    return [
+        Employee(
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            position=rng.choice(POSITIONS), hire_date=(since - timedelta(days=rng.randrange(3650))).date(),
+        )
+        for _ in range(count)
+    ]
+
+
+def make_sales(seed: int, chunk: int, start: int, count: int, since: datetime, span: timedelta,
+               cars: IdPool, customers: IdPool, employees: IdPool) -> List[Sale]:
+    rng = chunk_rng(seed, 'sales', chunk)
+    return [
+        Sale(
+            car_id=cars.pick(rng), customer_id=customers.pick(rng), employee_id=employees.pick(rng),
+            sale_price=cents(rng.randrange(15000_00, 250000_00)), sale_date=since + span * rng.random(),
+        )
+        for _ in range(count)
+    ]
+
+
+def run_chunk(job):
+    """Pool.imap() entry point: job is (generator, args)"""
+    generator, args = job
+    return generator(*args)
+
+
+# ---------- ledger ----------
+
+class LedgerSimulator:
+    """
+    Replays random buy / sell / modify trades in memory with TradeEngine's rules:
+    a dealer buys unowned cars it can afford, sells or modifies only its own cars.
+    """
+
+    def __init__(self, seed: int, dealer_ids: List[int], cars: List[tuple], initial_balances: List[int]):
+        self.rng = chunk_rng(seed, 'ledger', 0)
+        self.dealer_ids = dealer_ids
+        self.balances = list(initial_balances)           # cents, per dealer index
+        self.car_ids = [car[0] for car in cars]
+        self.car_labels = [f'{make} {model} ({year})' for _, make, model, year, _ in cars]
+        self.car_prices = [int(price * 100) for *_, price in cars]
+        self.car_owner = [-1] * len(cars)                 # dealer index or -1
+        self.owned: List[List[int]] = [[] for _ in dealer_ids]
+        self.changed_cars = set()
+
+    def trades(self, total: int, since: datetime, span: timedelta):
+        """Yield Transaction objects, oldest first"""
+        produced = 0
+        attempts = 0
+        while produced < total and attempts < total * 20:
+            attempts += 1
+            dealer = self.rng.randrange(len(self.dealer_ids))
+            roll = self.rng.random()
+            if self.owned[dealer] and roll < 0.35:
+                tx = self.sell(dealer)
+            elif self.owned[dealer] and roll < 0.5:
+                tx = self.modify(dealer)
+            else:
+                tx = self.buy(dealer)
+            if tx is None:
+                continue
+            tx.created_at = spread(since, span, produced, total)
+            produced += 1
+            yield tx
+
+    def buy(self, dealer: int) -> Optional[Transaction]:
+        for _ in range(8):
+            car = self.rng.randrange(len(self.car_ids))
+            price = self.car_prices[car]
+            if self.car_owner[car] == -1 and price <= self.balances[dealer]:
+                break
+        else:
+            return None
+        self.car_owner[car] = dealer
+        self.owned[dealer].append(car)
+        self.changed_cars.add(car)
+        return self.transaction(dealer, car, 'BUY', -price, f'Purchased {self.car_labels[car]}')
+
+    def sell(self, dealer: int) -> Transaction:
+        cars = self.owned[dealer]
+        position = self.rng.randrange(len(cars))
+        car = cars[position]
+        cars[position] = cars[-1]
+        cars.pop()
+        self.car_owner[car] = -1
+        return self.transaction(dealer, car, 'SELL', self.car_prices[car], f'Sold {self.car_labels[car]}')
+
+    def modify(self, dealer: int) -> Optional[Transaction]:
+        car = self.rng.choice(self.owned[dealer])
+        old_price = self.car_prices[car]
+        cost = max(100_00, int(old_price * self.rng.uniform(0.01, 0.05)))
+        if cost > self.balances[dealer]:
+            return None
+        new_price = old_price + int(cost * self.rng.uniform(1.1, 2.0))
+        self.car_prices[car] = new_price
+        self.changed_cars.add(car)
+        description = f'Car modification - Price increased from ${cents(old_price)} to ${cents(new_price)}'
+        return self.transaction(dealer, car, 'MODIFY', -cost, description)
+
+    def transaction(self, dealer: int, car: int, tx_type: str, amount: int, description: str) -> Transaction:
+        before = self.balances[dealer]
+        after = before + amount
+        self.balances[dealer] = after
+        return Transaction(
+            dealer_id=self.dealer_ids[dealer], car_id=self.car_ids[car], transaction_type=tx_type,
+            amount=cents(amount), description=description,
+            balance_before=cents(before), balance_after=cents(after),
+        )
+
+    def final_cars(self) -> List[Car]:
+        """Cars whose owner or price the trades changed, ready for bulk_update"""
+        return [
+            Car(id=self.car_ids[car], price=cents(self.car_prices[car]),
+                owner_id=self.dealer_ids[self.car_owner[car]] if self.car_owner[car] != -1 else None)
+            for car in sorted(self.changed_cars)
+        ]
+
+
+# ---------- generator ----------
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the generated created_at / sale_date instead of now()"""
+    fields = [f for model in models for f in model._meta.concrete_fields if getattr(f, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class SyntheticDataset:
+    """
+    Seed the database in chunked bulk_create()s.
+    progress(table, rows_done, rows_total) is called after every chunk.
+    map_chunks(generator, jobs) runs the row generators in order; pass one backed by
+    Pool.imap(run_chunk, ...) to generate rows in worker processes. The ledger is always
+    simulated in this process: every trade depends on the balances left by the previous ones.
+    """
+
+    def __init__(self, size: DatasetSize, seed: int = 42, batch_size: int = 5000, days: int = 365,
+                 progress: Callable[[str, int, int], None] = None, map_chunks=None):
+        self.size = size
+        self.seed = seed
+        self.batch_size = batch_size
+        self.span = timedelta(days=days)
+        self.since = timezone.now() - self.span
+        self.progress = progress or (lambda table, done, total: None)
+        self.map_chunks = map_chunks or (lambda function, jobs: (function(*job) for job in jobs))
+
+    def generate(self) -> Dict[str, int]:
+        with explicit_timestamps(Car, Customer, Sale, DealerProfile, Transaction):
+            dealer_ids = self.seed_dealers()
+            cars = self.seed_rows('cars', Car, make_cars, self.size.cars)
+            customers = self.seed_rows('customers', Customer, make_customers, self.size.customers)
+            employees = self.seed_rows('employees', Employee, make_employees, self.size.employees)
+            if self.size.sales:
+                self.seed_rows('sales', Sale, make_sales, self.size.sales, extra=(cars, customers, employees))
+                # Back-dated sales land below the rollup high-water mark
+                SalesRollupRepository().rebuild()
+                self.progress('sales_rollups', self.size.sales, self.size.sales)
+            self.seed_ledger(dealer_ids, cars)
+        return {
+            'dealers': len(dealer_ids), 'cars': self.size.cars, 'customers': self.size.customers,
+            'employees': self.size.employees, 'sales': self.size.sales, 'transactions': self.transactions_written,
+        }
+
+    def seed_rows(self, table: str, model, generator, total: int, extra: tuple = ()) -> IdPool:
+        before = model.objects.aggregate(last=Max('id'))['last'] or 0
+        jobs = [
+            (self.seed, chunk, start, min(self.batch_size, total - start), self.since, self.span, *extra)
+            for chunk, start in enumerate(range(0, total, self.batch_size))
+        ]
+        done = 0
+        for rows in self.map_chunks(generator, jobs):
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+            done += len(rows)
+            self.progress(table, done, total)
+        return self.id_pool(model, before, total)
+
+    def id_pool(self, model, after_id: int, count: int) -> IdPool:
+        last = model.objects.aggregate(last=Max('id'))['last'] or 0
+        first = last - count + 1
+        if first > after_id and model.objects.filter(id__gte=first).count() == count:
+            return IdPool(first=first, count=count)
+        # Non-contiguous ids (e.g. auto_increment_increment > 1 on MySQL)
+        id_list = list(model.objects.filter(id__gt=after_id).order_by('id').values_list('id', flat=True))
+        return IdPool(first=id_list[0] if id_list else 0, count=len(id_list), ids=id_list)
+
+    def seed_dealers(self) -> List[int]:
+        start = next_dealer_number()
+        users = [User(username=f'{DEALER_PREFIX}{start + i}') for i in range(self.size.dealers)]
+        for user in users:
+            user.set_unusable_password()
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        names = [user.username for user in users]
+        dealer_ids = list(User.objects.filter(username__in=names).order_by('id').values_list('id', flat=True))
+        self.progress('dealers', len(dealer_ids), self.size.dealers)
+        return dealer_ids
+
+    def seed_ledger(self, dealer_ids: List[int], cars: IdPool):
+        rng = chunk_rng(self.seed, 'balances', 0)
+        initial = [rng.randrange(50_000_00, 500_000_00) for _ in dealer_ids]
+        self.transactions_written = 0
+
+        trading = min(self.size.trading_cars, cars.count)
+        pool = Car.objects.filter(id__gte=cars.first).order_by('id').values_list('id', 'make', 'model', 'year', 'price')
+        simulator = LedgerSimulator(self.seed, dealer_ids, list(pool[:trading]), initial)
+
+        total = self.size.transactions if trading and dealer_ids else 0
+        batch = []
+        for tx in simulator.trades(total, self.since, self.span):
+            batch.append(tx)
+            if len(batch) == self.batch_size:
+                self.write_transactions(batch, total)
+                batch = []
+        if batch:
+            self.write_transactions(batch, total)
+
+        changed = simulator.final_cars()
+        Car.objects.bulk_update(changed, ['owner', 'price'], batch_size=self.batch_size)
+        DealerProfile.objects.bulk_create([
+            DealerProfile(user_id=dealer_id, balance=cents(balance), created_at=self.since)
+            for dealer_id, balance in zip(dealer_ids, simulator.balances)
+        ], batch_size=self.batch_size)
+
+        stats = DealerStatsRepository()
+        for start in range(0, len(dealer_ids), self.batch_size):
+            stats.rebuild_for(dealer_ids[start:start + self.batch_size])
+        self.progress('dealer_stats', len(dealer_ids), len(dealer_ids))
+
+    def write_transactions(self, batch: List[Transaction], total: int):
+        Transaction.objects.bulk_create(batch, batch_size=self.batch_size)
+        self.transactions_written += len(batch)
+        self.progress('transactions', self.transactions_written, total)
@@ -1,3 +1,715 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Car, Customer, DealerProfile, DealerStats, Employee, Sale, Transaction
+from .query_budget import QueryBudgetExceeded, assert_query_budget
+from .repositories.dealer_stats_repo import ledger_totals
+from .serializers import CarSerializer
+from .repositories.car_repo import CarRepository
+from .services.cache_layer import CachedRepository
+from .services.repo_service import RepositoryService
+from .services.trade_engine import InsufficientBalance, TradeConflict, TradeEngine, TradeError
+
+
+def make_cars(count, **fields):
+    return [Car.objects.create(make='Toyota', model='Corolla', year=2020, price=Decimal('1000.00') + index, **fields)
+            for index in range(count)]
+
+
+def make_dealer(username, balance='10000.00'):
+    user = User.objects.create_user(username=username, password='pw')
+    DealerProfile.objects.create(user=user, balance=Decimal(balance))
+    return user
+
+
+class QueryBudgetTests(TestCase):
+    def test_within_budget(self):
+        with assert_query_budget(queries=1) as report:
+            list(Car.objects.all())
+        self.assertEqual(report.count, 1)
+
+    def test_over_query_budget_raises(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 queries > budget 1'):
+            with assert_query_budget(queries=1):
+                list(Car.objects.all())
+                list(Customer.objects.all())
+
+    def test_repeated_shape_is_reported_as_n_plus_1(self):
+        cars = make_cars(3)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'N+1: 3x'):
+            with assert_query_budget(repeated_shape=3):
+                for car in cars:
+                    Car.objects.get(pk=car.pk)
+
+    def test_middleware_reports_queries(self):
+        user = make_dealer('budget')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/cars/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+
+    @override_settings(QUERY_BUDGET={'RAISE': True, 'DEFAULT': {'queries': 0}})
+    def test_middleware_raises_in_tests(self):
+        user = make_dealer('budget')
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'GET /api/cars/ over query budget'):
+            client.get('/api/cars/')
+
+    def test_sale_list_is_not_n_plus_1(self):
+        customer = Customer.objects.create(first_name='A', last_name='B', email='a@b.c', phone='1')
+        employee = Employee.objects.create(first_name='C', last_name='D', position='Seller', hire_date='2024-01-01')
+        for car in make_cars(20):
+            Sale.objects.create(car=car, customer=customer, employee=employee, sale_price=car.price)
+        user = make_dealer('budget')
+        client = APIClient()
+        client.force_authenticate(user)
+        with assert_query_budget(queries=10, repeated_shape=5):
+            response = client.get('/api/sales/')
+        self.assertEqual(len(response.json()['results']), 20)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.repo = RepositoryService()
+        self.cars = make_cars(7)
+
+    def test_walks_forward_and_back(self):
+        first = self.repo.cars.get_page(limit=3)
+        self.assertEqual([car.pk for car in first.items], [car.pk for car in self.cars[:3]])
+        self.assertIsNone(first.prev_cursor)
+
+        second = self.repo.cars.get_page(cursor=first.next_cursor, limit=3)
+        third = self.repo.cars.get_page(cursor=second.next_cursor, limit=3)
+        self.assertEqual([car.pk for car in third.items], [self.cars[6].pk])
+        self.assertIsNone(third.next_cursor)
+
+        back = self.repo.cars.get_page(cursor=third.prev_cursor, limit=3)
+        self.assertEqual([car.pk for car in back.items], [car.pk for car in second.items])
+
+    def test_rows_deleted_before_the_cursor_do_not_shift_pages(self):
+        first = self.repo.cars.get_page(limit=3)
+        Car.objects.filter(pk=self.cars[0].pk).delete()
+        second = self.repo.cars.get_page(cursor=first.next_cursor, limit=3)
+        self.assertEqual([car.pk for car in second.items], [car.pk for car in self.cars[3:6]])
+
+    def test_invalid_cursor(self):
+        with self.assertRaisesMessage(ValueError, 'Invalid cursor'):
+            self.repo.cars.get_page(cursor='not-a-cursor')
+
+    def test_api_links(self):
+        client = APIClient()
+        client.force_authenticate(make_dealer('pages'))
+        seen = []
+        url = '/api/cars/?limit=3'
+        while url:
+            body = client.get(url).json()
+            seen += [car['id'] for car in body['results']]
+            url = body['next']
+        self.assertEqual(seen, [car.pk for car in self.cars])
+        self.assertEqual(client.get('/api/cars/?cursor=bad').status_code, 400)
+
+
+class PatchTests(TestCase):
+    def setUp(self):
+        self.repo = RepositoryService()
+        self.car = make_cars(1)[0]
+        self.dealer = make_dealer('patch')
+
+    def test_precondition_holds(self):
+        self.assertTrue(self.repo.cars.patch(self.car.pk, expected={'owner': None}, owner=self.dealer))
+        self.assertEqual(Car.objects.get(pk=self.car.pk).owner_id, self.dealer.pk)
+
+    def test_precondition_fails_and_nothing_is_written(self):
+        Car.objects.filter(pk=self.car.pk).update(price=Decimal('5.00'))
+        self.assertFalse(self.repo.cars.patch(self.car.pk, expected={'price': self.car.price}, owner=self.dealer))
+        self.assertIsNone(self.repo.cars.patch(self.car, expected={'price': self.car.price}, owner=self.dealer))
+        self.assertIsNone(Car.objects.get(pk=self.car.pk).owner_id)
+
+    def test_instance_and_refresh(self):
+        patched = self.repo.cars.patch(self.car, price=Decimal('2000.00'))
+        self.assertIs(patched, self.car)
+        self.assertEqual(self.car.price, Decimal('2000.00'))
+        refreshed = self.repo.cars.patch(self.car.pk, refresh=True, in_stock=False)
+        self.assertFalse(refreshed.in_stock)
+
+    def test_only_given_columns_are_written(self):
+        with assert_query_budget(queries=1) as report:
+            self.repo.cars.patch(self.car.pk, in_stock=False)
+        self.assertNotIn('price', report.queries[0].sql.split('WHERE')[0])
+
+    def test_missing_row(self):
+        self.assertFalse(self.repo.cars.patch(0, in_stock=False))
+
+
+class TradeEngineTests(TestCase):
+    def setUp(self):
+        self.engine = TradeEngine()
+        self.dealer = make_dealer('buyer', balance='5000.00')
+        self.other = make_dealer('other')
+        self.car = make_cars(1)[0]
+
+    def balance(self, user):
+        return DealerProfile.objects.get(user=user).balance
+
+    def test_buy_modify_sell(self):
+        self.engine.buy(self.dealer, self.car.pk)
+        self.engine.modify(self.dealer, self.car.pk, Decimal('100.00'), Decimal('150.00'))
+        result = self.engine.sell(self.dealer, self.car.pk)
+        self.assertEqual(result.transaction.amount, Decimal('1150.00'))
+        self.assertEqual(self.balance(self.dealer), Decimal('5050.00'))
+        self.assertEqual(Transaction.objects.filter(dealer=self.dealer).count(), 3)
+        self.assertIsNone(Car.objects.get(pk=self.car.pk).owner_id)
+
+    def test_car_owned_by_another_dealer(self):
+        Car.objects.filter(pk=self.car.pk).update(owner=self.other)
+        with self.assertRaisesMessage(TradeError, 'Car is owned by another dealer'):
+            self.engine.buy(self.dealer, self.car.pk)
+
+    def test_car_sold_between_read_and_write(self):
+        stale = Car.objects.get(pk=self.car.pk)
+        Car.objects.filter(pk=self.car.pk).update(owner=self.other)
+        with mock.patch.object(self.engine.repo.cars, 'get_uncached', return_value=stale):
+            with self.assertRaises(TradeConflict) as raised:
+                self.engine.buy(self.dealer, self.car.pk)
+        self.assertEqual(raised.exception.status_code, 409)
+        self.assertEqual(Car.objects.get(pk=self.car.pk).owner_id, self.other.pk)
+        self.assertEqual(self.balance(self.dealer), Decimal('5000.00'))
+
+    def test_car_repriced_between_read_and_write(self):
+        stale = Car.objects.get(pk=self.car.pk)
+        Car.objects.filter(pk=self.car.pk).update(price=Decimal('10.00'))
+        with mock.patch.object(self.engine.repo.cars, 'get_uncached', return_value=stale):
+            with self.assertRaises(TradeConflict):
+                self.engine.buy(self.dealer, self.car.pk)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_insufficient_balance_rolls_back_the_car(self):
+        Car.objects.filter(pk=self.car.pk).update(price=Decimal('9000.00'))
+        with self.assertRaises(InsufficientBalance) as raised:
+            self.engine.buy(self.dealer, self.car.pk)
+        self.assertEqual(raised.exception.details['balance'], '5000.00')
+        self.assertIsNone(Car.objects.get(pk=self.car.pk).owner_id)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_api_status_codes(self):
+        client = APIClient()
+        client.force_authenticate(self.dealer)
+        self.assertEqual(client.post('/api/dealer/sell/', {'user_id': self.dealer.pk, 'car_id': self.car.pk},
+                                     format='json').status_code, 404)
+        self.assertEqual(client.post('/api/dealer/buy/', {'user_id': self.dealer.pk, 'car_id': self.car.pk},
+                                     format='json').status_code, 200)
+        self.assertEqual(client.post('/api/dealer/buy/', {'user_id': self.other.pk, 'car_id': self.car.pk},
+                                     format='json').status_code, 400)
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        self.dealer = make_dealer('batch')
+        self.cars = make_cars(2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.dealer)
+
+    def batch(self, requests, atomic=False):
+        return self.client.post('/api/batch/', {'atomic': atomic, 'requests': requests}, format='json')
+
+    def buy(self, car_id):
+        return {'method': 'POST', 'path': '/api/dealer/buy/', 'body': {'user_id': self.dealer.pk, 'car_id': car_id}}
+
+    def test_sub_requests_run_in_order(self):
+        response = self.batch([self.buy(self.cars[0].pk), {'path': f'/api/cars/{self.cars[0].pk}/'}])
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()['responses']
+        self.assertEqual(first['status'], 200)
+        self.assertEqual(second['body']['owner'], self.dealer.pk)
+
+    def test_non_atomic_keeps_earlier_writes(self):
+        response = self.batch([self.buy(self.cars[0].pk), self.buy(999999)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['status'] for item in response.json()['responses']], [200, 404])
+        self.assertEqual(Car.objects.get(pk=self.cars[0].pk).owner_id, self.dealer.pk)
+
+    def test_atomic_rolls_back_on_failure(self):
+        response = self.batch([self.buy(self.cars[0].pk), self.buy(999999), self.buy(self.cars[1].pk)], atomic=True)
+        self.assertEqual(response.status_code, 404)
+        body = response.json()
+        self.assertEqual((body['committed'], body['failed_index'], len(body['responses'])), (False, 1, 2))
+        self.assertFalse(Car.objects.filter(owner=self.dealer).exists())
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_export_is_rejected_per_item(self):
+        response = self.batch([{'path': '/api/sales/export/?output=csv'}, {'path': '/api/cars/?limit=1'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['status'] for item in response.json()['responses']], [406, 200])
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.batch([{'path': '/api/batch/'}]).status_code, 400)
+        self.assertEqual(self.batch([{'method': 'HEAD', 'path': '/api/cars/'}]).status_code, 400)
+        self.assertEqual(self.batch([{'path': '/api/cars/'}] * 101).status_code, 400)
+
+
+class SalesRollupTests(TestCase):
+    """get_sales_report() against a plain GROUP BY of the sales table after every kind of write"""
+
+    def setUp(self):
+        self.repo = RepositoryService()
+        self.customers = [Customer.objects.create(first_name='A', last_name=str(index), email=f'{index}@a.b', phone='1')
+                          for index in range(2)]
+        self.employee = Employee.objects.create(first_name='C', last_name='D', position='Seller',
+                                                hire_date='2024-01-01')
+        self.cars = [Car.objects.create(make=make, model=model, year=2020, price=Decimal('1000.00'))
+                     for make, model in [('BMW', 'X5'), ('BMW', 'M3'), ('Audi', 'A4'), ('Audi', 'A4')]]
+        # Three months back, one sale every few days, then a rollup build and a few live sales past the mark
+        now = timezone.now()
+        for index in range(40):
+            sale = Sale.objects.create(car=self.cars[index % 4], customer=self.customers[index % 2],
+                                       employee=self.employee, sale_price=Decimal(1000 + index * 37))
+            Sale.objects.filter(pk=sale.pk).update(sale_date=now - timedelta(days=index * 2 + 1))
+        self.repo.sales.rollups.rebuild()
+        for index in range(3):
+            self.repo.sales.create(car=self.cars[index], customer=self.customers[0], employee=self.employee,
+                                   sale_price=Decimal('500.00'))
+
+    def expected(self, granularity, date_from=None, date_to=None):
+        groups = {}
+        for sale in Sale.objects.select_related('car'):
+            day = timezone.localtime(sale.sale_date).date()
+            if (date_from and day < date_from) or (date_to and day > date_to):
+                continue
+            bucket = {'total': None, 'day': day, 'month': day.replace(day=1)}[granularity]
+            key = (bucket, sale.car.make, sale.car.model)
+            count, revenue, low, high = groups.get(key, (0, Decimal(0), sale.sale_price, sale.sale_price))
+            groups[key] = (count + 1, revenue + sale.sale_price, min(low, sale.sale_price), max(high, sale.sale_price))
+        return groups
+
+    def assertReportExact(self):
+        today = timezone.localdate()
+        ranges = [(None, None), (today - timedelta(days=45), today - timedelta(days=10))]
+        for granularity in ('total', 'day', 'month'):
+            for date_from, date_to in ranges:
+                if granularity == 'month' and date_from:
+                    continue
+                report = self.repo.sales.get_sales_report(date_from, date_to, granularity)
+                actual = {
+                    (row.get('bucket'), row['car__make'], row['car__model']):
+                        (row['total_sales'], Decimal(row['total_revenue']).quantize(Decimal('0.01')),
+                         row['min_price'], row['max_price'])
+                    for row in report
+                }
+                self.assertEqual(actual, self.expected(granularity, date_from, date_to), (granularity, date_from))
+
+    def test_build_plus_live_sales(self):
+        self.assertReportExact()
+        self.repo.sales.rollups.refresh(now=timezone.now() + timedelta(hours=1))
+        self.assertReportExact()
+
+    def test_sale_patch_and_delete(self):
+        sales = list(Sale.objects.order_by('id')[:6])
+        self.repo.sales.patch(sales[0], sale_price=Decimal('99999.00'))
+        self.repo.sales.patch(sales[1].pk, sale_date=timezone.now() - timedelta(days=70))
+        self.repo.sales.bulk_update([{'id': sales[2].pk, 'sale_price': Decimal('1.00')}])
+        self.repo.sales.delete(sales[3].pk)
+        self.repo.sales.bulk_delete([sales[4].pk, sales[5].pk])
+        self.assertReportExact()
+
+    def test_car_rename_and_delete(self):
+        self.repo.cars.patch(self.cars[0], make='BMW', model='X5 M')
+        self.repo.cars.bulk_update([{'id': self.cars[1].pk, 'make': 'Mini'}])
+        self.repo.cars.delete(self.cars[2].pk)
+        self.assertReportExact()
+
+    def test_customer_delete(self):
+        self.repo.customers.delete(self.customers[1].pk)
+        self.assertReportExact()
+        self.assertEqual(Sale.objects.count(), 23)
+
+    def test_report_reads_only(self):
+        with assert_query_budget() as report:
+            self.repo.sales.get_sales_report(granularity='day')
+        self.assertFalse([query for query in report.queries if not query.sql.lstrip().upper().startswith('SELECT')])
+
+
+class DealerStatsTests(TestCase):
+    """DealerStats must equal the ledger aggregated from scratch after every kind of ledger write"""
+
+    def setUp(self):
+        self.repo = RepositoryService()
+        self.dealers = [make_dealer(f'stats{index}', balance='100000.00') for index in range(3)]
+        self.cars = make_cars(4)
+
+    def ledger_row(self, dealer, transaction_type='BUY', amount='-100.00', car=None):
+        return {'dealer': dealer, 'car': car, 'transaction_type': transaction_type, 'amount': Decimal(amount),
+                'balance_before': Decimal('0.00'), 'balance_after': Decimal('0.00')}
+
+    def assertStatsMatchLedger(self):
+        cent = Decimal('0.01')
+        for dealer in self.dealers:
+            ledger = Transaction.objects.filter(dealer=dealer).aggregate(**ledger_totals())
+            stats = DealerStats.objects.filter(pk=dealer.pk).first()
+            if stats is None:
+                self.assertEqual(ledger['buy_count'] + ledger['sell_count'] + ledger['modify_count'], 0, dealer)
+                continue
+            self.assertEqual(
+                (stats.total_spent, stats.total_earned, stats.net_profit,
+                 stats.buy_count, stats.sell_count, stats.modify_count, stats.last_trade_at),
+                (ledger['total_spent'].quantize(cent), ledger['total_earned'].quantize(cent),
+                 (ledger['total_spent'] + ledger['total_earned']).quantize(cent),
+                 ledger['buy_count'], ledger['sell_count'], ledger['modify_count'], ledger['last_trade_at']),
+                dealer,
+            )
+
+    def test_trades(self):
+        engine = TradeEngine(self.repo)
+        for dealer, car in zip(self.dealers, self.cars):
+            engine.buy(dealer, car.pk)
+            engine.modify(dealer, car.pk, Decimal('100.00'), Decimal('250.00'))
+        engine.sell(self.dealers[0], self.cars[0].pk)
+        self.assertStatsMatchLedger()
+        self.assertEqual(self.repo.dealer_stats.get_summary(self.dealers[0])['net_profit'], Decimal('150.00'))
+
+    def test_ledger_writes(self):
+        first, second, third = self.dealers
+        single = self.repo.transactions.create(**self.ledger_row(first))
+        self.repo.transactions.bulk_create([self.ledger_row(first, 'SELL', '500.00'),
+                                            self.ledger_row(second, 'MODIFY', '-20.00'),
+                                            self.ledger_row(third)])
+        self.assertStatsMatchLedger()
+
+        ids = list(Transaction.objects.order_by('id').values_list('id', flat=True))
+        self.repo.transactions.patch(single.pk, amount=Decimal('-300.00'))
+        self.repo.transactions.patch(ids[1], dealer=second)
+        self.repo.transactions.update(ids[2], transaction_type='BUY')
+        self.assertStatsMatchLedger()
+
+        self.repo.transactions.bulk_update([{'id': ids[0], 'dealer_id': third.pk},
+                                            {'id': ids[3], 'amount': Decimal('42.00'), 'transaction_type': 'SELL'}])
+        self.assertStatsMatchLedger()
+
+        self.repo.transactions.delete(ids[0])
+        self.repo.transactions.bulk_delete(ids[1:3])
+        self.assertStatsMatchLedger()
+
+    def test_rebuild_command(self):
+        self.repo.transactions.bulk_create([self.ledger_row(dealer, 'SELL', '70.00') for dealer in self.dealers])
+        DealerStats.objects.filter(pk=self.dealers[0].pk).update(total_earned=Decimal('1.00'), sell_count=9)
+        DealerStats.objects.filter(pk=self.dealers[1].pk).delete()
+        call_command('rebuild_dealer_stats', chunk_size=2, stdout=StringIO())
+        self.assertStatsMatchLedger()
+        self.assertEqual(DealerStats.objects.count(), 3)
+
+    def test_backfill_migration(self):
+        # Ledger rows written past the repository, as before 0003 existed
+        Transaction.objects.bulk_create([Transaction(**self.ledger_row(dealer, 'BUY', f'-{index + 1}0.00'))
+                                         for index, dealer in enumerate(self.dealers * 2)])
+        self.assertFalse(DealerStats.objects.exists())
+        backfill = importlib.import_module('repo_practice.migrations.0008_backfill_dealer_stats')
+        with mock.patch.object(backfill, 'CHUNK_SIZE', 2):
+            backfill.backfill_dealer_stats(apps, None)
+        self.assertStatsMatchLedger()
+        self.assertEqual(DealerStats.objects.count(), 3)
+
+
+CACHED = {
+    'ENABLED': True,
+    'ALLOW_PROCESS_LOCAL': True,
+    'ALIAS': 'repository',
+    'TIMEOUT': 300,
+    'REPOSITORIES': {'cars': ['get_by_id', 'get_unowned_in_stock'], 'dealer_profiles': []},
+}
+
+
+# Reads inside a transaction are never cached, so these tests commit like a server would
+@override_settings(REPOSITORY_CACHE=CACHED)
+class RepositoryCacheTests(TransactionTestCase):
+    def setUp(self):
+        caches['repository'].clear()
+        self.car = make_cars(1)[0]
+        self.reader = RepositoryService()
+
+    def test_repeated_read_is_served_from_the_cache(self):
+        self.assertIsInstance(self.reader.cars, CachedRepository)
+        self.reader.cars.get_by_id(self.car.pk)
+        with assert_query_budget(queries=0):
+            self.assertEqual(self.reader.cars.get_by_id(self.car.pk).price, self.car.price)
+
+    def test_write_through_another_service_invalidates(self):
+        self.reader.cars.get_by_id(self.car.pk)
+        RepositoryService().cars.patch(self.car.pk, price=Decimal('4321.00'))
+        self.assertEqual(self.reader.cars.get_by_id(self.car.pk).price, Decimal('4321.00'))
+
+    def test_trade_invalidates(self):
+        dealer = make_dealer('cached')
+        self.assertEqual([car.pk for car in self.reader.cars.get_unowned_in_stock()], [self.car.pk])
+        TradeEngine().buy(dealer, self.car.pk)
+        self.assertEqual(self.reader.cars.get_unowned_in_stock(), [])
+        self.assertEqual(self.reader.cars.get_by_id(self.car.pk).owner_id, dealer.pk)
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(REPOSITORY_CACHE={**CACHED, 'ALLOW_PROCESS_LOCAL': False}):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'LocMemCache'):
+                RepositoryService()
+
+    def test_disabled(self):
+        with override_settings(REPOSITORY_CACHE={**CACHED, 'ENABLED': False}):
+            self.assertNotIsInstance(RepositoryService().cars, CachedRepository)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.repo = RepositoryService()
+        self.dealers = [make_dealer(f'export{index}') for index in range(2)]
+        self.cars = make_cars(3)
+        for index in range(6):
+            self.repo.transactions.create(
+                dealer=self.dealers[index % 2], car=self.cars[index % 3], transaction_type=('BUY', 'SELL')[index % 2],
+                amount=Decimal(f'{index + 1}00.50'), description=f'Ряд {index}, "quoted"',
+                balance_before=Decimal('0.00'), balance_after=Decimal('0.00'))
+        customer = Customer.objects.create(first_name='A', last_name='B', email='a@b.c', phone='1')
+        employee = Employee.objects.create(first_name='C', last_name='D', position='Seller', hire_date='2024-01-01')
+        now = timezone.now()
+        for index, car in enumerate(self.cars):
+            sale = Sale.objects.create(car=car, customer=customer, employee=employee, sale_price=car.price)
+            Sale.objects.filter(pk=sale.pk).update(sale_date=now - timedelta(days=10 * index))
+        self.client = APIClient()
+        self.client.force_authenticate(self.dealers[0])
+
+    def download(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response, b''.join(response.streaming_content)
+
+    def csv_rows(self, url):
+        _, content = self.download(url)
+        return list(csv.reader(content.decode('utf-8').splitlines()))
+
+    def test_transactions_csv(self):
+        response, _ = self.download('/api/transactions/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="transactions.csv"')
+
+        header, *rows = self.csv_rows('/api/transactions/export/')
+        self.assertEqual(header, [column for column, _ in self.repo.transactions.export_columns])
+        newest = Transaction.objects.order_by('-created_at', '-id').select_related('dealer', 'car')
+        self.assertEqual([int(row[0]) for row in rows], [tx.pk for tx in newest])
+        first = dict(zip(header, rows[0]))
+        tx = newest[0]
+        self.assertEqual((first['dealer_username'], first['car_make'], first['amount'], first['description']),
+                         (tx.dealer.username, tx.car.make, str(tx.amount), tx.description))
+
+    def test_rows_span_several_pieces(self):
+        with mock.patch('repo_practice.streaming.EXPORT_BATCH_ROWS', 4):
+            _, *rows = self.csv_rows('/api/transactions/export/')
+            _, content = self.download('/api/transactions/export/?output=jsonl')
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(content.decode('utf-8').splitlines()), 6)
+
+    def test_transactions_jsonl(self):
+        response, content = self.download(f'/api/transactions/export/?output=jsonl&dealer={self.dealers[1].pk}')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(line['dealer'] == self.dealers[1].pk and line['transaction_type'] == 'SELL'
+                            for line in lines))
+        self.assertEqual(lines[-1]['amount'], '200.50')
+        self.assertTrue(lines[0]['created_at'].endswith('Z'))
+
+    def test_gzip(self):
+        response, content = self.download('/api/transactions/export/?gzip=true&type=buy')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="transactions.csv.gz"')
+        _, plain = self.download('/api/transactions/export/?type=buy')
+        self.assertEqual(gzip.decompress(content), plain)
+        self.assertEqual(len(plain.decode('utf-8').splitlines()), 4)
+
+    def test_transaction_filters(self):
+        _, *rows = self.csv_rows(f'/api/transactions/export/?car={self.cars[0].pk}&type=SELL')
+        self.assertEqual([row[3] for row in rows], [str(self.cars[0].pk)])
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.csv_rows(f'/api/transactions/export/?date_from={today}&date_to={today}')), 7)
+        self.assertEqual(len(self.csv_rows('/api/transactions/export/?date_to=2000-01-01')), 1)
+
+    def test_sales(self):
+        header, *rows = self.csv_rows('/api/sales/export/')
+        self.assertEqual(header, [column for column, _ in self.repo.sales.export_columns])
+        self.assertEqual([int(row[0]) for row in rows], list(Sale.objects.order_by('id').values_list('id', flat=True)))
+
+        date_from = (timezone.localdate() - timedelta(days=15)).isoformat()
+        _, *rows = self.csv_rows(f'/api/sales/export/?date_from={date_from}')
+        self.assertEqual({int(row[1]) for row in rows}, {self.cars[0].pk, self.cars[1].pk})
+        _, *rows = self.csv_rows(f'/api/sales/export/?car={self.cars[2].pk}')
+        self.assertEqual([row[2] for row in rows], ['Toyota'])
+
+    def test_bad_parameters(self):
+        for url in ('/api/transactions/export/?date_from=yesterday', '/api/transactions/export/?dealer=abc',
+                    '/api/transactions/export/?type=GIFT', '/api/transactions/export/?output=xml',
+                    '/api/sales/export/?date_to=2024-13-01', '/api/sales/export/?customer=1.5'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('error', response.json())
+
+
+class StreamTests(TestCase):
+    def setUp(self):
+        self.repo = RepositoryService()
+        self.dealer = make_dealer('stream')
+        self.other = make_dealer('stream2')
+        self.cars = make_cars(7)
+        for index, car in enumerate(self.cars):
+            self.repo.transactions.create(
+                dealer=(self.dealer, self.other)[index % 2], car=car, transaction_type='BUY', amount=-car.price,
+                balance_before=Decimal('0.00'), balance_after=Decimal('0.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.dealer)
+
+    def stream(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_repository_stream_walks_every_chunk(self):
+        self.assertEqual([car.pk for car in self.repo.cars.stream(chunk_size=3)], [car.pk for car in self.cars])
+        self.assertEqual([car.pk for car in self.repo.cars.stream(chunk_size=7)], [car.pk for car in self.cars])
+        newest = list(Transaction.objects.filter(dealer=self.dealer).order_by('-created_at', '-id')
+                      .values_list('id', flat=True))
+        self.assertEqual([tx.pk for tx in self.repo.transactions.stream_by_dealer(self.dealer, chunk_size=2)], newest)
+        with self.assertRaises(ValueError):
+            list(self.repo.cars.stream(chunk_size=0))
+
+    def test_streamed_arrays_match_the_serializers(self):
+        cars = self.stream('/api/cars/?stream=true')
+        self.assertEqual(cars, [CarSerializer(car).data for car in Car.objects.order_by('id')])
+        transactions = self.stream(f'/api/transactions/?stream=1&dealer={self.other.pk}')
+        self.assertEqual([tx['id'] for tx in transactions],
+                         list(Transaction.objects.filter(dealer=self.other).order_by('-created_at', '-id')
+                              .values_list('id', flat=True)))
+
+    def test_dealer_transactions_keep_their_wrapper(self):
+        body = self.stream(f'/api/dealer/transactions/{self.dealer.pk}/')
+        self.assertEqual(list(body), ['transactions'])
+        self.assertEqual(len(body['transactions']), 4)
+
+    def test_resources_that_do_not_stream_return_pages(self):
+        response = self.client.get('/api/customers/?stream=true')
+        self.assertEqual(set(response.json()), {'next', 'previous', 'results'})
+
+
+class ImportCarsTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('import_cars', path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_upserts_by_vin(self):
+        Car.objects.create(vin='VIN0001', make='Toyota', model='Corolla', year=2018, price=Decimal('900.00'))
+        path = self.write('stock.csv', 'vin,make,model,year,price,in_stock\n'
+                                       'VIN0001,Toyota,Corolla,2018,850.00,false\n'
+                                       'VIN0002,Honda,Civic,2021,2000.00,\n'
+                                       'VIN0003,Mazda,3,2022,2500.00,true\n')
+        output = self.run_import(path, batch_size=2)
+        self.assertIn('3 rows', output)
+        self.assertIn('2 inserted, 1 updated, 0 rejected', output)
+        self.assertEqual(Car.objects.count(), 3)
+        updated = Car.objects.get(vin='VIN0001')
+        self.assertEqual((updated.price, updated.in_stock), (Decimal('850.00'), False))
+        self.assertTrue(Car.objects.get(vin='VIN0002').in_stock)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        self.assertFalse(os.path.exists(f'{path}.rejects.csv'))
+
+        output = self.run_import(path)
+        self.assertIn('0 inserted, 3 updated', output)
+        self.assertEqual(Car.objects.count(), 3)
+
+    def test_rejects_are_written_with_their_row_numbers(self):
+        row = '{"vin": "%s", "make": "Kia", "model": "Rio", "year": %s, "price": "1.00"}\n'
+        path = self.write('stock.jsonl', row % ('VIN0001', '2020') + row % ('VIN0002', '"old"') + 'not json\n'
+                          + '{"make": "Kia", "model": "Rio", "year": 2020, "price": "1.00"}\n')
+        output = self.run_import(path)
+        self.assertIn('1 inserted, 0 updated, 3 rejected', output)
+        with open(f'{path}.rejects.csv', newline='', encoding='utf-8') as handle:
+            header, *rows = list(csv.reader(handle))
+        self.assertEqual(header, ['row', 'errors', 'data'])
+        self.assertEqual([row[0] for row in rows], ['2', '3', '4'])
+        self.assertIn('year', json.loads(rows[0][1]))
+        self.assertIn('vin', json.loads(rows[2][1]))
+        self.assertEqual(list(Car.objects.values_list('vin', flat=True)), ['VIN0001'])
+
+    def test_json_array(self):
+        cars = [{'vin': f'VIN{index:04}', 'make': 'Kia', 'model': 'Rio', 'year': 2020, 'price': 1000 + index}
+                for index in range(5)]
+        path = self.write('stock.json', json.dumps(cars, indent=2))
+        self.assertIn('5 inserted', self.run_import(path, batch_size=2))
+        self.assertEqual(sorted(Car.objects.values_list('price', flat=True)),
+                         [Decimal(1000 + index) for index in range(5)])
+
+    def test_resumes_from_the_checkpoint(self):
+        lines = ['vin,make,model,year,price']
+        lines += [f'VIN{index:04},Kia,Rio,2020,{1000 + index}' for index in range(7)]
+        lines.insert(4, 'VINBAD,Kia,Rio,,1.00')
+        path = self.write('stock.csv', '\n'.join(lines) + '\n')
+        upsert = CarRepository.bulk_upsert
+        calls = []
+
+        def fail_on_third_batch(repo, items, batch_size):
+            calls.append(len(items))
+            if len(calls) == 3:
+                raise RuntimeError('connection lost')
+            return upsert(repo, items, batch_size)
+
+        with mock.patch.object(CarRepository, 'bulk_upsert', autospec=True, side_effect=fail_on_third_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, batch_size=3)
+        self.assertEqual(Car.objects.count(), 5)
+        with open(f'{path}.checkpoint', encoding='utf-8') as handle:
+            state = json.load(handle)
+        self.assertEqual((state['rows'], state['inserted'], state['rejected']), (6, 5, 1))
+
+        output = self.run_import(path, batch_size=3)
+        self.assertIn('Resuming after row 6', output)
+        self.assertIn('8 rows', output)
+        self.assertIn('7 inserted, 0 updated, 1 rejected', output)
+        self.assertEqual(Car.objects.count(), 7)
+        self.assertEqual(Car.objects.values('vin').distinct().count(), 7)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        with open(f'{path}.rejects.csv', newline='', encoding='utf-8') as handle:
+            self.assertEqual([row[0] for row in csv.reader(handle)], ['row', '4'])
+
+    def test_checkpoint_for_another_file(self):
+        path = self.write('stock.csv', 'vin,make,model,year,price\nVIN0001,Kia,Rio,2020,1000\n')
+        with open(f'{path}.checkpoint', 'w', encoding='utf-8') as handle:
+            json.dump({'source': {'path': path, 'size': 1, 'mtime_ns': 0}, 'rows': 1, 'inserted': 1,
+                       'updated': 0, 'rejected': 0, 'rejects_offset': 0}, handle)
+        with self.assertRaisesMessage(CommandError, '--restart'):
+            self.run_import(path)
+        self.assertIn('1 inserted', self.run_import(path, restart=True))
+        self.assertEqual(Car.objects.count(), 1)
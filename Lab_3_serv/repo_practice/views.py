@@ -2,26 +2,156 @@ from rest_framework import viewsets, status
 from rest_framework.authentication import BasicAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from .serializers import CustomerSerializer, EmployeeSerializer, SaleSerializer, DealerProfileSerializer, TransactionSerializer
+from .serializers import CustomerSerializer, EmployeeSerializer, SaleSerializer, DealerProfileSerializer, TransactionSerializer, DealerStatsSerializer
 
 from .serializers import CarSerializer
+from .models import Transaction
 from .services.repo_service import RepositoryService
+from .services.trade_engine import TradeEngine, TradeError
+from .services.cache_layer import cache_stats
+from .repositories.instrumentation import metrics
+from .streaming import stream_export, stream_json_array
+from .dispatch import dispatch
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth.models import User
 from django.db import transaction as db_transaction
-from decimal import Decimal
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from decimal import Decimal, InvalidOperation
+
+
+def parse_datetime_param(name: str, value: str) -> datetime:
+    """ISO date (midnight) or datetime from a query parameter, made timezone-aware"""
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f'{name} must be an ISO date or datetime')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def id_filters(params, **fields) -> dict:
+    """{param: ORM field} of integer id query parameters -> filters of the ones present"""
+    filters = {}
+    for param, field in fields.items():
+        if params.get(param):
+            try:
+                filters[field] = int(params[param])
+            except ValueError:
+                raise ValueError(f'{param} must be an integer id')
+    return filters
+
+
+def date_range_filters(params, field: str) -> dict:
+    """date_from / date_to (ISO date or datetime) on field; a bare date_to includes that whole day"""
+    filters = {}
+    if params.get('date_from'):
+        filters[f'{field}__gte'] = parse_datetime_param('date_from', params['date_from'])
+    if params.get('date_to'):
+        end = parse_datetime_param('date_to', params['date_to'])
+        if parse_date(params['date_to']):
+            filters[f'{field}__lt'] = end + timedelta(days=1)
+        else:
+            filters[f'{field}__lte'] = end
+    return filters
+
+
+def export_response(request, repository, filters: dict, filename: str):
+    """?output=csv|jsonl&gzip=true download of repository.stream_export(**filters)"""
+    columns = [column for column, _ in repository.export_columns]
+    return stream_export(
+        columns,
+        repository.stream_export(**filters),
+        output=request.query_params.get('output', 'csv').lower(),
+        compress=request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes'),
+        filename=filename,
+    )
+
+
+def parse_date_param(name: str, value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f'{name} must be an ISO date (YYYY-MM-DD)')
+    return parsed
 
 
 class BaseAuthenticatedViewSet(viewsets.ModelViewSet):
     authentication_classes = [BasicAuthentication] #base auth
     permission_classes = [IsAuthenticated] #only authenticated users
+    page_size = 50
+    max_page_size = 500
+    streamable = False  # allow ?stream=true to return the whole table as a streamed JSON array
+    fetch_plan = 'default'  # repository fetch plan matching serializer_class
+    max_bulk_items = 50000
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.repo = RepositoryService()
 
+    def list(self, request, *args, **kwargs):
+        """
+        GET /api/<resource>/?cursor=<opaque>&limit=<n>
+        Keyset-paginated list: {"next": url, "previous": url, "results": [...]}
+        GET /api/<resource>/?stream=true on streamable resources: one streamed JSON array
+        """
+        try:
+            filters = self.get_list_filters(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if self.streamable and request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return stream_json_array(self.repo_attribute.stream(**filters), self.get_serializer_class())
+
+        try:
+            limit = self.get_page_limit(request)
+            page = self.repo_attribute.get_page(cursor=request.query_params.get('cursor'), limit=limit, **filters)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(page.items, many=True)
+        return Response({
+            'next': self.get_cursor_link(request, page.next_cursor),
+            'previous': self.get_cursor_link(request, page.prev_cursor),
+            'results': serializer.data,
+        })
+
+    def get_list_filters(self, request) -> dict:
+        """Repository filters taken from the list query string; resources without filters return {}"""
+        return {}
+
+    def get_page_limit(self, request) -> int:
+        raw_limit = request.query_params.get('limit')
+        if raw_limit is None:
+            return self.page_size
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise ValueError('limit must be a positive integer')
+        if limit < 1:
+            raise ValueError('limit must be a positive integer')
+        return min(limit, self.max_page_size)
+
+    def get_cursor_link(self, request, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+
     def get_object(self):
         pk = self.kwargs.get('pk')
         return self.repo_attribute.get_by_id(pk)
@@ -32,21 +162,93 @@ class BaseAuthenticatedViewSet(viewsets.ModelViewSet):
         serializer.instance = instance
 
     def perform_update(self, serializer):
-        pk = self.kwargs.get('pk')
+        # get_object() already loaded the row: one UPDATE of the sent columns, no re-read
+        target = serializer.instance if serializer.instance is not None else self.kwargs.get('pk')
         validated_data = serializer.validated_data
-        instance = self.repo_attribute.update(pk, **validated_data)
+        instance = self.repo_attribute.patch(target, refresh=True, **validated_data)
         serializer.instance = instance
 
     def perform_destroy(self, instance):
         pk = self.kwargs.get('pk')
         self.repo_attribute.delete(pk)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        POST /api/<resource>/bulk/
+        Body: {"op": "create" | "update" | "delete", "items": [...]}
+        create: items are objects; update: objects with "id"; delete: ids.
+        Every item is validated on its own; the valid ones are written in batches.
+        """
+        op = request.data.get('op')
+        items = request.data.get('items')
+
+        if op not in ('create', 'update', 'delete') or not isinstance(items, list):
+            return Response({'error': 'op must be create, update or delete and items must be a list'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_bulk_items:
+            return Response({'error': f'At most {self.max_bulk_items} items per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            errors, data = self.validate_bulk_item(op, item)
+            if errors:
+                results.append({'index': index, 'status': 'invalid', 'errors': errors})
+            else:
+                results.append({'index': index, 'status': 'ok'})
+                valid.append(data)
+
+        with db_transaction.atomic():
+            if op == 'create':
+                affected = len(self.repo_attribute.bulk_create(valid)) if valid else 0
+            elif op == 'update':
+                affected = self.repo_attribute.bulk_update(valid) if valid else 0
+            else:
+                affected = self.repo_attribute.bulk_delete(valid) if valid else 0
+
+        invalid_count = len(items) - len(valid)
+        return Response({
+            'op': op,
+            'affected': affected,
+            'invalid': invalid_count,
+            'results': results,
+        }, status=status.HTTP_207_MULTI_STATUS if invalid_count else status.HTTP_200_OK)
+
+    def validate_bulk_item(self, op, item):
+        """Returns (errors, data) for one bulk item"""
+        if op == 'delete':
+            try:
+                return None, int(item)
+            except (TypeError, ValueError):
+                return {'id': ['A valid integer is required.']}, None
+
+        if not isinstance(item, dict):
+            return {'non_field_errors': ['Expected an object.']}, None
+
+        if op == 'update':
+            try:
+                pk = int(item.get('id'))
+            except (TypeError, ValueError):
+                return {'id': ['A valid integer is required.']}, None
+            serializer = self.get_serializer(data=item, partial=True)
+            if not serializer.is_valid():
+                return serializer.errors, None
+            return None, {'id': pk, **serializer.validated_data}
+
+        serializer = self.get_serializer(data=item)
+        if not serializer.is_valid():
+            return serializer.errors, None
+        return None, dict(serializer.validated_data)
+
 class CarViewSet(BaseAuthenticatedViewSet):
     serializer_class = CarSerializer
+    streamable = True
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.repo_attribute = self.repo.cars
+        self.repo_attribute = self.repo.cars.with_plan(self.fetch_plan)
 
     def get_queryset(self):
         return self.repo.cars.get_all()
@@ -56,7 +258,7 @@ class CustomerViewSet(BaseAuthenticatedViewSet):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.repo_attribute = self.repo.customers
+        self.repo_attribute = self.repo.customers.with_plan(self.fetch_plan)
 
     def get_queryset(self):
         return self.repo.customers.get_all()
@@ -66,24 +268,59 @@ class EmployeeViewSet(BaseAuthenticatedViewSet):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.repo_attribute = self.repo.employees
+        self.repo_attribute = self.repo.employees.with_plan(self.fetch_plan)
 
     def get_queryset(self):
         return self.repo.employees.get_all()
 
 class SaleViewSet(BaseAuthenticatedViewSet):
     serializer_class = SaleSerializer
+    fetch_plan = 'api'
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.repo_attribute = self.repo.sales
+        self.repo_attribute = self.repo.sales.with_plan(self.fetch_plan)
 
     def get_queryset(self):
         return self.repo.sales.get_all()
 
+    def get_list_filters(self, request) -> dict:
+        """
+        GET /api/sales/?car=<id>&customer=<id>&employee=<id>
+                       &date_from=<date or datetime>&date_to=<date or datetime>
+        """
+        params = request.query_params
+        filters = id_filters(params, car='car_id', customer='customer_id', employee='employee_id')
+        filters.update(date_range_filters(params, 'sale_date'))
+        return filters
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        GET /api/sales/export/?output=csv|jsonl&gzip=true + the list filters
+        All (filtered) sales as a streamed download, by id.
+        """
+        try:
+            filters = self.get_list_filters(request)
+            return export_response(request, self.repo.sales, filters, 'sales')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=False, methods=['get'], url_path='report')
     def sales_report(self, request):
-        report_data = self.repo.sales.get_sales_report()
+        """
+        GET /api/sales/report/?from=2025-01-01&to=2025-03-31&granularity=total|day|month&employee=<id>
+        Read from the daily / monthly rollups; month buckets cover whole months.
+        """
+        params = request.query_params
+        try:
+            date_from = parse_date_param('from', params.get('from'))
+            date_to = parse_date_param('to', params.get('to'))
+            employee_id = int(params['employee']) if params.get('employee') else None
+            report_data = self.repo.sales.get_sales_report(
+                date_from, date_to, params.get('granularity', 'total'), employee_id)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({
             'total_records': len(report_data),
             'data': report_data
@@ -91,10 +328,11 @@ class SaleViewSet(BaseAuthenticatedViewSet):
 
 class DealerProfileViewSet(BaseAuthenticatedViewSet):
     serializer_class = DealerProfileSerializer
+    fetch_plan = 'api'
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.repo_attribute = self.repo.dealer_profiles
+        self.repo_attribute = self.repo.dealer_profiles.with_plan(self.fetch_plan)
 
     def get_queryset(self):
         return self.repo.dealer_profiles.get_all()
@@ -102,7 +340,7 @@ class DealerProfileViewSet(BaseAuthenticatedViewSet):
     @action(detail=False, methods=['get'], url_path='my-profile')
     def my_profile(self, request):
         """Get or create dealer profile for current user"""
-        profile, created = self.repo.dealer_profiles.get_or_create_by_user(request.user)
+        profile, created = self.repo_attribute.get_or_create_by_user(request.user)
         serializer = self.get_serializer(profile)
         return Response({
             'created': created,
@@ -113,24 +351,54 @@ class DealerProfileViewSet(BaseAuthenticatedViewSet):
     def high_balance(self, request):
         """Get dealers with high balance"""
         min_balance = request.query_params.get('min', 50000)
-        dealers = self.repo.dealer_profiles.get_high_balance_dealers(float(min_balance))
+        dealers = self.repo_attribute.get_high_balance_dealers(float(min_balance))
         serializer = self.get_serializer(dealers, many=True)
         return Response(serializer.data)
 
 class TransactionViewSet(BaseAuthenticatedViewSet):
     serializer_class = TransactionSerializer
+    fetch_plan = 'api'
+    streamable = True
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.repo_attribute = self.repo.transactions
+        self.repo_attribute = self.repo.transactions.with_plan(self.fetch_plan)
 
     def get_queryset(self):
         return self.repo.transactions.get_all()
 
+    def get_list_filters(self, request) -> dict:
+        """
+        GET /api/transactions/?dealer=<user id>&type=BUY|SELL|MODIFY&car=<id>
+                              &date_from=<date or datetime>&date_to=<date or datetime>
+        date_to as a bare date includes that whole day.
+        """
+        params = request.query_params
+        filters = id_filters(params, dealer='dealer_id', car='car_id')
+        if params.get('type'):
+            transaction_type = params['type'].upper()
+            if transaction_type not in dict(Transaction.TRANSACTION_TYPES):
+                raise ValueError(f"type must be one of {', '.join(dict(Transaction.TRANSACTION_TYPES))}")
+            filters['transaction_type'] = transaction_type
+        filters.update(date_range_filters(params, 'created_at'))
+        return filters
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        GET /api/transactions/export/?output=csv|jsonl&gzip=true + the list filters
+        The whole (filtered) ledger as a streamed download, newest first.
+        """
+        try:
+            filters = self.get_list_filters(request)
+            return export_response(request, self.repo.transactions, filters, 'transactions')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=False, methods=['get'], url_path='my-transactions')
     def my_transactions(self, request):
         """Get transactions for current user"""
-        transactions = self.repo.transactions.get_by_dealer(request.user)
+        transactions = self.repo_attribute.get_by_dealer(request.user)
         serializer = self.get_serializer(transactions, many=True)
         return Response(serializer.data)
 
@@ -139,29 +407,27 @@ class TransactionViewSet(BaseAuthenticatedViewSet):
         """Get transactions filtered by type"""
         transaction_type = request.query_params.get('type', 'BUY')
         if request.user.is_authenticated:
-            transactions = self.repo.transactions.get_by_dealer_and_type(
+            transactions = self.repo_attribute.get_by_dealer_and_type(
                 request.user,
                 transaction_type
             )
         else:
-            transactions = self.repo.transactions.get_by_type(transaction_type)
+            transactions = self.repo_attribute.get_by_type(transaction_type)
         serializer = self.get_serializer(transactions, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='statistics')
     def statistics(self, request):
         """Get transaction statistics for current user"""
-        total_spent = self.repo.transactions.calculate_total_spent(request.user)
-        total_earned = self.repo.transactions.calculate_total_earned(request.user)
-        net_profit = self.repo.transactions.calculate_net_profit(request.user)
+        summary = self.repo.dealer_stats.get_summary(request.user)
 
         return Response({
-            'total_spent': float(total_spent),
-            'total_earned': float(total_earned),
-            'net_profit': float(net_profit),
-            'buy_count': len(self.repo.transactions.get_buy_transactions(request.user)),
-            'sell_count': len(self.repo.transactions.get_sell_transactions(request.user)),
-            'modify_count': len(self.repo.transactions.get_modify_transactions(request.user)),
+            'total_spent': float(summary['total_spent']),
+            'total_earned': float(summary['total_earned']),
+            'net_profit': float(summary['net_profit']),
+            'buy_count': summary['buy_count'],
+            'sell_count': summary['sell_count'],
+            'modify_count': summary['modify_count'],
         })
 
 
@@ -184,78 +450,39 @@ class DealerViewSet(viewsets.ViewSet):
 
             dealer_profile, created = repo.dealer_profiles.get_or_create_by_user(user)
             owned_cars = repo.cars.get(owner=user)
-            transactions = repo.transactions.get_dealer_recent_transactions(user, limit=20)
-            all_available = repo.cars.get(in_stock=True)
-            available_cars = [car for car in all_available if car.owner != user][:10]
+            transactions = repo.transactions.with_plan('api').get_dealer_recent_transactions(user, limit=20)
+            available_cars = repo.cars.get_unowned_in_stock(limit=10)
+            statistics = repo.dealer_stats.get_summary(user)
 
             return Response({
                 'dealer_profile': DealerProfileSerializer(dealer_profile).data,
                 'owned_cars': CarSerializer(owned_cars, many=True).data,
                 'transactions': TransactionSerializer(transactions, many=True).data,
                 'available_cars': CarSerializer(available_cars, many=True).data,
+                'statistics': DealerStatsSerializer(statistics).data,
             })
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=['post'], url_path='trade')
+    def trade(self, request):
+        """
+        POST /api/dealer/trade/
+        Body: {"action": "buy" | "sell" | "modify", "user_id": 1, "car_id": 5,
+               "modification_cost": "500.00", "price_increase": "1000.00", "description": "..."}  # modify only
+        Car update, balance update and ledger row are one DB transaction whose conditional
+        writes re-check ownership, price and balance, so nothing is half-applied.
+        Response: message, transaction, the car and the dealer balance after the trade.
+        """
+        return self.execute_trade(request.data.get('action'), request.data)
+
     @action(detail=False, methods=['post'], url_path='buy')
     def buy_car(self, request):
         """
         POST /api/dealer/buy/
         Body: {"user_id": 1, "car_id": 5}
         """
-        user_id = request.data.get('user_id')
-        car_id = request.data.get('car_id')
-
-        if not user_id or not car_id:
-            return Response({'error': 'user_id and car_id required'}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            user = User.objects.get(id=user_id)
-            repo = RepositoryService()
-            car = repo.cars.get_by_id(car_id)
-
-            if not car:
-                return Response({'error': 'Car not found'}, status=status.HTTP_404_NOT_FOUND)
-
-            dealer_profile, created = repo.dealer_profiles.get_or_create_by_user(user)
-
-            # Перевірки
-            if car.owner == user:
-                return Response({'error': 'You already own this car!'}, status=status.HTTP_400_BAD_REQUEST)
-
-            if dealer_profile.balance < car.price:
-                return Response({
-                    'error': 'Insufficient balance',
-                    'required': str(car.price),
-                    'balance': str(dealer_profile.balance)
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Виконуємо транзакцію
-            with db_transaction.atomic():
-                balance_before = dealer_profile.balance
-
-                repo.dealer_profiles.deduct_from_balance(user, car.price)
-                repo.cars.update(car_id, owner=user)
-
-                transaction_obj = repo.transactions.create(
-                    dealer=user,
-                    car=car,
-                    transaction_type='BUY',
-                    amount=-car.price,
-                    description=f'Purchased {car.make} {car.model} ({car.year})',
-                    balance_before=balance_before,
-                    balance_after=dealer_profile.balance - car.price
-                )
-
-            return Response({
-                'message': f'Successfully purchased {car.make} {car.model}',
-                'transaction': TransactionSerializer(transaction_obj).data
-            }, status=status.HTTP_200_OK)
-
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return self.execute_trade('buy', request.data)
 
     @action(detail=False, methods=['post'], url_path='sell')
     def sell_car(self, request):
@@ -263,49 +490,7 @@ class DealerViewSet(viewsets.ViewSet):
         POST /api/dealer/sell/
         Body: {"user_id": 1, "car_id": 5}
         """
-        user_id = request.data.get('user_id')
-        car_id = request.data.get('car_id')
-
-        if not user_id or not car_id:
-            return Response({'error': 'user_id and car_id required'}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            user = User.objects.get(id=user_id)
-            repo = RepositoryService()
-            car = repo.cars.get_by_id(car_id)
-
-            if not car or car.owner != user:
-                return Response({'error': 'Car not found or not owned by you'}, status=status.HTTP_404_NOT_FOUND)
-
-            dealer_profile, created = repo.dealer_profiles.get_or_create_by_user(user)
-
-            # Виконуємо транзакцію
-            with db_transaction.atomic():
-                balance_before = dealer_profile.balance
-
-                repo.dealer_profiles.add_to_balance(user, car.price)
-
-                transaction_obj = repo.transactions.create(
-                    dealer=user,
-                    car=car,
-                    transaction_type='SELL',
-                    amount=car.price,
-                    description=f'Sold {car.make} {car.model} ({car.year})',
-                    balance_before=balance_before,
-                    balance_after=dealer_profile.balance + car.price
-                )
-
-                repo.cars.update(car_id, owner=None)
-
-            return Response({
-                'message': f'Successfully sold {car.make} {car.model}',
-                'transaction': TransactionSerializer(transaction_obj).data
-            }, status=status.HTTP_200_OK)
-
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return self.execute_trade('sell', request.data)
 
     @action(detail=False, methods=['post'], url_path='modify')
     def modify_car(self, request):
@@ -319,65 +504,54 @@ class DealerViewSet(viewsets.ViewSet):
             "description": "Engine upgrade"
         }
         """
-        user_id = request.data.get('user_id')
-        car_id = request.data.get('car_id')
-        modification_cost = request.data.get('modification_cost')
-        price_increase = request.data.get('price_increase')
-        description = request.data.get('description', 'Car modification')
+        return self.execute_trade('modify', request.data)
 
-        if not all([user_id, car_id, modification_cost, price_increase]):
-            return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
+    def execute_trade(self, trade_action, data):
+        if trade_action not in ('buy', 'sell', 'modify'):
+            return Response({'error': 'action must be buy, sell or modify'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            modification_cost = Decimal(str(modification_cost))
-            price_increase = Decimal(str(price_increase))
-
-            if modification_cost <= 0 or price_increase <= 0:
-                return Response({'error': 'Invalid amounts'}, status=status.HTTP_400_BAD_REQUEST)
+        user_id = data.get('user_id')
+        car_id = data.get('car_id')
+        if not user_id or not car_id:
+            return Response({'error': 'user_id and car_id required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
             user = User.objects.get(id=user_id)
-            repo = RepositoryService()
-            car = repo.cars.get_by_id(car_id)
-
-            if not car or car.owner != user:
-                return Response({'error': 'Car not found or not owned by you'}, status=status.HTTP_404_NOT_FOUND)
-
-            dealer_profile, created = repo.dealer_profiles.get_or_create_by_user(user)
-
-            if dealer_profile.balance < modification_cost:
-                return Response({
-                    'error': 'Insufficient balance',
-                    'required': str(modification_cost),
-                    'balance': str(dealer_profile.balance)
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Виконуємо транзакцію
-            with db_transaction.atomic():
-                balance_before = dealer_profile.balance
-                old_price = car.price
-                new_price = car.price + price_increase
-
-                repo.dealer_profiles.deduct_from_balance(user, modification_cost)
-                repo.cars.update(car_id, price=new_price)
-
-                transaction_obj = repo.transactions.create(
-                    dealer=user,
-                    car=car,
-                    transaction_type='MODIFY',
-                    amount=-modification_cost,
-                    description=f'{description} - Price increased from ${old_price} to ${new_price}',
-                    balance_before=balance_before,
-                    balance_after=dealer_profile.balance - modification_cost
-                )
-
-            return Response({
-                'message': f'Successfully modified {car.make} {car.model}',
-                'new_price': str(new_price),
-                'transaction': TransactionSerializer(transaction_obj).data
-            }, status=status.HTTP_200_OK)
+            engine = TradeEngine()
+            if trade_action == 'modify':
+                modification_cost = data.get('modification_cost')
+                price_increase = data.get('price_increase')
+                if not modification_cost or not price_increase:
+                    return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
+                modification_cost = Decimal(str(modification_cost))
+                price_increase = Decimal(str(price_increase))
+                if modification_cost <= 0 or price_increase <= 0:
+                    return Response({'error': 'Invalid amounts'}, status=status.HTTP_400_BAD_REQUEST)
+                result = engine.modify(user, car_id, modification_cost, price_increase,
+                                       data.get('description', 'Car modification'))
+            elif trade_action == 'buy':
+                result = engine.buy(user, car_id)
+            else:
+                result = engine.sell(user, car_id)
+
+            car = result.car
+            verb = {'buy': 'purchased', 'sell': 'sold', 'modify': 'modified'}[trade_action]
+            body = {
+                'message': f'Successfully {verb} {car.make} {car.model}',
+                'transaction': TransactionSerializer(result.transaction).data,
+                'car': CarSerializer(car).data,
+                'balance': str(result.transaction.balance_after),
+            }
+            if trade_action == 'modify':
+                body['new_price'] = str(car.price)
+            return Response(body, status=status.HTTP_200_OK)
 
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        except InvalidOperation:
+            return Response({'error': 'Invalid amounts'}, status=status.HTTP_400_BAD_REQUEST)
+        except TradeError as e:
+            return Response({'error': str(e), **e.details}, status=e.status_code)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -390,10 +564,109 @@ class DealerViewSet(viewsets.ViewSet):
         try:
             user = User.objects.get(id=user_id)
             repo = RepositoryService()
-            transactions = repo.transactions.get_by_dealer(user)
+            transactions = repo.transactions.with_plan('api').stream_by_dealer(user)
 
-            return Response({
-                'transactions': TransactionSerializer(transactions, many=True).data
-            })
+            return stream_json_array(transactions, TransactionSerializer, key='transactions')
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+class RepositoryCacheViewSet(viewsets.ViewSet):
+    """
+    GET /api/cache-stats/
+    Hit / miss counters of the repository read-through cache in this process
+    """
+    authentication_classes = [BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        return Response(cache_stats.snapshot())
+
+
+class RepositoryMetricsViewSet(viewsets.ViewSet):
+    """
+    GET  /api/metrics/        calls, rows and p50/p95/p99 latency per repository method, hottest first
+    POST /api/metrics/reset/  start counting from zero
+    """
+    authentication_classes = [BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        return Response({
+            'enabled': metrics.enabled,
+            'repositories': metrics.snapshot(),
+            'cache': cache_stats.snapshot(),
+        })
+
+    @action(detail=False, methods=['post'], url_path='reset')
+    def reset(self, request):
+        metrics.reset()
+        cache_stats.reset()
+        return Response({'reset': True})
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """
+    POST /api/batch/
+    Body: {"atomic": false, "requests": [{"method": "GET", "path": "/api/cars/5/"},
+                                         {"method": "POST", "path": "/api/dealer/buy/", "body": {...}}]}
+    Runs the sub-requests in order, in this process, as the authenticated user and returns
+    {"atomic": ..., "committed": ..., "responses": [{"status": 200, "body": ...}, ...]}.
+    atomic=true: one DB transaction; the first sub-request with status >= 400 stops the batch,
+    everything is rolled back and the batch answers with that status.
+    Sub-requests whose answer is not JSON (the CSV/gzip exports) get a 406 of their own.
+    """
+    authentication_classes = [BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+    max_requests = 100
+    methods = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+    def create(self, request):
+        try:
+            atomic, sub_requests = self.parse_batch(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not atomic:
+            responses = [self.run(request.user, sub_request) for sub_request in sub_requests]
+            return Response({'atomic': False, 'committed': True, 'responses': responses})
+
+        responses = []
+        failed = None
+        with db_transaction.atomic():
+            for index, sub_request in enumerate(sub_requests):
+                responses.append(self.run(request.user, sub_request))
+                if responses[-1]['status'] >= 400:
+                    failed = index
+                    db_transaction.set_rollback(True)
+                    break
+
+        if failed is None:
+            return Response({'atomic': True, 'committed': True, 'responses': responses})
+        return Response({'atomic': True, 'committed': False, 'failed_index': failed, 'responses': responses},
+                        status=responses[failed]['status'])
+
+    def parse_batch(self, data):
+        sub_requests = data.get('requests') if isinstance(data, dict) else None
+        if not isinstance(sub_requests, list) or not sub_requests:
+            raise ValueError('requests must be a non-empty list')
+        if len(sub_requests) > self.max_requests:
+            raise ValueError(f'At most {self.max_requests} requests per batch')
+
+        parsed = []
+        for index, item in enumerate(sub_requests):
+            if not isinstance(item, dict):
+                raise ValueError(f'requests[{index}] must be an object')
+            method = str(item.get('method', 'GET')).upper()
+            path = item.get('path')
+            if method not in self.methods:
+                raise ValueError(f"requests[{index}].method must be one of {', '.join(self.methods)}")
+            if not isinstance(path, str) or not path.startswith('/api/') or path.startswith('/api/batch'):
+                raise ValueError(f'requests[{index}].path must be an /api/ path other than /api/batch/')
+            parsed.append((method, path, item.get('body')))
+        return bool(data.get('atomic', False)), parsed
+
+    def run(self, user, sub_request):
+        method, path, body = sub_request
+        status_code, payload = dispatch(method, path, user, body=body)
+        return {'status': status_code, 'body': payload}